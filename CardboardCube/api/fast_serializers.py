@@ -0,0 +1,143 @@
+"""
+Read-only serializers for list endpoints that return thousands of rows.
+
+Each fast serializer reproduces the output of one of the ModelSerializers in ``api.serializers``
+(same keys, same order, same values), but builds it from ``.values()`` rows instead of model
+instances, so Django never instantiates models and DRF never walks its per-field machinery. The field
+list and any representation conversions are taken from the ModelSerializer once and cached, so the
+two can't drift apart when a model gains a field.
+"""
+from functools import lru_cache
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import F, Q
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+from api.serializers import GradingDetailsSerializer, InventoryItemSerializer, UserSubCollectionSerializer
+
+# Fields whose representation of a database value is the value itself.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+@lru_cache(maxsize=None)
+def field_plan(serializer_class):
+    """
+    The (names, converters, many) read plan for a ModelSerializer: output field names in order,
+    (name, to_representation) pairs for the fields that need converting, and the many-valued fields.
+    """
+    names, converters, many = [], [], []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        names.append(name)
+        if isinstance(field, ManyRelatedField):
+            many.append(name)
+        elif type(field) not in PASSTHROUGH_FIELDS:
+            converters.append((name, field.to_representation))
+    return tuple(names), tuple(converters), tuple(many)
+
+
+class FastModelSerializer(object):
+    """
+    Base class for the fast serializers. Subclasses name the ModelSerializer they stand in for and,
+    for many-valued fields, the aggregate that collects them in the same query.
+    """
+    serializer_class = None
+
+    def plan(self):
+        return field_plan(self.serializer_class)
+
+    def many_aggregates(self):
+        """
+        Aggregate expressions for the many-valued fields, keyed by field name.
+        """
+        return {}
+
+    def lookups(self, prefix=''):
+        names, _, many = self.plan()
+        return [prefix + name for name in names if name not in many]
+
+    def values(self, queryset):
+        aggregates = {'_' + name: expression for name, expression in self.many_aggregates().items()}
+        return queryset.values(*self.lookups(), **aggregates)
+
+    def convert(self, row):
+        _, converters, _ = self.plan()
+        for name, to_representation in converters:
+            value = row[name]
+            if value is not None:
+                row[name] = to_representation(value)
+        return row
+
+    def represent(self, row, prefix=''):
+        """
+        Build the representation from a (possibly joined) row whose columns carry `prefix`.
+        """
+        names, _, many = self.plan()
+        # An aggregate over no rows comes back as NULL rather than an empty list.
+        data = {name: ((row['_' + name] or []) if name in many else row[prefix + name]) for name in names}
+        return self.convert(data)
+
+    def serialize(self, queryset):
+        rows = self.values(queryset)
+        if self.plan()[2]:
+            return [self.represent(row) for row in rows]
+        # Without many-valued fields `.values()` already yields the output keys in output order.
+        return [self.convert(row) for row in rows]
+
+
+class GradingDetailsFastSerializer(FastModelSerializer):
+    serializer_class = GradingDetailsSerializer
+
+
+class InventoryItemFastSerializer(FastModelSerializer):
+    """
+    Items as `InventoryItemSerializer` renders them. With ``expand_grading`` the grading details are
+    fetched through the same (joined) query and nested in place of their primary key.
+    """
+    serializer_class = InventoryItemSerializer
+    grading_prefix = 'grading_details__'
+
+    def __init__(self, expand_grading=False):
+        self.expand_grading = expand_grading
+        self.grading = GradingDetailsFastSerializer()
+
+    def values(self, queryset):
+        if not self.expand_grading:
+            return super().values(queryset)
+        return queryset.values(*self.lookups(), *self.grading.lookups(self.grading_prefix))
+
+    def serialize(self, queryset):
+        if not self.expand_grading:
+            return super().serialize(queryset)
+        items = []
+        names = self.plan()[0]
+        for row in self.values(queryset):
+            item = self.convert({name: row[name] for name in names})
+            if item['grading_details'] is not None:
+                item['grading_details'] = self.grading.represent(row, self.grading_prefix)
+            items.append(item)
+        return items
+
+
+class UserSubCollectionFastSerializer(FastModelSerializer):
+    """
+    Sub-collections as `UserSubCollectionSerializer` renders them, with the item keys aggregated in
+    the same query rather than one query per sub-collection.
+    """
+    serializer_class = UserSubCollectionSerializer
+
+    def many_aggregates(self):
+        return {
+            'inventory_items': ArrayAgg(
+                'memberships__inventoryitem',
+                filter=Q(memberships__owner=F('owner'), memberships__inventoryitem__isnull=False),
+            ),
+        }
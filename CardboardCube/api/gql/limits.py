@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Depth, cost and lookup limits for GraphQL queries, checked before anything is executed.
+
+The cost of a query is an upper estimate of how many objects it can return: every field costs one,
+times the most objects its parent list can hold. Lists with a `first` argument hold at most that
+many (capped at the page size limit); other lists use the estimates in LIST_ESTIMATES.
+
+Relations are batch loaded (see api.gql.loaders), but the fields in LOOKUP_FIELDS run a query of
+their own each time they appear, aliases included, so how many times they can run is limited too.
+"""
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, OperationDefinitionNode, OperationType,
+    get_named_type, is_list_type, is_non_null_type, value_from_ast,
+)
+
+from api.gql.schema import DEFAULT_PAGE, MAX_CARDS, MAX_PAGE
+
+# Typical upper sizes of the lists without a `first` argument.
+LIST_ESTIMATES = {
+    ('Query', 'subcollections'): 50,
+    ('Inventory', 'subcollections'): 50,
+    ('SubCollection', 'items'): 500,
+    ('Query', 'cards'): MAX_CARDS,
+}
+
+# Fields resolved with a query of their own rather than through a loader's batch.
+LOOKUP_FIELDS = {
+    ('Query', 'inventory'), ('Query', 'subcollections'), ('Query', 'subcollection'), ('Query', 'items'),
+    ('Query', 'card'), ('Query', 'cards'), ('Inventory', 'subcollections'), ('Inventory', 'items'),
+}
+
+
+def _list_size(parent_type, field_name, field_def, node, variables):
+    if 'first' in field_def.args:
+        first = None
+        for argument in node.arguments:
+            if argument.name.value == 'first':
+                first = value_from_ast(argument.value, field_def.args['first'].type, variables)
+        if not isinstance(first, int):
+            first = field_def.args['first'].default_value or DEFAULT_PAGE
+        return max(0, min(first, MAX_PAGE))
+    return LIST_ESTIMATES.get((parent_type.name, field_name), MAX_PAGE)
+
+
+def _measure(parent_type, selection_set, fragments, variables):
+    """
+    (depth, cost, lookups) of a selection set on `parent_type`.
+    """
+    depth, cost, lookups = 0, 0, 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = selection.name.value
+            if name.startswith('__'):
+                # Introspection is answered from the schema without touching the database.
+                continue
+            field_def = parent_type.fields[name]
+            field_type = field_def.type.of_type if is_non_null_type(field_def.type) else field_def.type
+            size = _list_size(parent_type, name, field_def, selection, variables) if is_list_type(field_type) else 1
+            child_depth, child_cost, child_lookups = 0, 0, 0
+            if selection.selection_set is not None:
+                child_depth, child_cost, child_lookups = _measure(get_named_type(field_type), selection.selection_set,
+                                                                  fragments, variables)
+            depth = max(depth, child_depth + 1)
+            cost += size * (1 + child_cost)
+            lookups += ((parent_type.name, name) in LOOKUP_FIELDS) + size * child_lookups
+        else:
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = fragments[selection.name.value]
+            else:
+                fragment = selection
+            child_depth, child_cost, child_lookups = _measure(parent_type, fragment.selection_set, fragments, variables)
+            depth = max(depth, child_depth)
+            cost += child_cost
+            lookups += child_lookups
+    return depth, cost, lookups
+
+
+def check_limits(schema, document, variables, operation_name, max_depth, max_cost, max_lookups):
+    """
+    Raise GraphQLError if the operation to run is nested deeper than `max_depth`, could cost more
+    than `max_cost` or runs LOOKUP_FIELDS more than `max_lookups` times. Returns its (depth, cost).
+    The document must already have passed validation.
+    """
+    fragments = {}
+    operations = []
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            operations.append(definition)
+        elif isinstance(definition, FragmentDefinitionNode):
+            fragments[definition.name.value] = definition
+    if operation_name:
+        operations = [operation for operation in operations
+                      if operation.name and operation.name.value == operation_name]
+    if len(operations) != 1:
+        raise GraphQLError('Give exactly one operation to run.')
+    if operations[0].operation != OperationType.QUERY:
+        raise GraphQLError('Only queries are supported.')
+    depth, cost, lookups = _measure(schema.query_type, operations[0].selection_set, fragments, variables or {})
+    if depth > max_depth:
+        raise GraphQLError(f'Query depth {depth} exceeds the limit of {max_depth}.')
+    if cost > max_cost:
+        raise GraphQLError(f'Query cost {cost} exceeds the limit of {max_cost}.')
+    if lookups > max_lookups:
+        raise GraphQLError(f'Query runs {lookups} separate lookups, more than the limit of {max_lookups}.')
+    return depth, cost
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request batching data loaders for the GraphQL API.
+
+GraphQL resolves one object at a time, depth first, so loading each relation where it is resolved
+would cost a query per object. Instead, whenever a resolver produces objects, the keys their
+relations will need are queued on the loaders for those relations (see Loaders.seen). The first
+load() that misses the cache then fetches every queued key in one query, and the rest of the
+siblings are served from the cache. A query therefore runs one statement per relation per place it
+appears in the query, however many objects it returns.
+"""
+from card_catalog.models import Card, CardSet
+from inventory.models import GradingDetails, InventoryItem, SubCollectionMembership
+
+
+class Loader(object):
+    """
+    Loads values by key in batches through `batch(keys)`, which returns {key: value}. Keys it leaves
+    out load as None, or as [] for a loader of lists (`many`). `on_load` is called with the values of
+    every batch.
+    """
+
+    def __init__(self, batch, many=False, on_load=None):
+        self.batch = batch
+        self.many = many
+        self.on_load = on_load
+        self.cache = {}
+        self.pending = set()
+        self.batches = 0
+
+    def queue(self, keys):
+        self.pending.update(key for key in keys if key is not None and key not in self.cache)
+
+    def load(self, key):
+        if key is None:
+            return [] if self.many else None
+        if key not in self.cache:
+            self.pending.add(key)
+            keys, self.pending = self.pending, set()
+            found = self.batch(list(keys))
+            self.batches += 1
+            for pending_key in keys:
+                self.cache[pending_key] = found.get(pending_key, [] if self.many else None)
+            if self.on_load is not None:
+                values = [found[pending_key] for pending_key in keys if pending_key in found]
+                self.on_load([value for group in values for value in group] if self.many else values)
+        return self.cache[key]
+
+
+class Loaders(object):
+    """
+    The loaders of one request, scoped to the items of `owner_id`.
+    """
+
+    def __init__(self, owner_id):
+        self.owner_id = owner_id
+        self.memberships = Loader(self._memberships, many=True, on_load=lambda rows: self.seen('membership', rows))
+        self.items = Loader(self._items, on_load=lambda items: self.seen('item', items))
+        self.cards = Loader(self._cards, on_load=lambda cards: self.seen('card', cards))
+        self.sets = Loader(self._sets)
+        self.grading = Loader(self._grading)
+
+    def seen(self, kind, objects):
+        """
+        Queue the relations of objects a resolver produced, ready for their children to be resolved.
+        """
+        if kind == 'subcollection':
+            self.memberships.queue(subcollection.pk for subcollection in objects)
+        elif kind == 'membership':
+            self.items.queue(membership.inventoryitem_id for membership in objects)
+        elif kind == 'item':
+            for item in objects:
+                self.items.cache.setdefault(item.pk, item)
+            self.cards.queue(item.card_id for item in objects)
+            self.grading.queue(item.grading_details_id for item in objects)
+        elif kind == 'card':
+            self.sets.queue(card.set_id for card in objects)
+        return objects
+
+    def _memberships(self, subcollection_ids):
+        grouped = {}
+        for membership in SubCollectionMembership.objects.filter(
+            owner=self.owner_id, subcollection__in=subcollection_ids
+        ).order_by('subcollection', 'inventoryitem'):
+            grouped.setdefault(membership.subcollection_id, []).append(membership)
+        return grouped
+
+    def _items(self, item_ids):
+        return InventoryItem.objects.owned_by(self.owner_id).in_bulk(item_ids)
+
+    def _cards(self, card_ids):
+        return Card.objects.in_bulk(card_ids)
+
+    def _sets(self, set_ids):
+        return CardSet.objects.in_bulk(set_ids)
+
+    def _grading(self, grading_ids):
+        return GradingDetails.objects.in_bulk(grading_ids)
+
+    def batches(self):
+        return sum(loader.batches for loader in (self.memberships, self.items, self.cards, self.sets, self.grading))
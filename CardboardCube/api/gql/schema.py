@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+GraphQL read API over the requesting user's inventory, sub-collections and items, and the card
+catalog. Relations are resolved through the request's batching loaders (see api.gql.loaders).
+"""
+import re
+
+from django.core.exceptions import ValidationError
+from graphql import build_schema
+
+from card_catalog.models import Card
+from inventory.models import InventoryItem, UserInventory, UserSubCollection
+from inventory.simulation import parse_list
+
+DEFAULT_PAGE = 100
+MAX_PAGE = 500
+MAX_CARDS = 500
+
+SDL = """
+type Query {
+  inventory: Inventory
+  subcollections(kind: String): [SubCollection!]!
+  subcollection(id: ID!): SubCollection
+  items(first: Int = 100, after: ID): [Item!]!
+  card(id: Int!): Card
+  cards(ids: [Int!]!): [Card]!
+}
+
+type Inventory {
+  id: ID!
+  version: Int!
+  subcollections(kind: String): [SubCollection!]!
+  items(first: Int = 100, after: ID): [Item!]!
+}
+
+type SubCollection {
+  id: ID!
+  kind: String!
+  kindOverride: String
+  description: String
+  version: Int!
+  items: [SubCollectionItem!]!
+}
+
+type SubCollectionItem {
+  quantity: Int!
+  quantityNeeded: Int!
+  item: Item!
+}
+
+type Item {
+  id: ID!
+  display: String!
+  quantityOwned: Int!
+  quantityWanted: Int
+  quantityAllocated: Int!
+  quantityAvailable: Int!
+  condition: String!
+  language: String!
+  isFoil: Boolean!
+  isSigned: Boolean!
+  isAltered: Boolean!
+  isMisprint: Boolean!
+  isMiscut: Boolean!
+  isGraded: Boolean!
+  card: Card
+  grading: Grading
+}
+
+type Grading {
+  id: ID!
+  gradingService: String!
+  serialNumber: String!
+  overallGrade: Float
+  autographGrade: Float
+  centeringGrade: Float
+  cornersGrade: Float
+  edgesGrade: Float
+  surfaceGrade: Float
+}
+
+type Card {
+  id: Int!
+  name: String!
+  manaCost: String
+  cmc: Float
+  types: [String!]!
+  subtypes: [String!]!
+  colors: [String!]!
+  colorIdentity: [String!]!
+  oracleText: String
+  imageUrl: String
+  set: CardSet
+}
+
+type CardSet {
+  id: Int!
+  code: String!
+  name: String!
+  releaseDate: String
+}
+"""
+
+CAMEL = re.compile(r'(?<!^)(?=[A-Z])')
+
+
+def field_resolver(source, info, **kwargs):
+    """
+    Fields without a resolver of their own read the model attribute of the same name in snake case.
+    """
+    return getattr(source, CAMEL.sub('_', info.field_name).lower(), None)
+
+
+def _page(first):
+    return max(0, min(first if first is not None else DEFAULT_PAGE, MAX_PAGE))
+
+
+def _items_page(info, first, after):
+    items = InventoryItem.objects.owned_by(info.context.owner_id).order_by('uuid')
+    if after:
+        items = items.filter(uuid__gt=after)
+    return info.context.seen('item', list(items[:_page(first)]))
+
+
+def _subcollections(info, kind):
+    subcollections = UserSubCollection.objects.filter(owner=info.context.owner_id).order_by('pk')
+    if kind:
+        subcollections = subcollections.filter(kind=kind)
+    return info.context.seen('subcollection', list(subcollections))
+
+
+def resolve_inventory(root, info):
+    return UserInventory.objects.filter(owner=info.context.owner_id).first()
+
+
+def resolve_subcollection(root, info, id):
+    try:
+        subcollection = UserSubCollection.objects.filter(owner=info.context.owner_id, pk=id).first()
+    except ValidationError:
+        return None
+    return info.context.seen('subcollection', [subcollection])[0] if subcollection else None
+
+
+def resolve_card(root, info, id):
+    return info.context.cards.load(id)
+
+
+def resolve_cards(root, info, ids):
+    ids = ids[:MAX_CARDS]
+    info.context.cards.queue(ids)
+    return [info.context.cards.load(card_id) for card_id in ids]
+
+
+def resolve_item(membership, info):
+    return info.context.items.load(membership.inventoryitem_id)
+
+
+def resolve_display(item, info):
+    # InventoryItem.__str__ reads the card and grading details; hand it the batch-loaded ones.
+    card = info.context.cards.load(item.card_id)
+    if card is not None:
+        Card._meta.get_field('set').set_cached_value(card, info.context.sets.load(card.set_id))
+    InventoryItem._meta.get_field('card').set_cached_value(item, card)
+    InventoryItem._meta.get_field('grading_details').set_cached_value(
+        item, info.context.grading.load(item.grading_details_id)
+    )
+    return str(item)
+
+
+RESOLVERS = {
+    'Query': {
+        'inventory': resolve_inventory,
+        'subcollections': lambda root, info, kind=None: _subcollections(info, kind),
+        'subcollection': resolve_subcollection,
+        'items': lambda root, info, first=None, after=None: _items_page(info, first, after),
+        'card': resolve_card,
+        'cards': resolve_cards,
+    },
+    'Inventory': {
+        'id': lambda inventory, info: str(inventory.pk),
+        'subcollections': lambda inventory, info, kind=None: _subcollections(info, kind),
+        'items': lambda inventory, info, first=None, after=None: _items_page(info, first, after),
+    },
+    'SubCollection': {
+        'id': lambda subcollection, info: str(subcollection.pk),
+        'items': lambda subcollection, info: info.context.memberships.load(subcollection.pk),
+    },
+    'SubCollectionItem': {
+        'item': resolve_item,
+    },
+    'Item': {
+        'id': lambda item, info: str(item.pk),
+        'display': resolve_display,
+        'card': lambda item, info: info.context.cards.load(item.card_id),
+        'grading': lambda item, info: info.context.grading.load(item.grading_details_id),
+    },
+    'Grading': {
+        'id': lambda grading, info: str(grading.pk),
+    },
+    'Card': {
+        'types': lambda card, info: parse_list(card.types),
+        'subtypes': lambda card, info: parse_list(card.subtypes),
+        'colors': lambda card, info: parse_list(card.colors),
+        'colorIdentity': lambda card, info: parse_list(card.color_identity),
+        'set': lambda card, info: info.context.sets.load(card.set_id),
+    },
+    'CardSet': {
+        'releaseDate': lambda card_set, info: card_set.release_date.isoformat() if card_set.release_date else None,
+    },
+}
+
+
+def _build():
+    schema = build_schema(SDL)
+    for type_name, fields in RESOLVERS.items():
+        for field_name, resolver in fields.items():
+            schema.type_map[type_name].fields[field_name].resolve = resolver
+    return schema
+
+
+schema = _build()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Server-sent events stream of live inventory and sub-collection changes (see inventory.live).
+
+    GET /api/live/?inventory=1&subcollection=<id>&subcollection=<id>
+
+subscribes the logged-in user to changes to their inventory and to each sub-collection they own or
+can view, and streams one `data:` line of JSON per event. A subscriber that falls more than
+LIVE_QUEUE_SIZE events behind, or that loses the broker, is sent a `resync` event and disconnected;
+it should re-read its data (or follow the change log) and reconnect, which EventSource does by
+itself.
+
+This is a plain ASGI application, mounted in front of Django by asgi.py, so an idle subscriber costs
+a queue rather than a worker. Each process keeps one broker connection (the Hub), subscribed to the
+channels its clients are watching, and fans each message out to their queues.
+"""
+import asyncio
+import io
+import logging
+from importlib import import_module
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+
+from api.views.subcollection import viewable_subcollection
+from inventory.live import get_broker, inventory_channel, subcollection_channel
+
+logger = logging.getLogger(__name__)
+
+LIVE_PATH = '/api/live/'
+
+RESYNC = object()
+
+
+class Subscription(object):
+    """
+    One client's queue of messages on `channels`.
+    """
+
+    def __init__(self, channels, size):
+        self.channels = channels
+        self.size = size
+        self.queue = asyncio.Queue()
+        self.closed = False
+
+    def deliver(self, message):
+        if self.closed:
+            return
+        if self.queue.qsize() >= self.size:
+            self.close()
+        else:
+            self.queue.put_nowait(message)
+
+    def close(self):
+        self.closed = True
+        self.queue.put_nowait(RESYNC)
+
+
+class Hub(object):
+    """
+    The process's broker connection and the subscriptions it feeds.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.listener = None
+        self.reader = None
+        self.subscriptions = {}
+        self.lock = asyncio.Lock()
+
+    async def subscribe(self, channels):
+        subscription = Subscription(channels, settings.LIVE_QUEUE_SIZE)
+        async with self.lock:
+            if self.listener is None:
+                self.listener = self.broker.listener()
+            new = [channel for channel in channels if channel not in self.subscriptions]
+            for channel in channels:
+                self.subscriptions.setdefault(channel, set()).add(subscription)
+            if new:
+                await self.listener.subscribe(new)
+            if self.reader is None:
+                self.reader = asyncio.ensure_future(self._read(self.listener))
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        async with self.lock:
+            unused = []
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscriptions[channel]
+                    unused.append(channel)
+            if unused and self.listener is not None:
+                await self.listener.unsubscribe(unused)
+
+    async def _read(self, listener):
+        try:
+            async for channel, message in listener.messages():
+                for subscription in tuple(self.subscriptions.get(channel, ())):
+                    subscription.deliver(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception('Lost the live event broker')
+            async with self.lock:
+                for subscription in {s for subscribers in self.subscriptions.values() for s in subscribers}:
+                    subscription.close()
+                self.subscriptions = {}
+                self.listener = None
+                self.reader = None
+
+
+_hubs = {}
+
+
+def get_hub():
+    loop = asyncio.get_event_loop()
+    if loop not in _hubs:
+        _hubs[loop] = Hub(get_broker())
+    return _hubs[loop]
+
+
+def authorize(scope):
+    """
+    The channels the request may stream, or None if it is not from a logged in user.
+    """
+    close_old_connections()
+    try:
+        request = ASGIRequest(scope, io.BytesIO())
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        user = get_user(request)
+        if not user.is_authenticated:
+            return None
+        query = parse_qs(scope.get('query_string', b'').decode())
+        channels = []
+        if query.get('inventory'):
+            channels.append(inventory_channel(user.pk))
+        for pk in query.get('subcollection', []):
+            subcollection = viewable_subcollection(user, pk)
+            if subcollection is not None:
+                channels.append(subcollection_channel(subcollection.pk))
+        return channels
+    finally:
+        close_old_connections()
+
+
+async def _respond(send, status, body=b''):
+    await send({'type': 'http.response.start', 'status': status, 'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _disconnected(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _stream(send, subscription):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no'),
+    ]})
+    await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+    while True:
+        try:
+            message = await asyncio.wait_for(subscription.queue.get(), settings.LIVE_HEARTBEAT)
+        except asyncio.TimeoutError:
+            await send({'type': 'http.response.body', 'body': b': ping\n\n', 'more_body': True})
+            continue
+        if message is RESYNC:
+            await send({'type': 'http.response.body', 'body': b'event: resync\ndata: {}\n\n'})
+            return
+        await send({'type': 'http.response.body', 'body': b'data: ' + message + b'\n\n', 'more_body': True})
+
+
+async def live_events(scope, receive, send):
+    if scope['method'] != 'GET':
+        await _respond(send, 405)
+        return
+    channels = await sync_to_async(authorize)(scope)
+    if channels is None:
+        await _respond(send, 403, b'Authentication credentials were not provided.')
+        return
+    if not channels:
+        await _respond(send, 400, b'Subscribe to inventory=1 or to a sub-collection you can view.')
+        return
+
+    hub = get_hub()
+    subscription = await hub.subscribe(channels)
+    stream = asyncio.ensure_future(_stream(send, subscription))
+    disconnected = asyncio.ensure_future(_disconnected(receive))
+    try:
+        await asyncio.wait([stream, disconnected], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (stream, disconnected):
+            task.cancel()
+        await hub.unsubscribe(subscription)
@@ -1,15 +1,24 @@
+from images.store import image_url
+from images.variants import AVATAR_VARIANTS
 from inventory.models import UserInventory, UserSubCollection, InventoryItem, GradingDetails
+from jobs.models import Job
+from profiling.models import RequestProfile
+from registration.models import User
 
 from rest_framework import serializers
 
 
 class UserInventorySerializer(serializers.ModelSerializer):
+    inventory_items = serializers.PrimaryKeyRelatedField(many=True, read_only=True, source='get_inventory_items')
+
     class Meta:
         model = UserInventory
         fields = '__all__'
 
 
 class UserSubCollectionSerializer(serializers.ModelSerializer):
+    inventory_items = serializers.PrimaryKeyRelatedField(many=True, read_only=True, source='get_inventory_items')
+
     class Meta:
         model = UserSubCollection
         fields = '__all__'
@@ -25,3 +34,36 @@ class GradingDetailsSerializer(serializers.ModelSerializer):
     class Meta:
         model = GradingDetails
         fields = '__all__'
+
+
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Job
+        fields = ('uuid', 'kind', 'status', 'progress', 'result', 'error', 'created_at', 'started_at', 'finished_at')
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    user = serializers.SlugRelatedField(slug_field='email', read_only=True)
+
+    class Meta:
+        model = RequestProfile
+        exclude = ('speedscope',)
+
+
+class UserSerializer(serializers.ModelSerializer):
+    avatar = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'avatar')
+
+    def get_avatar(self, user):
+        """
+        URLs of the resized avatar variants, or None until the uploaded avatar has been processed.
+        """
+        avatar_image = getattr(user, 'avatar_image', None)
+        if avatar_image is None:
+            return None
+        return {name: image_url(avatar_image.image_id, name) for name in AVATAR_VARIANTS}
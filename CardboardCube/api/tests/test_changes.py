@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from inventory.models import InventoryItem, UserInventory
+from registration.models import User
+
+
+class TestInventoryChanges(TransactionTestCase):
+    """
+    Tests for the change log and the delta sync endpoint. The log only exposes committed
+    transactions, so these run outside a wrapping test transaction.
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.collection = UserInventory.objects.get(owner=self.user).collections.first()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.item = InventoryItem.objects.create(owner=self.user, card=Card.objects.get(pk=1), quantity_owned=2)
+
+    def _changes(self, since=None):
+        response = self.client.get('/api/changes/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_changes_since_cursor(self):
+        self.collection.add_items_to_subcollection([self.item.pk])
+        data = self._changes()
+        changes = [(change['t'], change['o'], change['id']) for change in data['changes']]
+        self.assertIn(('I', 'U', self.item.pk), changes)
+        self.assertIn(('S', 'U', self.item.pk), changes)
+
+        self.item.quantity_owned = 3
+        self.item.save()
+        data = self._changes(since=data['cursor'])
+        self.assertEqual(len(data['changes']), 1)
+        self.assertEqual(data['changes'][0]['p']['qo'], 3)
+
+        data = self._changes(since=data['cursor'])
+        self.assertEqual(data['changes'], [])
+
+    def test_item_delete(self):
+        cursor = self._changes()['cursor']
+        item_pk = self.item.pk
+        self.item.delete()
+        changes = self._changes(since=cursor)['changes']
+        self.assertEqual(changes, [{'t': 'I', 'o': 'D', 'id': item_pk}])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/changes/', {'since': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_limit(self):
+        self.collection.add_items_to_subcollection([self.item.pk])
+        for limit in (1, -5):
+            data = self.client.get('/api/changes/', {'limit': limit}).data
+            self.assertEqual(len(data['changes']), 1)
+            self.assertTrue(data['more'])
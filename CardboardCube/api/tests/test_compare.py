@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from django.core.cache import cache
+from django.test import TestCase
+from guardian.shortcuts import assign_perm
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from inventory.models import InventoryItem, UserInventory
+from registration.models import User
+
+
+class TestCompare(TestCase):
+    """
+    Tests for comparing sub-collections with each other, with owned cards and with uploaded lists
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.cube, self.other_cube = UserInventory.objects.get(owner=self.user).cubes[:2]
+        items = {}
+        for card_pk, quantity in ((1, 3), (2, 2), (3, 1), (4, 1)):
+            items[card_pk] = InventoryItem.objects.create(
+                owner=self.user, card=Card.objects.get(pk=card_pk), quantity_owned=quantity
+            )
+        InventoryItem.objects.create(owner=self.user, card=Card.objects.get(pk=1), quantity_owned=1, is_foil=True)
+        self.cube.set_item_quantities({items[1].pk: 2, items[2].pk: 1, items[3].pk: 1})
+        self.other_cube.set_item_quantities({items[1].pk: 1, items[2].pk: 1, items[4].pk: 1})
+        self.items = items
+        self.url = f'/api/subcollection/{self.cube.pk}/compare/'
+
+    def _summary(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {section: {entry['card']: entry['delta'] for entry in entries}
+                for section, entries in response.data.items()}
+
+    def test_compare_subcollections(self):
+        response = self.client.get(self.url, {'with': self.other_cube.pk})
+        self.assertEqual(self._summary(response), {'added': {4: 1}, 'removed': {3: -1}, 'shared': {1: -1, 2: 0}})
+
+    def test_compare_by_name(self):
+        response = self.client.get(self.url, {'with': self.other_cube.pk, 'identity': 'name'})
+        self.assertEqual(self._summary(response)['shared'], {'Arid Mesa': -1, 'Steam Vents': 0})
+
+    def test_compare_with_owned(self):
+        response = self.client.get(self.url, {'with': 'owned'})
+        self.assertEqual(self._summary(response), {'added': {4: 1}, 'removed': {}, 'shared': {1: 2, 2: 1, 3: 0}})
+
+    def test_compare_with_list(self):
+        response = self.client.post(self.url, {'cards': [{'card': 1, 'quantity': 2}, {'card': 5}]}, format='json')
+        self.assertEqual(self._summary(response), {'added': {5: 1}, 'removed': {2: -1, 3: -1}, 'shared': {1: 0}})
+        response = self.client.post(self.url, {'cards': [{'card': 1, 'quantity': 0}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_by_version(self):
+        self.client.get(self.url, {'with': self.other_cube.pk})
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'with': self.other_cube.pk})
+        self.other_cube.remove_items_from_subcollection([self.items[2].pk])
+        response = self.client.get(self.url, {'with': self.other_cube.pk})
+        self.assertEqual(self._summary(response)['removed'], {2: -1, 3: -1})
+
+    def test_other_users_need_view_permission(self):
+        other = User.objects.create(email="other@domain.com", username="Other")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.url, {'with': 'owned'}).status_code, 404)
+        assign_perm('view_usersubcollection', other, self.cube)
+        self.assertEqual(self._summary(self.client.get(self.url, {'with': 'owned'}))['removed'], {1: -2, 2: -1, 3: -1})
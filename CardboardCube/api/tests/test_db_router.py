@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from db_router import ReplicaRoutingMiddleware, use_primary, use_replica
+from inventory.models import UserInventory
+from registration.models import User
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class TestPrimaryReplicaRouter(TestCase):
+    """
+    Tests for read/write routing between the primary and the replica
+    """
+    databases = {'default', 'replica'}
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = User.objects.get(email="test_user@domain.com")
+
+    def _run_request(self, method, view, cookies=None):
+        request = getattr(self.factory, method)('/api/inventory/')
+        request.COOKIES.update(cookies or {})
+        return ReplicaRoutingMiddleware(view)(request)
+
+    def test_reads_default_to_primary(self):
+        self.assertEqual(UserInventory.objects.all().db, 'default')
+
+    def test_use_replica(self):
+        with use_replica():
+            self.assertEqual(UserInventory.objects.all().db, 'replica')
+            with use_primary():
+                self.assertEqual(UserInventory.objects.all().db, 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'default'])
+    def test_pinned_replica(self):
+        for _ in range(10):
+            with use_replica(pinned=True):
+                self.assertEqual(len({UserInventory.objects.all().db for _ in range(20)}), 1)
+
+    def test_write_pins_context_to_primary(self):
+        with use_replica():
+            UserInventory.objects.filter(owner=self.user).update(owner=self.user)
+            self.assertEqual(UserInventory.objects.all().db, 'default')
+
+    def test_safe_request_reads_from_replica(self):
+        seen = []
+
+        def view(request):
+            seen.append(UserInventory.objects.all().db)
+            return HttpResponse()
+
+        response = self._run_request('get', view)
+        self.assertEqual(seen, ['replica'])
+        self.assertNotIn('cc_read_primary', response.cookies)
+
+    def test_unsafe_request_pins_client(self):
+        seen = []
+
+        def view(request):
+            seen.append(UserInventory.objects.all().db)
+            return HttpResponse()
+
+        response = self._run_request('post', view)
+        self.assertEqual(seen, ['default'])
+        self.assertIn('cc_read_primary', response.cookies)
+
+        self._run_request('get', view, cookies={'cc_read_primary': '1'})
+        self.assertEqual(seen, ['default', 'default'])
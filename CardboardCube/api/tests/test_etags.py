@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from inventory.models import InventoryItem, UserInventory, UserSubCollection
+from registration.models import User
+
+
+class TestConditionalGet(TestCase):
+    """
+    Tests for version-based ETags on the inventory and sub-collection endpoints
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.inventory = UserInventory.objects.get(owner=self.user)
+        self.collection = self.inventory.collections.first()
+        self.item = InventoryItem.objects.create(owner=self.user, card=Card.objects.get(pk=1), quantity_owned=2)
+
+    def assertNotModifiedUntil(self, url, mutate):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        mutate()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_inventory_etag(self):
+        self.assertNotModifiedUntil('/api/inventory/{}/'.format(self.user.pk),
+                                    lambda: self.inventory.add_items_to_inventory([self.item.pk]))
+
+    def test_subcollection_etag(self):
+        self.assertNotModifiedUntil('/api/subcollection/{}/'.format(self.collection.pk),
+                                    lambda: self.collection.add_items_to_subcollection([self.item.pk]))
+
+    def test_item_change_bumps_containing_subcollection(self):
+        self.collection.add_items_to_subcollection([self.item.pk])
+        url = '/api/subcollection/{}/'.format(self.collection.pk)
+
+        def mutate():
+            self.item.quantity_owned = 3
+            self.item.save()
+        self.assertNotModifiedUntil(url, mutate)
+
+    def test_no_etag_for_other_users(self):
+        other = User.objects.create(email="other@domain.com")
+        self.client.force_authenticate(user=other)
+        response = self.client.get('/api/subcollection/{}/'.format(self.collection.pk))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_mutators_raise_stored_versions(self):
+        def versions():
+            return (UserInventory.objects.get(pk=self.inventory.pk).version,
+                    UserSubCollection.objects.get(pk=self.collection.pk).version)
+
+        for mutate in (
+            lambda: self.inventory.add_items_to_inventory([self.item.pk]),
+            lambda: self.inventory.remove_items_from_inventory([self.item.pk]),
+            lambda: self.collection.add_items_to_subcollection([self.item.pk]),
+            lambda: self.collection.set_needed_quantities({self.item.pk: 3}),
+            lambda: self.collection.remove_items_from_subcollection([self.item.pk]),
+        ):
+            inventory_version, subcollection_version = versions()
+            mutate()
+            self.assertGreater(versions()[0], inventory_version)
+            self.assertGreaterEqual(versions()[1], subcollection_version)
+            self.assertEqual((self.inventory.version, self.collection.version), versions())
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.fast_serializers import (
+    GradingDetailsFastSerializer, InventoryItemFastSerializer, UserSubCollectionFastSerializer,
+)
+from api.renderers import ORJSONRenderer
+from api.serializers import GradingDetailsSerializer, InventoryItemSerializer, UserSubCollectionSerializer
+from card_catalog.models import Card
+from inventory.models import GradingDetails, InventoryItem, UserSubCollection
+from registration.models import User
+
+
+class TestFastSerializers(TestCase):
+    """
+    Tests that the fast serializers and renderer reproduce the ModelSerializer/JSONRenderer output
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.grading = GradingDetails.objects.create(
+            grading_service='BGS', serial_number='0012345678', overall_grade=Decimal('9.5'), edges_grade=Decimal('10'),
+        )
+        self.items = [
+            InventoryItem.objects.create(
+                owner=self.user, card=card, quantity_owned=card.pk % 3 + 1, is_foil=card.pk % 2 == 0,
+            )
+            for card in Card.objects.order_by('pk')[:10]
+        ]
+        self.items[0].is_graded = True
+        self.items[0].grading_details = self.grading
+        self.items[0].save()
+        self.cube = UserSubCollection.objects.filter(owner=self.user, kind='cube').first()
+        self.cube.add_items_to_subcollection([item.pk for item in self.items[:4]])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_items_match_model_serializer(self):
+        queryset = InventoryItem.objects.owned_by(self.user.pk).order_by('pk')
+        expected = InventoryItemSerializer(queryset, many=True).data
+        fast = InventoryItemFastSerializer().serialize(queryset)
+        self.assertEqual(fast, expected)
+        self.assertEqual([list(item) for item in fast], [list(item) for item in expected])
+        self.assertEqual(ORJSONRenderer().render(fast), JSONRenderer().render(expected))
+
+    def test_grading_details_match_model_serializer(self):
+        queryset = GradingDetails.objects.filter(pk=self.grading.pk)
+        expected = GradingDetailsSerializer(queryset, many=True).data
+        self.assertEqual(GradingDetailsFastSerializer().serialize(queryset), expected)
+
+    def test_expanded_grading_details_come_from_the_join(self):
+        queryset = InventoryItem.objects.owned_by(self.user.pk).order_by('pk')
+        with self.assertNumQueries(1):
+            items = InventoryItemFastSerializer(expand_grading=True).serialize(queryset)
+        graded = [item for item in items if item['grading_details'] is not None]
+        self.assertEqual(len(graded), 1)
+        self.assertEqual(graded[0]['grading_details'], GradingDetailsSerializer(self.grading).data)
+
+    def test_subcollections_match_model_serializer(self):
+        queryset = UserSubCollection.objects.filter(owner=self.user).order_by('pk')
+        expected = UserSubCollectionSerializer(queryset, many=True).data
+        with self.assertNumQueries(1):
+            fast = UserSubCollectionFastSerializer().serialize(queryset)
+        for row in expected + fast:
+            row['inventory_items'] = sorted(row['inventory_items'])
+        self.assertEqual(fast, expected)
+        self.assertEqual(ORJSONRenderer().render(fast), JSONRenderer().render(expected))
+
+    def test_item_list_endpoint(self):
+        response = self.client.get('/api/items/', {'subcollection': self.cube.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({item['uuid'] for item in response.json()}, {str(item.pk) for item in self.items[:4]})
+        self.assertEqual(self.client.get('/api/items/', {'subcollection': 'abc'}).status_code, 404)
+        other = User.objects.create(email="other@domain.com", username="Other")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get('/api/items/', {'subcollection': self.cube.pk}).status_code, 404)
+
+    def test_renderer_escapes_line_separators(self):
+        data = {'text': 'a\u2028b\u2029c'}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
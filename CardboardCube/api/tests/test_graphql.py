@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from inventory.models import GradingDetails, InventoryItem, UserInventory, UserSubCollection
+from registration.models import User
+
+NESTED = """
+query {
+  inventory {
+    id
+    subcollections {
+      kind
+      items {
+        quantity
+        item { display card { name types set { code } } grading { overallGrade } }
+      }
+    }
+  }
+}
+"""
+
+
+class TestGraphQL(TestCase):
+    """
+    Tests for the GraphQL read API
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.inventory = UserInventory.objects.get(owner=self.user)
+        self.subcollections = list(UserSubCollection.objects.filter(owner=self.user).order_by('pk'))
+
+    def add_items(self, card_ids):
+        grading = GradingDetails.objects.create(grading_service='PSA', serial_number='123', overall_grade=9)
+        items = [InventoryItem.objects.create(owner=self.user, card_id=card_id, quantity_owned=2, is_graded=True,
+                                              grading_details=grading if card_id % 2 else None)
+                 for card_id in card_ids]
+        self.inventory.add_items_to_inventory([item.pk for item in items])
+        for subcollection in self.subcollections:
+            subcollection.set_item_quantities({item.pk: 1 for item in items})
+
+    def query(self, query, variables=None):
+        return self.client.post('/api/graphql/', {'query': query, 'variables': variables}, format='json')
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.query(NESTED)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('errors', response.json())
+        return len(queries), response.json()['data']
+
+    def test_nested_query_runs_a_bounded_number_of_statements(self):
+        self.add_items(range(1, 3))
+        few, data = self.count_queries()
+        subcollection = data['inventory']['subcollections'][0]
+        self.assertEqual(len(subcollection['items']), 2)
+        self.assertEqual(subcollection['items'][0]['item']['card']['set']['code'], 'EXP')
+        self.assertEqual(subcollection['items'][0]['item']['grading']['overallGrade'], 9.0)
+
+        self.add_items(range(3, 20))
+        many, data = self.count_queries()
+        self.assertEqual(len(data['inventory']['subcollections'][0]['items']), 19)
+        self.assertEqual(few, many)
+
+    def test_items_page_and_cards(self):
+        self.add_items(range(1, 6))
+        query = 'query($first: Int) { items(first: $first) { id card { id } } cards(ids: [1, 2]) { name } }'
+        response = self.query(query, {'first': 3})
+        data = response.json()['data']
+        self.assertEqual(len(data['items']), 3)
+        after = data['items'][-1]['id']
+        response = self.query('query($after: ID) { items(after: $after) { id } }', {'after': after})
+        self.assertEqual(len(response.json()['data']['items']), 2)
+        self.assertEqual(len(data['cards']), 2)
+
+    def test_only_own_items(self):
+        other = User.objects.create(email='other@domain.com', username='other')
+        InventoryItem.objects.create(owner=other, card_id=1, quantity_owned=1)
+        self.assertEqual(self.query('{ items { id } }').json()['data']['items'], [])
+
+    @override_settings(GRAPHQL_MAX_DEPTH=3)
+    def test_depth_limit(self):
+        response = self.query(NESTED)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('depth', response.json()['errors'][0]['message'])
+
+    @override_settings(GRAPHQL_MAX_COST=1000)
+    def test_cost_limit(self):
+        self.assertEqual(self.query('{ items(first: 10) { id } }').status_code, 200)
+        response = self.query(NESTED)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cost', response.json()['errors'][0]['message'])
+
+    def test_lookup_limit(self):
+        pk = self.subcollections[0].pk
+        aliased = ' '.join(f'c{index}: subcollection(id: "{pk}") {{ kind }}' for index in range(21))
+        response = self.query(f'{{ {aliased} }}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('lookups', response.json()['errors'][0]['message'])
+        fragment = 'fragment S on Query { subcollection(id: "x") { kind } card(id: 1) { name } }'
+        response = self.query(f'{{ ...S ...S ...S }} {fragment}')
+        self.assertEqual(response.status_code, 200)
+        with self.settings(GRAPHQL_MAX_LOOKUPS=5):
+            self.assertEqual(self.query(f'{{ ...S ...S ...S }} {fragment}').status_code, 400)
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.query('{ items { ').status_code, 400)
+        self.assertEqual(self.query('{ items { nope } }').status_code, 400)
+        self.assertEqual(self.query('mutation { items { id } }').status_code, 400)
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().post('/api/graphql/', {'query': '{ items { id } }'}, format='json').status_code,
+                         403)
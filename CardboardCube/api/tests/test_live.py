@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import orjson
+from django.test import Client, TransactionTestCase, override_settings
+
+from api.live import RESYNC, Hub, live_events
+from inventory.live import LocalBroker, get_broker, inventory_channel, subcollection_channel
+from inventory.models import InventoryItem, UserInventory, UserSubCollection
+from registration.models import User
+
+
+class TestLiveEvents(TransactionTestCase):
+    """
+    Tests for live change events and the event stream. Events are published on commit, so these run
+    outside a wrapping test transaction.
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.inventory = UserInventory.objects.get(owner=self.user)
+        self.cube = UserSubCollection.objects.filter(owner=self.user, kind='cube').order_by('pk').first()
+        self.item = InventoryItem.objects.create(owner=self.user, card_id=1, quantity_owned=2)
+        self.broker = get_broker()
+        self.broker.published.clear()
+
+    def published(self):
+        return [(channels, orjson.loads(message)) for channels, message in self.broker.published]
+
+    def test_changes_published_to_their_channels(self):
+        self.cube.add_items_to_subcollection([self.item.pk])
+        channels, event = self.published()[-1]
+        self.assertEqual(channels, [inventory_channel(self.user.pk), subcollection_channel(self.cube.pk)])
+        self.assertEqual(event, {'t': 'S', 'o': 'U', 'ids': [str(self.item.pk)], 'c': str(self.cube.pk)})
+
+        self.broker.published.clear()
+        self.item.quantity_owned = 3
+        self.item.save()
+        channels, event = self.published()[-1]
+        self.assertIn(subcollection_channel(self.cube.pk), channels)
+        self.assertEqual(event['t'], 'I')
+
+    @override_settings(LIVE_MAX_IDS=1)
+    def test_large_batches_omit_ids(self):
+        other = InventoryItem.objects.create(owner=self.user, card_id=2, quantity_owned=1)
+        self.inventory.add_items_to_inventory([self.item.pk, other.pk])
+        channels, event = self.published()[-1]
+        self.assertIsNone(event['ids'])
+
+    def test_hub_fans_out(self):
+        async def run():
+            broker = LocalBroker()
+            hub = Hub(broker)
+            channel = subcollection_channel(self.cube.pk)
+            subscriptions = [await hub.subscribe([channel]) for _ in range(2000)]
+            other = await hub.subscribe([inventory_channel(self.user.pk)])
+            broker.publish([channel], b'{}')
+            await asyncio.sleep(0.01)
+            self.assertTrue(all(subscription.queue.qsize() == 1 for subscription in subscriptions))
+            self.assertEqual(other.queue.qsize(), 0)
+            for subscription in subscriptions:
+                await hub.unsubscribe(subscription)
+            self.assertNotIn(channel, hub.subscriptions)
+            hub.reader.cancel()
+        asyncio.run(run())
+
+    @override_settings(LIVE_QUEUE_SIZE=2)
+    def test_slow_subscriber_told_to_resync(self):
+        async def run():
+            broker = LocalBroker()
+            hub = Hub(broker)
+            subscription = await hub.subscribe(['live:test'])
+            for _ in range(3):
+                broker.publish(['live:test'], b'{}')
+            await asyncio.sleep(0.01)
+            messages = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+            self.assertEqual(messages[-1], RESYNC)
+            self.assertEqual(len(messages), 3)
+            hub.reader.cancel()
+        asyncio.run(run())
+
+    def stream(self, query_string, cookie=None, publish=None):
+        """
+        Run the stream until the first event (after calling `publish` once subscribed) or the response
+        ends, and return the status and body.
+        """
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/live/', 'query_string': query_string.encode(),
+                 'headers': [(b'cookie', f'sessionid={cookie}'.encode())] if cookie else []}
+        sent = []
+        stop = None
+
+        async def receive():
+            await stop.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if b'data: ' in message.get('body', b''):
+                stop.set()
+
+        async def run():
+            nonlocal stop
+            stop = asyncio.Event()
+            task = asyncio.ensure_future(live_events(scope, receive, send))
+            while publish and not sent and not task.done():
+                await asyncio.sleep(0.01)
+            if publish and not task.done():
+                await asyncio.get_event_loop().run_in_executor(None, publish)
+            await asyncio.wait_for(task, 5)
+        asyncio.run(run())
+        return sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:])
+
+    def test_stream(self):
+        self.assertEqual(self.stream('inventory=1')[0], 403)
+        client = Client()
+        client.force_login(self.user)
+        cookie = client.cookies['sessionid'].value
+        self.assertEqual(self.stream('subcollection=nope', cookie)[0], 400)
+
+        def publish():
+            self.cube.add_items_to_subcollection([self.item.pk])
+        status, body = self.stream(f'subcollection={self.cube.pk}', cookie, publish)
+        self.assertEqual(status, 200)
+        self.assertIn(f'"c":"{self.cube.pk}"'.encode(), body)
+
+        other = User.objects.create(email="other@domain.com", username="Other")
+        client.force_login(other)
+        self.assertEqual(self.stream(f'subcollection={self.cube.pk}', client.cookies['sessionid'].value)[0], 400)
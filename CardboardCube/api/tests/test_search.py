@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from inventory.models import CardSearchDocument, InventoryItem, UserInventory
+from registration.models import User
+
+
+class TestCardSearch(TestCase):
+    """
+    Tests for full-text search over owned cards
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.collection = UserInventory.objects.get(owner=self.user).collections.first()
+        self.arid_mesa = InventoryItem.objects.create(owner=self.user, card=Card.objects.get(pk=1), quantity_owned=1)
+        self.steam_vents = InventoryItem.objects.create(owner=self.user, card=Card.objects.get(pk=2), quantity_owned=1)
+
+    def test_documents_maintained_by_trigger(self):
+        self.assertEqual(CardSearchDocument.objects.count(), Card.objects.count())
+
+    def test_search_inventory(self):
+        response = self.client.get('/api/search/', {'q': 'sacrifice'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['inventory_item'] for row in response.data], [self.arid_mesa.pk])
+        self.assertIn('<b>Sacrifice</b>', response.data[0]['headline'])
+
+    def test_search_subcollection(self):
+        self.collection.add_items_to_subcollection([self.steam_vents.pk])
+        response = self.client.get('/api/search/', {'q': 'Mountain', 'subcollection': self.collection.pk})
+        self.assertEqual([row['inventory_item'] for row in response.data], [self.steam_vents.pk])
+
+    def test_search_requires_query(self):
+        response = self.client.get('/api/search/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_limit_clamped(self):
+        response = self.client.get('/api/search/', {'q': 'sacrifice', 'limit': -1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
@@ -1,10 +1,22 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from api.views import InventoryViewSet, SubCollectionViewSet
+from api.views import (
+    AnalyticsViewSet, CardSearchViewSet, ChangeViewSet, GraphQLView, InventoryItemViewSet, InventoryViewSet,
+    JobViewSet, RequestProfileViewSet, SubCollectionViewSet, UserViewSet,
+)
 
 router = routers.SimpleRouter()
 router.register('inventory', InventoryViewSet, basename='inventory')
+router.register('items', InventoryItemViewSet, basename='items')
 router.register('subcollection', SubCollectionViewSet, basename='subcollection')
+router.register('search', CardSearchViewSet, basename='search')
+router.register('changes', ChangeViewSet, basename='changes')
+router.register('jobs', JobViewSet, basename='jobs')
+router.register('profiles', RequestProfileViewSet, basename='profiles')
+router.register('analytics', AnalyticsViewSet, basename='analytics')
+router.register('users', UserViewSet, basename='users')
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('graphql/', GraphQLView.as_view(), name='graphql'),
+]
@@ -1,2 +1,10 @@
+from .analytics import AnalyticsViewSet
+from .changes import ChangeViewSet
+from .graphql import GraphQLView
 from .inventory import InventoryViewSet
+from .items import InventoryItemViewSet
+from .jobs import JobViewSet
+from .profiles import RequestProfileViewSet
 from .subcollection import SubCollectionViewSet
+from .search import CardSearchViewSet
+from .users import UserViewSet
@@ -0,0 +1,76 @@
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from inventory.analytics import as_of
+from inventory.models import AnalyticsFigure, InventoryItem, UserSubCollection
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class AnalyticsViewSet(viewsets.GenericViewSet):
+    """
+    Catalog-wide ownership and demand across all users, served from the nightly rollups (see
+    inventory.analytics). Every response gives the figures and `as_of`, when they were last current.
+    """
+
+    def _limit(self, request):
+        return min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+
+    def _cards(self, request, metric, dimension=''):
+        try:
+            limit = self._limit(request)
+        except ValueError:
+            return Response(status=400, data='limit must be an integer.')
+        figures = AnalyticsFigure.objects.filter(
+            partition__isnull=True, metric=metric, dimension=dimension
+        ).order_by('-quantity', 'card_id').values('card_id', 'card__name', 'card__set__code', 'quantity', 'holders')
+        return Response(status=200, data={'as_of': as_of(), 'results': [
+            {'card': row['card_id'], 'name': row['card__name'], 'set': row['card__set__code'],
+             'quantity': row['quantity'], 'holders': row['holders']}
+            for row in figures[:limit]
+        ]})
+
+    def _distribution(self, metric, choices):
+        labels = dict(choices)
+        figures = AnalyticsFigure.objects.filter(partition__isnull=True, metric=metric).order_by('-quantity')
+        return Response(status=200, data={'as_of': as_of(), 'results': [
+            {'code': figure.dimension, 'name': labels.get(figure.dimension), 'quantity': figure.quantity,
+             'holders': figure.holders}
+            for figure in figures
+        ]})
+
+    @action(detail=False, methods=['get'])
+    def owned(self, request):
+        """
+        Most-owned cards: copies owned and how many users own them.
+        """
+        return self._cards(request, AnalyticsFigure.OWNED)
+
+    @action(detail=False, methods=['get'])
+    def wanted(self, request):
+        """
+        Most-wanted cards: copies wanted and how many users want them.
+        """
+        return self._cards(request, AnalyticsFigure.WANTED)
+
+    @action(detail=False, methods=['get'])
+    def included(self, request):
+        """
+        Cards most included in sub-collections of `?kind=` (cube by default): copies and how many
+        sub-collections include them.
+        """
+        kinds = [kind for code, kind in UserSubCollection.KIND_CHOICES]
+        kind = request.query_params.get('kind', 'cube')
+        if kind not in kinds:
+            return Response(status=400, data=f'kind must be one of {kinds}.')
+        return self._cards(request, AnalyticsFigure.INCLUDED, kind)
+
+    @action(detail=False, methods=['get'])
+    def conditions(self, request):
+        return self._distribution(AnalyticsFigure.CONDITION, InventoryItem.CONDITION_CHOICES)
+
+    @action(detail=False, methods=['get'])
+    def languages(self, request):
+        return self._distribution(AnalyticsFigure.LANGUAGE, InventoryItem.LANGUAGE_CHOICES)
@@ -0,0 +1,43 @@
+from rest_framework import viewsets
+from rest_framework.response import Response
+
+from inventory.models import INITIAL_CURSOR, InventoryChange, decode_cursor, encode_cursor
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+
+
+class ChangeViewSet(viewsets.GenericViewSet):
+    """
+    Delta sync for clients: `GET /api/changes/?since=<cursor>` returns the requesting user's changes
+    after the cursor, oldest first, and the cursor to send next time. Without `since` the whole
+    (compacted) log is replayed, which rebuilds the current state from scratch.
+
+    Each change is {"t": target, "o": operation, "id": object id, "c": container id, "p": payload},
+    with empty keys left out. See InventoryChange for the target and operation codes.
+    """
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get('since') or INITIAL_CURSOR
+        try:
+            cursor = decode_cursor(since)
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            return Response(status=400, data='Invalid cursor or limit.')
+
+        rows = list(InventoryChange.objects.since(request.user.pk, cursor).values_list(
+            'txid', 'id', 'target', 'operation', 'object_id', 'container_id', 'payload'
+        )[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+
+        changes = []
+        for txid, change_id, target, operation, object_id, container_id, payload in rows:
+            change = {'t': target, 'o': operation, 'id': object_id}
+            if container_id:
+                change['c'] = container_id
+            if payload:
+                change['p'] = payload
+            changes.append(change)
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1]) if rows else since
+        return Response(status=200, data={'cursor': next_cursor, 'more': more, 'changes': changes})
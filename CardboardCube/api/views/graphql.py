@@ -0,0 +1,57 @@
+import json
+
+from django.conf import settings
+from graphql import GraphQLError, execute, parse, validate
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.gql.limits import check_limits
+from api.gql.loaders import Loaders
+from api.gql.schema import field_resolver, schema
+
+
+def _error(err):
+    return Response(status=400, data={'errors': [err.formatted]})
+
+
+class GraphQLView(APIView):
+    """
+    GraphQL reads over the requesting user's inventory (see api.gql.schema for the schema). Send
+    {"query", "variables", "operationName"} as a POST body or as GET parameters. Queries nested deeper
+    than GRAPHQL_MAX_DEPTH, or that could return more than GRAPHQL_MAX_COST objects, are refused
+    before running; the response's "extensions" report the depth and cost of those that run.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return self.run(request, request.query_params)
+
+    def post(self, request, *args, **kwargs):
+        return self.run(request, request.data)
+
+    def run(self, request, payload):
+        variables = payload.get('variables') or None
+        if isinstance(variables, str):
+            try:
+                variables = json.loads(variables)
+            except ValueError:
+                return _error(GraphQLError('variables must be a JSON object.'))
+        try:
+            document = parse(payload.get('query') or '')
+        except GraphQLError as err:
+            return _error(err)
+        errors = validate(schema, document)
+        if errors:
+            return Response(status=400, data={'errors': [error.formatted for error in errors]})
+        operation_name = payload.get('operationName')
+        try:
+            depth, cost = check_limits(schema, document, variables, operation_name, settings.GRAPHQL_MAX_DEPTH,
+                                       settings.GRAPHQL_MAX_COST, settings.GRAPHQL_MAX_LOOKUPS)
+        except GraphQLError as err:
+            return _error(err)
+
+        result = execute(schema, document, context_value=Loaders(request.user.pk), variable_values=variables,
+                         operation_name=operation_name, field_resolver=field_resolver)
+        data = {'data': result.data, 'extensions': {'depth': depth, 'cost': cost}}
+        if result.errors:
+            data['errors'] = [error.formatted for error in result.errors]
+        return Response(status=200, data=data)
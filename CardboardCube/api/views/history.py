@@ -0,0 +1,41 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+
+from inventory.history import changes_between, state_at
+from inventory.models import HistoryRecord
+
+
+def _parse_time(value):
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        # Well formed but impossible, e.g. 2024-02-30.
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def history_response(container, query_params):
+    """
+    The recorded history of an inventory or sub-collection: without parameters the points it was
+    recorded at, with `?at=<ISO datetime>` its contents at that time, and with `?since=...&at=...` how
+    its contents changed between the two.
+    """
+    if 'at' not in query_params:
+        points = HistoryRecord.objects.filter(container_id=container.pk).order_by('id')
+        return Response(status=200, data=[
+            {'taken_at': taken_at, 'version': version, 'checkpoint': is_checkpoint}
+            for taken_at, version, is_checkpoint in points.values_list('taken_at', 'version', 'is_checkpoint')
+        ])
+    at = _parse_time(query_params['at'])
+    since = _parse_time(query_params['since']) if 'since' in query_params else None
+    if at is None or ('since' in query_params and since is None):
+        return Response(status=400, data='at and since must be ISO 8601 datetimes.')
+    if since is not None:
+        return Response(status=200, data={'since': since, 'at': at, 'changes': changes_between(container, since, at)})
+    cards, taken_at = state_at(container, at)
+    if cards is None:
+        return Response(status=404, data='Nothing was recorded by then.')
+    return Response(status=200, data={'at': at, 'taken_at': taken_at, 'cards': cards})
@@ -1,12 +1,38 @@
-from django.core.exceptions import ObjectDoesNotExist
+import gzip
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from inventory.models import UserInventory
-from api.serializers import UserInventorySerializer
+from inventory.deletion import delete_inventory
+from inventory.models import SetCompletion, UserInventory
+from inventory.snapshots import get_snapshot
+from api.serializers import JobSerializer, UserInventorySerializer
+from api.views.history import history_response
 from registration.models import User
 
 
+def inventory_etag(request, pk=None, **kwargs):
+    """
+    Strong ETag built from the inventory's version, so an unchanged inventory answers with a 304
+    after a single indexed lookup.
+    """
+    if str(request.user.pk) != str(pk):
+        return None
+    try:
+        current = UserInventory.objects.filter(owner=pk).values_list('uuid', 'version').first()
+    except ValidationError:
+        return None
+    if current is None:
+        return None
+    return 'inventory-{}-{}'.format(*current)
+
+
 class InventoryViewSet(mixins.CreateModelMixin,
                        mixins.RetrieveModelMixin,
                        mixins.UpdateModelMixin,
@@ -14,6 +40,7 @@ class InventoryViewSet(mixins.CreateModelMixin,
                        viewsets.GenericViewSet):
     serializer_class = UserInventorySerializer
 
+    @method_decorator(condition(etag_func=inventory_etag))
     def retrieve(self, request, *args, **kwargs):
         owner = User.objects.get(pk=kwargs['pk'])
         if request.user != owner:
@@ -29,7 +56,66 @@ class InventoryViewSet(mixins.CreateModelMixin,
         return Response(status=200, data={'CREATE WORKED!!!!!!!!!!!!!!'})
 
     def destroy(self, request, *args, **kwargs):
-        return Response(status=200, data={'DESTROY WORKED!!!!!!!!!!!!!!'})
+        """
+        Hide the inventory at once and remove it in the background; poll the returned job. The items
+        themselves are kept.
+        """
+        if str(request.user.pk) != str(kwargs['pk']):
+            return Response(status=403, data='You are not the owner of this inventory.')
+        inventory = UserInventory.objects.filter(owner=request.user).first()
+        job = delete_inventory(inventory) if inventory is not None else None
+        if job is None:
+            return Response(status=404, data="No inventory found for user.")
+        return Response(status=202, data=JobSerializer(job).data)
 
     def update(self, request, *args, **kwargs):
         return Response(status=200, data={'UPDATE WORKED!!!!!!!!!!!!!!'})
+
+    @action(detail=True, methods=['get'])
+    @method_decorator(condition(etag_func=inventory_etag))
+    def snapshot(self, request, pk=None):
+        """
+        Every item the user owns, with card and grading details, plus the version and change log
+        cursor it reflects (continue from it with /api/changes/). Served from the snapshot cache, and
+        sent still gzip-compressed to clients that accept it.
+        """
+        if str(request.user.pk) != str(pk):
+            return Response(status=403, data='You are not the owner of this inventory.')
+        version = UserInventory.objects.filter(owner=request.user).values_list('version', flat=True).first() or 0
+        body = get_snapshot(request.user.pk, version)
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response = HttpResponse(body, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(body), content_type='application/json')
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    @action(detail=True, methods=['get'])
+    @method_decorator(condition(etag_func=inventory_etag))
+    def completion(self, request, pk=None):
+        """
+        For every set the user owns cards of: cards in the set, distinct cards owned (in total, in foil
+        and in non-foil) and the ids of the cards still missing.
+        """
+        if str(request.user.pk) != str(pk):
+            return Response(status=403, data='You are not the owner of this inventory.')
+        return Response(status=200, data=[
+            {
+                'set': row.card_set.code, 'name': row.card_set.name, 'total': row.total, 'owned': row.owned,
+                'foil': row.foil, 'nonfoil': row.nonfoil, 'missing': row.missing,
+            }
+            for row in SetCompletion.objects.for_owner(request.user.pk) if row.owned
+        ])
+
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """
+        What the inventory held at a point in the past, recorded nightly (see api.views.history).
+        """
+        if str(request.user.pk) != str(pk):
+            return Response(status=403, data='You are not the owner of this inventory.')
+        inventory = UserInventory.objects.filter(owner=request.user).first()
+        if inventory is None:
+            return Response(status=404, data="No inventory found for user.")
+        return history_response(inventory, request.query_params)
@@ -0,0 +1,42 @@
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from rest_framework import viewsets
+from rest_framework.response import Response
+
+from api.fast_serializers import InventoryItemFastSerializer
+from api.serializers import InventoryItemSerializer
+from inventory.models import InventoryItem, UserSubCollection
+
+
+class InventoryItemViewSet(viewsets.GenericViewSet):
+    """
+    Read access to the user's inventory items. The list is built by the fast serializer, so it stays
+    cheap for collections of tens of thousands of items.
+    """
+    serializer_class = InventoryItemSerializer
+
+    def get_queryset(self):
+        return InventoryItem.objects.owned_by(self.request.user.pk)
+
+    def list(self, request, *args, **kwargs):
+        """
+        All of the user's items, or with `?subcollection=<pk>` only that sub-collection's.
+        `?expand=grading_details` nests each item's grading details in place of its key.
+        """
+        queryset = self.get_queryset()
+        if request.query_params.get('subcollection'):
+            try:
+                subcollection = UserSubCollection.objects.get(
+                    pk=request.query_params['subcollection'], owner=request.user
+                )
+            except (ObjectDoesNotExist, ValidationError):
+                return Response(status=404, data="No sub-collection found for user.")
+            queryset = subcollection.get_inventory_items()
+        serializer = InventoryItemFastSerializer(expand_grading=request.query_params.get('expand') == 'grading_details')
+        return Response(status=200, data=serializer.serialize(queryset.order_by('pk')))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            item = self.get_queryset().get(pk=kwargs['pk'])
+        except (ObjectDoesNotExist, ValidationError):
+            return Response(status=404, data="No inventory item found for user.")
+        return Response(status=200, data=InventoryItemSerializer(item).data)
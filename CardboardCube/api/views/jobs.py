@@ -0,0 +1,34 @@
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from api.serializers import JobSerializer
+from jobs.exceptions import InvalidJobException
+from jobs.models import Job
+
+
+class JobViewSet(mixins.ListModelMixin,
+                 mixins.RetrieveModelMixin,
+                 viewsets.GenericViewSet):
+    """
+    Submit long-running operations as {"kind": ..., "params": {...}} and poll them for status,
+    progress and result.
+    """
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user).order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        try:
+            job = Job.objects.submit(request.user, request.data.get('kind'), request.data.get('params'))
+        except InvalidJobException as err:
+            return Response(status=400, data=err.args[0])
+        return Response(status=202, data=JobSerializer(job).data)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        job = self.get_object()
+        if not job.cancel():
+            return Response(status=409, data='Job has already finished.')
+        return Response(status=200, data=JobSerializer(job).data)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from api.serializers import RequestProfileSerializer
+from profiling.middleware import make_token
+from profiling.models import RequestProfile
+from profiling.sampler import to_collapsed
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class RequestProfileViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Staff-only access to captured request profiles (see profiling.middleware). The list is newest first
+    and can be narrowed with `?path=<prefix>`, `?user=<email>` and `?min_ms=<duration>`. A profile
+    downloads as a speedscope document, or as folded stacks for flame graph tools from
+    `/api/profiles/<id>/collapsed/`. `POST /api/profiles/token/` issues the token to send in `X-Profile`.
+    """
+    permission_classes = [IsAdminUser]
+    serializer_class = RequestProfileSerializer
+    queryset = RequestProfile.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        profiles = RequestProfile.objects.select_related('user').defer('speedscope').order_by('-created_at')
+        params = request.query_params
+        try:
+            limit = min(max(int(params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+            if params.get('min_ms'):
+                profiles = profiles.filter(duration_ms__gte=float(params['min_ms']))
+        except ValueError:
+            return Response(status=400, data='Invalid limit or min_ms.')
+        if params.get('path'):
+            profiles = profiles.filter(path__startswith=params['path'])
+        if params.get('user'):
+            profiles = profiles.filter(user__email=params['user'])
+        return Response(status=200, data=RequestProfileSerializer(profiles[:limit], many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        profile = self.get_object()
+        response = Response(status=200, data=profile.speedscope)
+        response['Content-Disposition'] = f'attachment; filename="{profile.pk}.speedscope.json"'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def token(self, request):
+        return Response(status=200, data={'token': make_token(request.user),
+                                          'expires_in': settings.PROFILING_TOKEN_AGE})
+
+    @action(detail=True, methods=['get'])
+    def collapsed(self, request, pk=None):
+        profile = self.get_object()
+        return HttpResponse(to_collapsed(profile.speedscope), content_type='text/plain; charset=utf-8')
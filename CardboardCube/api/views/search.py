@@ -0,0 +1,86 @@
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from card_catalog.models import Card
+from inventory.exceptions import SimilarityIndexUnavailableException
+from inventory.models import InventoryItem, UserSubCollection
+from inventory.search import search_inventory_items
+from inventory.similarity import schedule_build, similar_owned_cards
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class CardSearchViewSet(viewsets.GenericViewSet):
+    """
+    Full-text search over the names, type lines and oracle text of the cards in the requesting
+    user's inventory, or in one of their sub-collections when `subcollection` is given.
+    """
+
+    def list(self, request, *args, **kwargs):
+        query_text = request.query_params.get('q', '').strip()
+        if not query_text:
+            return Response(status=400, data='A search query is required.')
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            return Response(status=400, data='limit must be an integer.')
+
+        subcollection_pk = request.query_params.get('subcollection')
+        if subcollection_pk:
+            try:
+                subcollection = UserSubCollection.objects.get(pk=subcollection_pk, owner=request.user)
+            except (ObjectDoesNotExist, ValidationError):
+                return Response(status=404, data="No sub-collection found for user.")
+            inventory_items = subcollection.get_inventory_items()
+        else:
+            inventory_items = InventoryItem.objects.owned_by(request.user.pk)
+
+        results = search_inventory_items(inventory_items, query_text).values(
+            'uuid', 'quantity_owned', 'card_id', 'card__name', 'card__set__code', 'rank', 'headline',
+        )[:limit]
+        return Response(status=200, data=[
+            {
+                'inventory_item': row['uuid'],
+                'quantity_owned': row['quantity_owned'],
+                'card': row['card_id'],
+                'name': row['card__name'],
+                'set': row['card__set__code'],
+                'rank': row['rank'],
+                'headline': row['headline'],
+            }
+            for row in results
+        ])
+
+    @action(detail=False, methods=['get'])
+    def similar(self, request):
+        """
+        The user's cards most like `?card=<card id>` by colour identity, mana value, types, subtypes and
+        keywords, best first. `subcollection` restricts the search to one sub-collection and
+        `same_colors=1` to cards of exactly the same colour identity.
+        """
+        try:
+            card_id = int(request.query_params.get('card', ''))
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response(status=400, data='card and limit must be integers.')
+        items = None
+        subcollection_pk = request.query_params.get('subcollection')
+        if subcollection_pk:
+            try:
+                subcollection = UserSubCollection.objects.get(pk=subcollection_pk, owner=request.user)
+            except (ObjectDoesNotExist, ValidationError):
+                return Response(status=404, data="No sub-collection found for user.")
+            items = subcollection.get_inventory_items()
+        try:
+            similar = similar_owned_cards(request.user.pk, card_id, limit,
+                                          same_colors=request.query_params.get('same_colors') == '1', items=items)
+        except SimilarityIndexUnavailableException as err:
+            schedule_build()
+            return Response(status=503, data=err.args[0])
+        names = dict(Card.objects.filter(pk__in=[card.card_id for card in similar]).values_list('pk', 'name'))
+        return Response(status=200, data=[
+            {'card': card.card_id, 'name': names.get(card.card_id), 'score': round(card.score, 4)} for card in similar
+        ])
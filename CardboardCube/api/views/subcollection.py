@@ -1,12 +1,62 @@
-from django.core.exceptions import ObjectDoesNotExist
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from inventory.deletion import delete_subcollection
+from inventory.compare import ListSide, OwnedSide, SubCollectionSide, compare
+from inventory.exceptions import InvalidCardListException, InvalidFormatException
 from inventory.models import UserSubCollection
-from api.serializers import UserSubCollectionSerializer
+from inventory.shopping import fold_into_wanted, shopping_list
+from images.models import CardImage
+from images.pipeline import unavailable_cards
+from images.store import image_url
+from inventory.validation import get_format_rules, subcollection_pks, validate_subcollections
+from api.fast_serializers import UserSubCollectionFastSerializer
+from api.serializers import JobSerializer, UserSubCollectionSerializer
+from api.views.history import history_response
+from jobs.exceptions import InvalidJobException
+from jobs.models import Job
 from registration.models import User
 
 
+def subcollection_etag(request, pk=None, **kwargs):
+    """
+    Strong ETag built from the sub-collection's version.
+    """
+    try:
+        subcollection = UserSubCollection.objects.filter(pk=pk, owner=request.user.pk)
+        version = subcollection.values_list('version', flat=True).first()
+    except ValidationError:
+        return None
+    if version is None:
+        return None
+    return 'subcollection-{}-{}'.format(pk, version)
+
+
+def viewable_subcollection(user, pk):
+    """
+    A sub-collection the user owns or has been granted `view_usersubcollection` on, or None.
+    """
+    try:
+        subcollection = UserSubCollection.objects.get(pk=pk)
+    except (ObjectDoesNotExist, ValidationError):
+        return None
+    if subcollection.owner_id != user.pk and not user.has_perm('inventory.view_usersubcollection', subcollection):
+        return None
+    return subcollection
+
+
+def _violation_data(violations):
+    return {
+        str(pk): [{'rule': v.rule, 'card': v.card, 'message': v.message} for v in subcollection_violations]
+        for pk, subcollection_violations in violations.items()
+    }
+
+
 class SubCollectionViewSet(mixins.CreateModelMixin,
                        mixins.RetrieveModelMixin,
                        mixins.UpdateModelMixin,
@@ -14,14 +64,176 @@ class SubCollectionViewSet(mixins.CreateModelMixin,
                        viewsets.GenericViewSet):
     serializer_class = UserSubCollectionSerializer
 
+    def list(self, request, *args, **kwargs):
+        subcollections = UserSubCollection.objects.filter(owner=request.user).order_by('pk')
+        return Response(status=200, data=UserSubCollectionFastSerializer().serialize(subcollections))
+
+    @method_decorator(condition(etag_func=subcollection_etag))
     def retrieve(self, request, *args, **kwargs):
-        return Response(status=200, data={'RETRIEVE WORKED!!!!!!!!!!!!!!'})
+        try:
+            subcollection = UserSubCollection.objects.get(pk=kwargs['pk'], owner=request.user)
+        except (ObjectDoesNotExist, ValidationError):
+            return Response(status=404, data="No sub-collection found for user.")
+        serializer = UserSubCollectionSerializer(subcollection)
+        return Response(status=200, data=serializer.data)
 
     def create(self, request, *args, **kwargs):
         return Response(status=200, data={'CREATE WORKED!!!!!!!!!!!!!!'})
 
     def destroy(self, request, *args, **kwargs):
-        return Response(status=200, data={'DESTROY WORKED!!!!!!!!!!!!!!'})
+        """
+        Hide the sub-collection at once and remove it in the background; poll the returned job.
+        """
+        try:
+            subcollection = UserSubCollection.objects.get(pk=kwargs['pk'], owner=request.user)
+        except (ObjectDoesNotExist, ValidationError):
+            return Response(status=404, data="No sub-collection found for user.")
+        job = delete_subcollection(subcollection)
+        if job is None:
+            return Response(status=404, data="No sub-collection found for user.")
+        return Response(status=202, data=JobSerializer(job).data)
 
     def update(self, request, *args, **kwargs):
         return Response(status=200, data={'UPDATE WORKED!!!!!!!!!!!!!!'})
+
+    @action(detail=True, methods=['get'])
+    def validate(self, request, pk=None):
+        """
+        Check one sub-collection against the rules of `?format=<name>`.
+        """
+        try:
+            subcollection = UserSubCollection.objects.get(pk=pk, owner=request.user)
+        except (ObjectDoesNotExist, ValidationError):
+            return Response(status=404, data="No sub-collection found for user.")
+        try:
+            violations = validate_subcollections([subcollection], request.query_params.get('format'),
+                                                 owner=request.user.pk)
+        except InvalidFormatException as err:
+            return Response(status=400, data=err.args[0])
+        return Response(status=200, data=_violation_data(violations)[str(subcollection.pk)])
+
+    @action(detail=False, methods=['post'], url_path='validate')
+    def validate_many(self, request):
+        """
+        Check a batch of sub-collections, posted as {"format": ..., "subcollections": [...]}, in one pass.
+        """
+        try:
+            rules = get_format_rules(request.data.get('format'))
+            pks = set(subcollection_pks(request.data.get('subcollections', [])))
+        except InvalidFormatException as err:
+            return Response(status=400, data=err.args[0])
+        # Check ownership before scanning anyone's memberships.
+        if UserSubCollection.objects.filter(owner=request.user, pk__in=pks).count() != len(pks):
+            return Response(status=404, data="No sub-collection found for user.")
+        violations = validate_subcollections(list(pks), rules, owner=request.user.pk)
+        return Response(status=200, data=_violation_data(violations))
+
+    @action(detail=False, methods=['get', 'post'], url_path='shopping-list')
+    def shopping_list(self, request):
+        """
+        Cards still to acquire for the sub-collections in `?subcollections=<pk>,<pk>` (or POSTed as
+        {"subcollections": [...], "identity": ..., "update_wanted": true}) after subtracting the copies
+        already allocated to them and the user's unallocated copies. `identity=name` matches cards by
+        name across printings, and "update_wanted" raises quantity_wanted to cover each shortfall.
+        """
+        if request.method == 'POST':
+            pks, identity = request.data.get('subcollections') or [], request.data.get('identity', 'card')
+        else:
+            pks = [pk for pk in request.query_params.get('subcollections', '').split(',') if pk]
+            identity = request.query_params.get('identity', 'card')
+        try:
+            pks = sorted({str(pk) for pk in pks})
+            owned = UserSubCollection.objects.filter(owner=request.user, pk__in=pks).count()
+        except (TypeError, ValidationError):
+            owned = None
+        if owned is None or owned != len(pks):
+            return Response(status=404, data="No sub-collection found for user.")
+        try:
+            entries = shopping_list(request.user.pk, pks, identity)
+        except InvalidCardListException as err:
+            return Response(status=400, data=err.args[0])
+        data = {'cards': entries}
+        if request.method == 'POST' and request.data.get('update_wanted'):
+            data['updated'] = fold_into_wanted(request.user.pk, entries)
+        return Response(status=200, data=data)
+
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """
+        What the sub-collection held at a point in the past, recorded nightly (see api.views.history).
+        """
+        try:
+            subcollection = UserSubCollection.objects.get(pk=pk, owner=request.user)
+        except (ObjectDoesNotExist, ValidationError):
+            return Response(status=404, data="No sub-collection found for user.")
+        return history_response(subcollection, request.query_params)
+
+    @action(detail=True, methods=['post'])
+    def simulate(self, request, pk=None):
+        """
+        Start a draft simulation of a cube, posted as {"drafts", "drafters", "packs", "pack_size", "seed"}
+        (all optional). Follow the returned job at /api/jobs/<uuid>/ for its statistics.
+        """
+        params = {key: request.data[key] for key in ('drafts', 'drafters', 'packs', 'pack_size', 'seed')
+                  if key in request.data}
+        try:
+            job = Job.objects.submit(request.user, 'draft_simulation', dict(params, subcollection=pk))
+        except InvalidJobException as err:
+            return Response(status=400, data=err.args[0])
+        return Response(status=202, data=JobSerializer(job).data)
+
+    @action(detail=True, methods=['get', 'post'])
+    def compare(self, request, pk=None):
+        """
+        Compare a sub-collection with `?with=<sub-collection>`, with `?with=owned` (everything the user
+        owns) or, when POSTed, with a list of {"card": <card id>, "quantity": n} entries in "cards".
+        `?identity=name` matches cards by name instead of by printing.
+        """
+        subcollection = viewable_subcollection(request.user, pk)
+        if subcollection is None:
+            return Response(status=404, data="No sub-collection found for user.")
+        other = request.query_params.get('with')
+        try:
+            if request.method == 'POST':
+                right = ListSide(request.data.get('cards'))
+            elif other == 'owned':
+                right = OwnedSide(request.user.pk)
+            else:
+                other = viewable_subcollection(request.user, other)
+                if other is None:
+                    return Response(status=404, data="No sub-collection found for user.")
+                right = SubCollectionSide(other)
+            result = compare(SubCollectionSide(subcollection), right, request.query_params.get('identity', 'card'))
+        except InvalidCardListException as err:
+            return Response(status=400, data=err.args[0])
+        return Response(status=200, data=result)
+
+    @action(detail=True, methods=['get'])
+    def images(self, request, pk=None):
+        """
+        Local image URLs, by variant, for every card in a sub-collection. Cards whose images are not
+        cached yet are listed under "missing" and fetched by a card_images job. Cards with no image to
+        fetch, or whose fetch failed recently (see IMAGE_RETRY_AFTER), are listed under "unavailable"
+        instead and not fetched again until then.
+        """
+        subcollection = viewable_subcollection(request.user, pk)
+        if subcollection is None:
+            return Response(status=404, data="No sub-collection found for user.")
+        card_pks = set(subcollection.get_inventory_items().exclude(card=None).values_list('card_id', flat=True))
+        images = {}
+        for card_pk, digest, variants in CardImage.objects.filter(card__in=card_pks, image__isnull=False).values_list(
+            'card_id', 'image_id', 'image__variants'
+        ):
+            images[card_pk] = {variant: image_url(digest, variant) for variant in variants}
+        unavailable = unavailable_cards(card_pks - set(images))
+        missing = sorted(card_pks - set(images) - unavailable)
+        job = None
+        if missing:
+            job = Job.objects.filter(owner=request.user, kind='card_images', status__in=Job.ACTIVE_STATUSES).first()
+            if job is None:
+                # Any left over are still missing once this job is done, and go in the next one.
+                job = Job.objects.submit(request.user, 'card_images', {'cards': missing[:settings.IMAGE_JOB_MAX_CARDS]})
+        return Response(status=200, data={
+            'images': images, 'missing': missing, 'unavailable': sorted(unavailable),
+            'job': JobSerializer(job).data if job else None,
+        })
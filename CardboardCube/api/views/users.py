@@ -0,0 +1,18 @@
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from api.serializers import UserSerializer
+from registration.models import User
+
+
+class UserViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Public profiles (username and avatar variant URLs) of users; `/api/users/me/` is the logged in user's.
+    """
+    serializer_class = UserSerializer
+    queryset = User.objects.select_related('avatar_image')
+
+    @action(detail=False, methods=['get'])
+    def me(self, request):
+        return Response(status=200, data=UserSerializer(self.get_queryset().get(pk=request.user.pk)).data)
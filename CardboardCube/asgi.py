@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+ASGI config for CardboardCube project.
+It exposes the ASGI callable as a module-level variable named ``application``. Requests for the live
+event stream (api.live) are answered directly; everything else goes to Django. Serve the project
+with this module rather than wsgi.py to enable live updates.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+
+django_application = get_asgi_application()
+
+from api.live import LIVE_PATH, live_events  # noqa: E402 (needs the apps loaded above)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == LIVE_PATH:
+        await live_events(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
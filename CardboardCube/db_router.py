@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Routing of ORM reads between the primary database and its read replicas.
+
+Reads go to the primary unless the current context has opted in to the replicas, either because
+``ReplicaRoutingMiddleware`` is handling a safe (GET/HEAD/OPTIONS) request, or because the code is
+wrapped in ``use_replica()`` (reporting/analytics work). Any write in that context pins the rest of
+it to the primary, and the middleware keeps a client pinned for ``REPLICA_PIN_SECONDS`` after a
+write so users always read their own writes.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY_DB = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+class _RoutingContext(object):
+
+    def __init__(self, read_from_replica, alias=None):
+        self.read_from_replica = read_from_replica
+        self.alias = alias
+        self.wrote = False
+
+
+@contextmanager
+def _routing_context(read_from_replica, alias=None):
+    context = _RoutingContext(read_from_replica, alias)
+    stack = _stack()
+    stack.append(context)
+    try:
+        yield context
+    finally:
+        stack.pop()
+        if context.wrote and stack:
+            stack[-1].wrote = True
+
+
+def use_replica(pinned=False):
+    """
+    Send reads inside the block to a replica, e.g. for reporting and analytics queries. Each read goes
+    to any replica unless `pinned`, in which case they all go to one, so reads that must agree with
+    each other are never served by replicas with different lag.
+    """
+    replicas = get_replicas()
+    alias = random.choice(replicas) if pinned and replicas else None
+    return _routing_context(read_from_replica=True, alias=alias)
+
+
+def use_primary():
+    """
+    Force every read inside the block onto the primary.
+    """
+    return _routing_context(read_from_replica=False)
+
+
+def get_replicas():
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', []) if alias in settings.DATABASES]
+
+
+class PrimaryReplicaRouter(object):
+    """
+    Database router that implements the rules described in the module docstring.
+    """
+
+    def db_for_read(self, model, **hints):
+        stack = _stack()
+        if not stack:
+            return PRIMARY_DB
+        context = stack[-1]
+        if not context.read_from_replica or context.wrote:
+            return PRIMARY_DB
+        if context.alias is not None:
+            return context.alias
+        replicas = get_replicas()
+        if not replicas:
+            return PRIMARY_DB
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        stack = _stack()
+        if stack:
+            stack[-1].wrote = True
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY_DB, *get_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema from the primary through replication.
+        return db == PRIMARY_DB
+
+
+class ReplicaRoutingMiddleware(object):
+    """
+    Route reads for safe requests to the replicas and pin the client to the primary after it writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        read_from_replica = request.method in SAFE_METHODS and not pinned
+        with _routing_context(read_from_replica) as context:
+            response = self.get_response(request)
+        if context.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class ImagesConfig(AppConfig):
+    name = 'images'
+
+    def ready(self):
+        from images import job_handlers, signals  # noqa: F401
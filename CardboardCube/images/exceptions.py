@@ -0,0 +1,12 @@
+class ImageError(Exception):
+
+    def __init__(self, msg, *args, **kwargs):
+        super(ImageError, self).__init__(msg)
+
+
+class ImageFetchException(ImageError):
+    pass
+
+
+class InvalidImageException(ImageError):
+    pass
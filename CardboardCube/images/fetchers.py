@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Fetchers retrieve the bytes of remote images. settings.IMAGE_FETCHER picks the implementation, so
+tests can read from a local directory instead of the card CDN.
+"""
+import os
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from images.exceptions import ImageFetchException
+
+
+class ImageFetcher(object):
+
+    def fetch(self, url):
+        """
+        Return the image at `url` as bytes, raising ImageFetchException if it cannot be retrieved.
+        """
+        raise NotImplementedError
+
+
+class HttpFetcher(ImageFetcher):
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def fetch(self, url):
+        try:
+            response = self.session.get(url, timeout=settings.IMAGE_FETCH_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as err:
+            raise ImageFetchException({'Errors': f'Unable to fetch {url}: {err}'})
+        return response.content
+
+
+class LocalDirectoryFetcher(ImageFetcher):
+    """
+    Serves each URL from the file with the same name in settings.IMAGE_FETCHER_DIRECTORY.
+    """
+
+    def fetch(self, url):
+        path = os.path.join(settings.IMAGE_FETCHER_DIRECTORY, os.path.basename(urlparse(url).path))
+        try:
+            with open(path, 'rb') as image_file:
+                return image_file.read()
+        except OSError as err:
+            raise ImageFetchException({'Errors': f'Unable to fetch {url}: {err}'})
+
+
+def get_fetcher():
+    return import_string(settings.IMAGE_FETCHER)()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+
+from images.pipeline import cache_card_images
+from inventory.models import InventoryItem
+from jobs.exceptions import InvalidJobException
+from jobs.registry import JobHandler, register_handler
+
+
+@register_handler
+class CardImagesHandler(JobHandler):
+    """
+    Copy card images into the local image store, {"cards": [<card id>, ...]}, at most
+    IMAGE_JOB_MAX_CARDS at a time. Staff can fetch any cards and pass "refresh": true to fetch cached
+    images again; other users only the cards in their inventory that are not cached yet.
+    """
+    kind = 'card_images'
+    chunk_size = 100
+
+    def clean(self, owner, params):
+        cards = params.get('cards')
+        if not isinstance(cards, list) or not cards or not all(isinstance(card, int) for card in cards):
+            raise InvalidJobException({'Errors': 'cards must be a non-empty list of card ids.'})
+        cards = sorted(set(cards))
+        if len(cards) > settings.IMAGE_JOB_MAX_CARDS:
+            raise InvalidJobException({'Errors': f'At most {settings.IMAGE_JOB_MAX_CARDS} cards per job.'})
+        refresh = bool(params.get('refresh'))
+        if not owner.is_staff:
+            if refresh:
+                raise InvalidJobException({'Errors': 'Only staff can refresh cached images.'})
+            owned = InventoryItem.objects.owned_by(owner.pk).filter(card__in=cards).values_list('card', flat=True)
+            if len(set(owned)) != len(cards):
+                raise InvalidJobException({'Errors': 'cards must be cards in your inventory.'})
+        return {'cards': cards, 'refresh': refresh}
+
+    def chunks(self, job):
+        cards = job.params['cards']
+        return [cards[start:start + self.chunk_size] for start in range(0, len(cards), self.chunk_size)]
+
+    def run_chunk(self, job, cards):
+        return cache_card_images(cards, refresh=job.params['refresh'])
+
+    def combine(self, job, results):
+        return {key: sum(result[key] for result in results) for key in ('stored', 'failed')}
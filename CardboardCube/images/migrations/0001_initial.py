@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('card_catalog', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('content_type', models.CharField(max_length=32)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('size', models.PositiveIntegerField(help_text='Size of the original in bytes')),
+                ('variants', models.JSONField(default=list, help_text='Names of the rendered variants')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stored Image',
+                'verbose_name_plural': 'Stored Images',
+            },
+        ),
+        migrations.CreateModel(
+            name='CardImage',
+            fields=[
+                ('card', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stored_image', serialize=False, to='card_catalog.Card')),
+                ('source_url', models.TextField(help_text='Image URL the copy was fetched from')),
+                ('error', models.TextField(help_text='Why the last fetch failed', null=True)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+                ('image', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='images.StoredImage')),
+            ],
+            options={
+                'verbose_name': 'Card Image',
+                'verbose_name_plural': 'Card Images',
+            },
+        ),
+        migrations.CreateModel(
+            name='AvatarImage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='avatar_image', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('source_name', models.CharField(help_text='Avatar file the copy was made from', max_length=256)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='images.StoredImage')),
+            ],
+            options={
+                'verbose_name': 'Avatar Image',
+                'verbose_name_plural': 'Avatar Images',
+            },
+        ),
+    ]
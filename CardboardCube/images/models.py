@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class StoredImage(models.Model):
+    """
+    Class to record an image held in the content-addressed image store, keyed by its SHA-256.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    content_type = models.CharField(max_length=32)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    size = models.PositiveIntegerField(help_text=_("Size of the original in bytes"))
+    variants = models.JSONField(default=list, help_text=_("Names of the rendered variants"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Stored Image')
+        verbose_name_plural = _('Stored Images')
+
+    def __str__(self):
+        return self.digest
+
+
+class CardImage(models.Model):
+    """
+    Class to link a catalog card to the local copy of its image.
+    """
+    card = models.OneToOneField('card_catalog.Card', on_delete=models.CASCADE, primary_key=True,
+                                related_name='stored_image')
+    source_url = models.TextField(help_text=_("Image URL the copy was fetched from"))
+    image = models.ForeignKey('StoredImage', null=True, on_delete=models.SET_NULL, related_name='+')
+    error = models.TextField(null=True, help_text=_("Why the last fetch failed"))
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Card Image')
+        verbose_name_plural = _('Card Images')
+
+
+class AvatarImage(models.Model):
+    """
+    Class to link a user to the stored copy of their uploaded avatar.
+    """
+    user = models.OneToOneField('registration.User', on_delete=models.CASCADE, primary_key=True,
+                                related_name='avatar_image')
+    source_name = models.CharField(max_length=256, help_text=_("Avatar file the copy was made from"))
+    image = models.ForeignKey('StoredImage', on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        verbose_name = _('Avatar Image')
+        verbose_name_plural = _('Avatar Images')
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Fetching, storing and rendering images. Network and Pillow work runs in a thread pool (Pillow
+releases the GIL while decoding, resizing and encoding); the database is only touched from the
+calling thread, in bulk.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from card_catalog.models import Card
+from images.exceptions import ImageError
+from images.fetchers import get_fetcher
+from images.models import AvatarImage, CardImage, StoredImage
+from images.store import ImageStore, digest_of
+from images.variants import AVATAR_VARIANTS, CARD_VARIANTS, inspect, render
+
+
+def _store(store, content, variant_names):
+    """
+    Store an image and its variants, returning an unsaved StoredImage describing it.
+    """
+    content_type, width, height = inspect(content)
+    # Render first, so an image that cannot be decoded leaves nothing behind in the store.
+    variants = render(content, variant_names)
+    digest = digest_of(content)
+    store.put(digest, content)
+    for name, variant in variants.items():
+        store.put(digest, variant, name)
+    return StoredImage(digest=digest, content_type=content_type, width=width, height=height, size=len(content),
+                       variants=list(variant_names))
+
+
+def _save_images(images):
+    StoredImage.objects.bulk_create(list({image.digest: image for image in images}.values()), ignore_conflicts=True)
+
+
+def cache_card_images(card_pks, refresh=False):
+    """
+    Copy the images of the given cards into the image store, skipping cards already cached unless
+    `refresh` is set. Returns {"stored": n, "failed": n}.
+    """
+    cards = Card.objects.filter(pk__in=card_pks).exclude(image_url__isnull=True).exclude(image_url='')
+    if not refresh:
+        cards = cards.exclude(stored_image__image__isnull=False)
+    cards = list(cards.values_list('pk', 'image_url'))
+    store, fetcher = ImageStore(), get_fetcher()
+
+    def cache_one(card):
+        card_pk, url = card
+        try:
+            return card_pk, url, _store(store, fetcher.fetch(url), CARD_VARIANTS), None
+        except ImageError as err:
+            return card_pk, url, None, str(err.args[0])
+
+    with ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS) as pool:
+        results = list(pool.map(cache_one, cards))
+
+    with transaction.atomic():
+        _save_images([image for card_pk, url, image, error in results if image is not None])
+        CardImage.objects.filter(card__in=[card_pk for card_pk, url, image, error in results]).delete()
+        CardImage.objects.bulk_create([
+            CardImage(card_id=card_pk, source_url=url, image_id=image.digest if image else None, error=error)
+            for card_pk, url, image, error in results
+        ])
+    failed = sum(1 for result in results if result[3])
+    return {'stored': len(results) - failed, 'failed': failed}
+
+
+def unavailable_cards(card_pks):
+    """
+    Of the given cards, those not worth fetching now: cards without an image URL, and cards whose last
+    fetch failed less than IMAGE_RETRY_AFTER seconds ago.
+    """
+    retry_before = timezone.now() - timedelta(seconds=settings.IMAGE_RETRY_AFTER)
+    no_url = Card.objects.filter(Q(image_url__isnull=True) | Q(image_url=''), pk__in=card_pks)
+    failed = CardImage.objects.filter(card__in=card_pks, image__isnull=True, fetched_at__gt=retry_before)
+    return set(no_url.values_list('pk', flat=True)) | set(failed.values_list('card_id', flat=True))
+
+
+def cache_avatar(user):
+    """
+    Store a user's uploaded avatar and its resized variants.
+    """
+    if not user.avatar:
+        AvatarImage.objects.filter(user=user).delete()
+        return None
+    with user.avatar.open('rb') as avatar:
+        content = avatar.read()
+    image = _store(ImageStore(), content, AVATAR_VARIANTS)
+    _save_images([image])
+    avatar_image, created = AvatarImage.objects.update_or_create(
+        user=user, defaults={'source_name': user.avatar.name, 'image_id': image.digest}
+    )
+    return avatar_image
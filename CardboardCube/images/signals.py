@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from images.models import AvatarImage
+from registration.models import User
+
+
+@receiver(post_save, sender=User)
+def cache_uploaded_avatar(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    stored = AvatarImage.objects.filter(user=instance).values_list('source_name', flat=True).first()
+    if (instance.avatar.name or None) != stored:
+        from images.tasks import cache_user_avatar
+        transaction.on_commit(lambda: cache_user_avatar.delay(str(instance.pk)))
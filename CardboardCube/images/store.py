@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed image files. Every image is stored once, under the SHA-256 of its bytes, and its
+resized variants sit next to it, so a file's name never points at different content and can be
+cached forever by clients and any CDN in front of IMAGE_URL.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+ORIGINAL = 'original'
+
+
+def digest_of(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def image_url(digest, variant=ORIGINAL):
+    return f'{settings.IMAGE_URL}{digest}/{variant}'
+
+
+class ImageStore(object):
+
+    def __init__(self, location=None):
+        self.storage = FileSystemStorage(location=location or settings.IMAGE_STORE_ROOT)
+
+    def name(self, digest, variant=ORIGINAL):
+        return f'{digest[:2]}/{digest}/{variant}'
+
+    def exists(self, digest, variant=ORIGINAL):
+        return self.storage.exists(self.name(digest, variant))
+
+    def put(self, digest, content, variant=ORIGINAL):
+        """
+        Write a file unless it is already stored; content addressing makes a rewrite a no-op.
+        """
+        name = self.name(digest, variant)
+        if not self.storage.exists(name):
+            self.storage.save(name, ContentFile(content))
+
+    def open(self, digest, variant=ORIGINAL):
+        return self.storage.open(self.name(digest, variant), 'rb')
+
+    def read(self, digest, variant=ORIGINAL):
+        with self.open(digest, variant) as image_file:
+            return image_file.read()
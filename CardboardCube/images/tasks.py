@@ -0,0 +1,11 @@
+from celery import shared_task
+
+from images.pipeline import cache_avatar
+from registration.models import User
+
+
+@shared_task
+def cache_user_avatar(user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        cache_avatar(user)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from images.models import CardImage, StoredImage
+from images.pipeline import cache_avatar, cache_card_images
+from images.store import ImageStore, digest_of, image_url
+from inventory.models import InventoryItem, UserInventory
+from jobs.models import Job
+from registration.models import User
+
+
+def _jpeg(color, size=(488, 680)):
+    output = io.BytesIO()
+    Image.new('RGB', size, color).save(output, 'JPEG')
+    return output.getvalue()
+
+
+class TestImages(TestCase):
+    """
+    Tests for the local image store, thumbnail pipeline and image serving
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(IMAGE_FETCHER_DIRECTORY=self.directory, MEDIA_ROOT=self.directory)
+        self.settings_override.enable()
+        self.arid_mesa, self.steam_vents, self.fountain = Card.objects.filter(pk__in=[1, 2, 3]).order_by('pk')
+        # The first two cards share an image file's bytes; the third has no file to fetch.
+        for card in (self.arid_mesa, self.steam_vents):
+            with open(os.path.join(self.directory, os.path.basename(card.image_url)), 'wb') as image_file:
+                image_file.write(_jpeg('red'))
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory)
+
+    def test_cache_card_images(self):
+        self.assertEqual(cache_card_images([1, 2, 3]), {'stored': 2, 'failed': 1})
+        images = {image.card_id: image for image in CardImage.objects.all()}
+        self.assertEqual(images[1].image_id, images[2].image_id)
+        self.assertIsNone(images[3].image_id)
+        self.assertIn('Unable to fetch', images[3].error)
+
+        stored = StoredImage.objects.get()
+        self.assertEqual((stored.content_type, stored.width, stored.height), ('image/jpeg', 488, 680))
+        with Image.open(ImageStore().open(stored.digest, 'thumb.webp')) as thumb:
+            self.assertEqual((thumb.format, thumb.width), ('WEBP', 146))
+        # Already cached cards are skipped.
+        self.assertEqual(cache_card_images([1, 2]), {'stored': 0, 'failed': 0})
+
+    def test_truncated_image_fails_alone(self):
+        truncated = _jpeg('green')[:2000]
+        with open(os.path.join(self.directory, os.path.basename(self.steam_vents.image_url)), 'wb') as image_file:
+            image_file.write(truncated)
+        self.assertEqual(cache_card_images([1, 2, 3]), {'stored': 1, 'failed': 2})
+        images = {image.card_id: image for image in CardImage.objects.all()}
+        self.assertIsNotNone(images[1].image_id)
+        self.assertIsNone(images[2].image_id)
+        self.assertIn('Unreadable image', images[2].error)
+        self.assertFalse(ImageStore().exists(digest_of(truncated)))
+
+    def test_serve_image(self):
+        cache_card_images([1])
+        digest = CardImage.objects.get(card=1).image_id
+        response = self.client.get(f'/images/{digest}/thumb')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get(f'/images/{digest}/thumb', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(f'/images/{digest}/nonsense').status_code, 404)
+
+    def test_subcollection_images(self):
+        cube = UserInventory.objects.get(owner=self.user).cubes.first()
+        items = [InventoryItem.objects.create(owner=self.user, card=card, quantity_owned=1)
+                 for card in (self.arid_mesa, self.fountain)]
+        cube.add_items_to_subcollection([item.pk for item in items])
+        cache_card_images([1])
+
+        response = self.client.get(f'/api/subcollection/{cube.pk}/images/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['images'][1]), {'thumb', 'thumb.webp', 'webp'})
+        self.assertEqual(response.data['missing'], [3])
+        self.assertEqual(Job.objects.get(pk=response.data['job']['uuid']).params['cards'], [3])
+
+        # A failed fetch is not retried until IMAGE_RETRY_AFTER has passed.
+        Job.objects.update(status=Job.FAILED)
+        cache_card_images([3])
+        response = self.client.get(f'/api/subcollection/{cube.pk}/images/')
+        self.assertEqual(response.data['missing'], [])
+        self.assertEqual(response.data['unavailable'], [3])
+        self.assertIsNone(response.data['job'])
+        CardImage.objects.filter(card=3).update(fetched_at=timezone.now() - timedelta(days=2))
+        response = self.client.get(f'/api/subcollection/{cube.pk}/images/')
+        self.assertEqual(response.data['missing'], [3])
+
+    def test_card_images_job_limits(self):
+        InventoryItem.objects.create(owner=self.user, card=self.arid_mesa, quantity_owned=1)
+
+        def submit(client, **params):
+            return client.post('/api/jobs/', {'kind': 'card_images', 'params': params}, format='json').status_code
+
+        self.assertEqual(submit(self.client, cards=[1], refresh=True), 400)
+        self.assertEqual(submit(self.client, cards=[1, 2]), 400)
+        self.assertEqual(submit(self.client, cards=[1]), 202)
+        staff = APIClient()
+        staff.force_authenticate(user=User.objects.create_user('staff@domain.com', username='staff', is_staff=True))
+        self.assertEqual(submit(staff, cards=[1, 2], refresh=True), 202)
+        with self.settings(IMAGE_JOB_MAX_CARDS=1):
+            self.assertEqual(submit(staff, cards=[1, 2]), 400)
+
+    def test_cache_avatar(self):
+        self.user.avatar = SimpleUploadedFile('avatar.png', _jpeg('blue', (512, 512)), content_type='image/jpeg')
+        self.user.save()
+        self.assertIsNone(self.client.get('/api/users/me/').data['avatar'])
+        avatar = cache_avatar(self.user)
+        with Image.open(ImageStore().open(avatar.image_id, 'avatar64.webp')) as thumb:
+            self.assertEqual(thumb.size, (64, 64))
+
+        urls = self.client.get(f'/api/users/{self.user.pk}/').data['avatar']
+        self.assertEqual(urls['avatar128.webp'], image_url(avatar.image_id, 'avatar128.webp'))
+        response = self.client.get(urls['avatar64.webp'])
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'image/webp'))
@@ -0,0 +1,7 @@
+from django.urls import re_path
+
+from images.views import serve_image
+
+urlpatterns = [
+    re_path(r'^(?P<digest>[0-9a-f]{64})/(?P<variant>[a-z0-9.]+)$', serve_image, name='image'),
+]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Resized and re-encoded versions of stored images, rendered with Pillow.
+"""
+import io
+from collections import namedtuple
+
+from PIL import Image
+
+from images.exceptions import InvalidImageException
+
+Variant = namedtuple('Variant', ['size', 'format', 'content_type', 'options'])
+
+VARIANTS = {
+    'thumb': Variant((146, 204), 'JPEG', 'image/jpeg', {'quality': 85, 'optimize': True}),
+    'thumb.webp': Variant((146, 204), 'WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'webp': Variant(None, 'WEBP', 'image/webp', {'quality': 85, 'method': 4}),
+    'avatar64.webp': Variant((64, 64), 'WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'avatar128.webp': Variant((128, 128), 'WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+}
+CARD_VARIANTS = ('thumb', 'thumb.webp', 'webp')
+AVATAR_VARIANTS = ('avatar64.webp', 'avatar128.webp')
+
+CONTENT_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'GIF': 'image/gif', 'WEBP': 'image/webp'}
+
+
+def inspect(content):
+    """
+    (content type, width, height) of an image, raising InvalidImageException for anything Pillow
+    cannot identify as a supported format.
+    """
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.verify()
+            image_format, size = image.format, image.size
+    except Exception as err:
+        raise InvalidImageException({'Errors': f'Unreadable image: {err}'})
+    if image_format not in CONTENT_TYPES:
+        raise InvalidImageException({'Errors': f'Unsupported image format: {image_format}'})
+    return CONTENT_TYPES[image_format], size[0], size[1]
+
+
+def render(content, names):
+    """
+    Render the named variants of an image, returning {name: bytes}. Raises InvalidImageException for
+    images that only fail once decoded, such as truncated files that pass inspect().
+    """
+    rendered = {}
+    try:
+        with Image.open(io.BytesIO(content)) as source:
+            source.load()
+            has_alpha = 'A' in source.getbands() or 'transparency' in source.info
+            for name in names:
+                variant = VARIANTS[name]
+                mode = 'RGBA' if has_alpha and variant.format != 'JPEG' else 'RGB'
+                image = source.convert(mode) if source.mode != mode else source.copy()
+                if variant.size:
+                    image.thumbnail(variant.size, Image.LANCZOS)
+                output = io.BytesIO()
+                image.save(output, variant.format, **variant.options)
+                rendered[name] = output.getvalue()
+    except Exception as err:
+        raise InvalidImageException({'Errors': f'Unreadable image: {err}'})
+    return rendered
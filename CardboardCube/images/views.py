@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.views.decorators.http import require_safe
+
+from images.models import StoredImage
+from images.store import ORIGINAL, ImageStore
+from images.variants import VARIANTS
+
+
+@require_safe
+def serve_image(request, digest, variant):
+    """
+    Serve a stored image or one of its variants. Names are content addressed, so responses are
+    immutable and clients only revalidate if they lose their copy. In production the image store can
+    be served directly by the web server or a CDN instead, with the same headers.
+    """
+    etag = f'"{digest}-{variant}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        if variant == ORIGINAL:
+            content_type = StoredImage.objects.filter(digest=digest).values_list('content_type', flat=True).first()
+        else:
+            content_type = VARIANTS[variant].content_type if variant in VARIANTS else None
+        store = ImageStore()
+        if content_type is None or not store.exists(digest, variant):
+            raise Http404('No such image.')
+        response = FileResponse(store.open(digest, variant), content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.IMAGE_CACHE_SECONDS}, immutable'
+    return response
@@ -1,22 +1,161 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+from django.utils.html import format_html
 
-from .models import UserInventory, UserSubCollection, InventoryItem, GradingDetails
+from .deletion import delete_inventory, delete_subcollection
+from .exceptions import InventoryError
+from .models import UserInventory, UserSubCollection, InventoryItem, GradingDetails, SubCollectionMembership
+from .paginators import EstimatedCountPaginator
 
 
-class UserInventoryAdmin(admin.ModelAdmin):
-    readonly_fields = ("uuid",)
+class SubCollectionMembershipInline(admin.TabularInline):
+    model = SubCollectionMembership
+    fields = ('inventoryitem', 'quantity')
+    raw_id_fields = ('inventoryitem',)
+    extra = 0
 
+    def get_queryset(self, request):
+        return super(SubCollectionMembershipInline, self).get_queryset(request).select_related(
+            'inventoryitem__card__set', 'inventoryitem__grading_details'
+        )
+
+
+class BackgroundDeletionAdmin(admin.ModelAdmin):
+    """
+    Admin for objects too large to delete in one transaction: the change form's Delete button and the
+    "Delete selected" action go through inventory.deletion, which hides the object and removes it and
+    its dependents in a background job.
+    """
+
+    def start_deletion(self, request, obj):
+        """
+        Mark `obj` deleted and queue its deletion job; returns the job, or None if already deleting.
+        """
+        raise NotImplementedError
+
+    def get_actions(self, request):
+        actions = super(BackgroundDeletionAdmin, self).get_actions(request)
+        # Django's bulk delete cascades in a single transaction; delete_in_background replaces it.
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_deleted_objects(self, objs, request):
+        # Only the objects themselves are removed here, so don't collect (and list) every dependent row.
+        objs = list(objs)
+        perms_needed = set() if self.has_delete_permission(request) else {self.opts.verbose_name}
+        return [str(obj) for obj in objs], {self.opts.verbose_name_plural: len(objs)}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.start_deletion(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.start_deletion(request, obj)
+
+    def delete_in_background(self, request, queryset):
+        jobs = [self.start_deletion(request, obj) for obj in queryset]
+        self.message_user(
+            request, f'Deleting {sum(job is not None for job in jobs)} {self.opts.verbose_name_plural}; '
+                     f'follow the jobs at /api/jobs/.',
+            messages.SUCCESS,
+        )
+    delete_in_background.short_description = 'Delete selected %(verbose_name_plural)s in the background'
 
-class UserSubCollectionAdmin(admin.ModelAdmin):
-    readonly_fields = ("uuid",)
+
+class UserInventoryAdmin(BackgroundDeletionAdmin):
+    list_display = ('__str__', 'owner', 'version')
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner',)
+    readonly_fields = ("uuid", 'version', 'items')
+    search_fields = ('=owner__email', '=owner__username')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    actions = ['delete_in_background']
+
+    def start_deletion(self, request, obj):
+        return delete_inventory(obj)
+
+    def items(self, obj):
+        # Inventories can hold hundreds of thousands of items, so link to the filtered item list
+        # rather than rendering them in the form.
+        url = reverse('admin:inventory_inventoryitem_changelist')
+        return format_html('<a href="{}?owner__id__exact={}">View inventory items</a>', url, obj.owner_id)
+
+
+class UserSubCollectionAdmin(BackgroundDeletionAdmin):
+    list_display = ('__str__', 'kind', 'owner', 'version')
+    list_filter = ('kind',)
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner',)
+    readonly_fields = ("uuid", 'version')
+    search_fields = ('=owner__email', '=owner__username')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    inlines = [SubCollectionMembershipInline]
+    actions = ['delete_in_background']
+
+    def start_deletion(self, request, obj):
+        return delete_subcollection(obj)
+
+    def save_formset(self, request, form, formset, change):
+        """
+        Apply membership edits through the sub-collection so allocations and the change log stay
+        consistent.
+        """
+        if formset.model is not SubCollectionMembership:
+            return super(UserSubCollectionAdmin, self).save_formset(request, form, formset, change)
+        subcollection = form.instance
+        memberships = formset.save(commit=False)
+        removed = [membership.inventoryitem_id for membership in formset.deleted_objects]
+        # A row switched to another item releases the item it used to hold.
+        removed += [row.initial['inventoryitem'] for row in formset.initial_forms
+                    if 'inventoryitem' in row.changed_data and row not in formset.deleted_forms]
+        try:
+            if removed:
+                subcollection.remove_items_from_subcollection(removed)
+            if memberships:
+                subcollection.set_item_quantities({
+                    membership.inventoryitem_id: membership.quantity for membership in memberships
+                })
+        except InventoryError as err:
+            # Reject the whole change, including whatever of it was already applied.
+            transaction.set_rollback(True)
+            request.inventory_error = True
+            self.message_user(request, err.args[0]['Errors'], messages.ERROR)
+
+    def response_add(self, request, obj, post_url_continue=None):
+        if getattr(request, 'inventory_error', False):
+            return HttpResponseRedirect(request.path)
+        return super(UserSubCollectionAdmin, self).response_add(request, obj, post_url_continue)
+
+    def response_change(self, request, obj):
+        if getattr(request, 'inventory_error', False):
+            return HttpResponseRedirect(request.path)
+        return super(UserSubCollectionAdmin, self).response_change(request, obj)
 
 
 class InventoryItemAdmin(admin.ModelAdmin):
-    readonly_fields = ("uuid",)
+    list_display = ('__str__', 'owner', 'quantity_owned', 'quantity_available', 'condition', 'language')
+    list_filter = ('condition', 'language', 'is_foil', 'is_graded')
+    # Everything __str__ touches, fetched in the changelist query instead of once per row.
+    list_select_related = ('card', 'card__set', 'owner', 'grading_details')
+    raw_id_fields = ('card', 'grading_details')
+    autocomplete_fields = ('owner',)
+    readonly_fields = ("uuid", 'quantity_allocated', 'quantity_available')
+    search_fields = ('=card__name', '=owner__email')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 class GradingDetailsAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'grading_service', 'serial_number', 'overall_grade')
+    list_filter = ('grading_service',)
     readonly_fields = ("uuid",)
+    search_fields = ('=serial_number',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 admin.site.register(UserInventory, UserInventoryAdmin)
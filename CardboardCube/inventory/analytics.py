@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Nightly rollups of catalog-wide ownership and demand: the copies and holders of each card owned,
+wanted and included in sub-collections of each kind, and of each condition and language.
+
+Owners are split into ANALYTICS_PARTITIONS equal ranges of user id. Each range is rolled up on its
+own (inventory.tasks.rollup_analytics_partition, in parallel on the "analytics" queue), reading from
+one replica, into AnalyticsFigure rows tagged with the partition. A range is only recomputed when the
+fingerprint of its owners' latest change log entries moved; every change to a user's items,
+inventory or sub-collections is logged (whether or not they have a UserInventory), and compaction
+never drops an owner's latest entry, so unchanged ranges keep their figures. Once every range is
+done, the totals (rows without a partition) are rebuilt by summing the partition rows, which the API
+then serves as they are. Ranges hold disjoint owners, so their holder counts add up.
+"""
+import hashlib
+import uuid
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from db_router import use_replica
+from inventory.models import (
+    AnalyticsFigure, AnalyticsPartition, InventoryChange, InventoryItem, SubCollectionMembership,
+)
+
+ID_SPACE = 1 << 128
+BATCH_SIZE = 5000
+
+
+def partition_filter(partition, partitions, field='owner'):
+    """
+    Q matching the owners in `partition` of `partitions` equal ranges of user id.
+    """
+    query = Q(**{f'{field}__gte': uuid.UUID(int=partition * ID_SPACE // partitions)})
+    if partition + 1 < partitions:
+        query &= Q(**{f'{field}__lt': uuid.UUID(int=(partition + 1) * ID_SPACE // partitions)})
+    return query
+
+
+def fingerprint(partition, partitions):
+    """
+    Digest of the latest change log entry of each live owner in the partition.
+    """
+    digest = hashlib.sha256(f'{partition}/{partitions}'.encode())
+    latest = InventoryChange.objects.filter(
+        partition_filter(partition, partitions), owner__deleted_at__isnull=True,
+    ).order_by('owner').values('owner').annotate(latest=Max('id')).values_list('owner', 'latest')
+    for owner_id, change_id in latest.iterator():
+        digest.update(f'{owner_id}:{change_id};'.encode())
+    return digest.hexdigest()
+
+
+def _figures(partition, partitions):
+    owners = partition_filter(partition, partitions) & Q(owner__deleted_at__isnull=True)
+    items = InventoryItem.objects.filter(owners)
+    owned = items.filter(quantity_owned__gt=0)
+    rows = []
+    for metric, queryset, group, quantity in (
+        (AnalyticsFigure.OWNED, owned.filter(card__isnull=False), 'card', 'quantity_owned'),
+        (AnalyticsFigure.WANTED, items.filter(card__isnull=False, quantity_wanted__gt=0), 'card', 'quantity_wanted'),
+        (AnalyticsFigure.CONDITION, owned, 'condition', 'quantity_owned'),
+        (AnalyticsFigure.LANGUAGE, owned, 'language', 'quantity_owned'),
+    ):
+        grouped = queryset.order_by().values(group).annotate(
+            copies=Sum(quantity), holders=Count('owner', distinct=True)
+        )
+        for row in grouped:
+            card_id = row[group] if group == 'card' else None
+            dimension = '' if group == 'card' else row[group]
+            rows.append(AnalyticsFigure(partition=partition, metric=metric, dimension=dimension, card_id=card_id,
+                                        quantity=row['copies'], holders=row['holders']))
+    included = SubCollectionMembership.objects.filter(
+        owners, quantity__gt=0, subcollection__deleted_at__isnull=True, inventoryitem__card__isnull=False,
+    ).order_by().values('subcollection__kind', 'inventoryitem__card').annotate(
+        copies=Sum('quantity'), holders=Count('subcollection', distinct=True)
+    )
+    for row in included:
+        rows.append(AnalyticsFigure(
+            partition=partition, metric=AnalyticsFigure.INCLUDED, dimension=row['subcollection__kind'],
+            card_id=row['inventoryitem__card'], quantity=row['copies'], holders=row['holders'],
+        ))
+    return rows
+
+
+def rollup_partition(partition, partitions, now=None):
+    """
+    Recompute the partition's figures if its owners changed since they were computed. Returns
+    whether they were.
+    """
+    now = now or timezone.now()
+    # All reads from one replica, fingerprint first: the figures read after it are at least as new, so
+    # they never miss a change the fingerprint stored with them already covers.
+    with use_replica(pinned=True):
+        current = fingerprint(partition, partitions)
+        stored = AnalyticsPartition.objects.filter(partition=partition).first()
+        if stored is not None and stored.fingerprint == current:
+            AnalyticsPartition.objects.filter(partition=partition).update(checked_at=now)
+            return False
+        figures = _figures(partition, partitions)
+    with transaction.atomic():
+        AnalyticsFigure.objects.filter(partition=partition).delete()
+        AnalyticsFigure.objects.bulk_create(figures, batch_size=BATCH_SIZE)
+        AnalyticsPartition.objects.update_or_create(
+            partition=partition, defaults={'fingerprint': current, 'computed_at': now, 'checked_at': now},
+        )
+    return True
+
+
+def publish_totals(partitions, changed=True):
+    """
+    Drop partitions beyond `partitions` and, if any partition changed, rebuild the totals from the
+    partition figures. Returns how many total rows there are.
+    """
+    table = AnalyticsFigure._meta.db_table
+    with transaction.atomic():
+        stale = AnalyticsPartition.objects.filter(partition__gte=partitions)
+        if stale.exists():
+            AnalyticsFigure.objects.filter(partition__gte=partitions).delete()
+            stale.delete()
+            changed = True
+        totals = AnalyticsFigure.objects.filter(partition__isnull=True)
+        if changed or not totals.exists():
+            totals.delete()
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    INSERT INTO {table} (partition, metric, dimension, card_id, quantity, holders)
+                    SELECT NULL, metric, dimension, card_id, sum(quantity), sum(holders)
+                      FROM {table}
+                     WHERE partition IS NOT NULL
+                     GROUP BY metric, dimension, card_id
+                """)
+        return totals.count()
+
+
+def as_of():
+    """
+    When the totals were last known current: the oldest check of any partition, or None before the
+    first rollup.
+    """
+    return AnalyticsPartition.objects.aggregate(as_of=Min('checked_at'))['as_of']
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Compare two card lists, e.g. a cube with another cube, a deck with everything the user owns, or a
+sub-collection with an uploaded list.
+
+Each side is a SQL query yielding (card id, quantity) rows, so the comparison runs as one FULL OUTER
+JOIN in the database and only the differences come back. Results are cached under the versions of
+both sides, so any change to either side makes a fresh comparison.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from card_catalog.models import Card
+from inventory.exceptions import InvalidCardListException
+from inventory.models import InventoryItem, SubCollectionMembership, UserInventory
+
+IDENTITIES = ('card', 'name')
+MAX_LIST_SIZE = 5000
+
+
+class CompareSide(object):
+
+    def sql(self):
+        """
+        (sql, params) for a query yielding (card_id, quantity) rows.
+        """
+        raise NotImplementedError
+
+    def cache_key(self):
+        raise NotImplementedError
+
+
+class SubCollectionSide(CompareSide):
+    """
+    The copies allocated to a sub-collection.
+    """
+
+    def __init__(self, subcollection):
+        self.subcollection = subcollection
+
+    def sql(self):
+        membership = SubCollectionMembership._meta
+        return (
+            f'SELECT i.card_id, m.quantity FROM {membership.db_table} m '
+            f'JOIN {InventoryItem._meta.db_table} i ON i.uuid = m.inventoryitem_id AND i.owner_id = m.owner_id '
+            f'WHERE m.owner_id = %s AND m.{membership.get_field("subcollection").column} = %s '
+            f'AND m.quantity > 0 AND i.card_id IS NOT NULL',
+            [self.subcollection.owner_id, self.subcollection.pk],
+        )
+
+    def cache_key(self):
+        return f'c{self.subcollection.pk}.{self.subcollection.version}'
+
+
+class OwnedSide(CompareSide):
+    """
+    Every copy a user owns.
+    """
+
+    def __init__(self, owner_id):
+        self.owner_id = owner_id
+
+    def sql(self):
+        return (
+            f'SELECT card_id, quantity_owned FROM {InventoryItem._meta.db_table} '
+            f'WHERE owner_id = %s AND quantity_owned > 0 AND card_id IS NOT NULL',
+            [self.owner_id],
+        )
+
+    def cache_key(self):
+        version = UserInventory.objects.filter(owner=self.owner_id).values_list('version', flat=True).first()
+        return f'o{self.owner_id}.{version}'
+
+
+class ListSide(CompareSide):
+    """
+    An uploaded list of {"card": <card id>, "quantity": n} entries.
+    """
+
+    def __init__(self, rows):
+        if not isinstance(rows, list) or len(rows) > MAX_LIST_SIZE:
+            raise InvalidCardListException({'Errors': f'cards must be a list of at most {MAX_LIST_SIZE} entries.'})
+        try:
+            self.rows = sorted((int(row['card']), int(row.get('quantity', 1))) for row in rows)
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise InvalidCardListException({'Errors': 'Each card must be {"card": <card id>, "quantity": n}.'})
+        if any(quantity < 1 for card_id, quantity in self.rows):
+            raise InvalidCardListException({'Errors': 'Quantities must be positive.'})
+
+    def sql(self):
+        return (
+            'SELECT card_id, quantity FROM unnest(%s::bigint[], %s::bigint[]) AS cards (card_id, quantity)',
+            [[card_id for card_id, quantity in self.rows], [quantity for card_id, quantity in self.rows]],
+        )
+
+    def cache_key(self):
+        return 'l' + hashlib.sha1(json.dumps(self.rows).encode()).hexdigest()
+
+
+def _totals_sql(side, identity):
+    sql, params = side.sql()
+    if identity == 'name':
+        card = Card._meta
+        return (
+            f'SELECT c.name AS key, SUM(s.quantity) AS quantity FROM ({sql}) s '
+            f'JOIN {card.db_table} c ON c.{card.pk.column} = s.card_id GROUP BY c.name',
+            params,
+        )
+    return f'SELECT s.card_id AS key, SUM(s.quantity) AS quantity FROM ({sql}) s GROUP BY s.card_id', params
+
+
+def _compare(left, right, identity):
+    left_sql, left_params = _totals_sql(left, identity)
+    right_sql, right_params = _totals_sql(right, identity)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'WITH l AS ({left_sql}), r AS ({right_sql}) '
+            f'SELECT COALESCE(l.key, r.key), COALESCE(l.quantity, 0), COALESCE(r.quantity, 0) '
+            f'FROM l FULL OUTER JOIN r ON l.key = r.key ORDER BY 1',
+            left_params + right_params,
+        )
+        rows = cursor.fetchall()
+
+    result = {'added': [], 'removed': [], 'shared': []}
+    for key, left_quantity, right_quantity in rows:
+        entry = {'card': key, 'left': int(left_quantity), 'right': int(right_quantity),
+                 'delta': int(right_quantity - left_quantity)}
+        if not left_quantity:
+            result['added'].append(entry)
+        elif not right_quantity:
+            result['removed'].append(entry)
+        else:
+            result['shared'].append(entry)
+    return result
+
+
+def compare(left, right, identity='card'):
+    """
+    Compare two sides, matching cards by printing ("card") or by name ("name"). Returns
+    {"added": [...], "removed": [...], "shared": [...]} relative to `left`, each entry giving the card
+    id (or name), both quantities and the delta from left to right.
+    """
+    if identity not in IDENTITIES:
+        raise InvalidCardListException({'Errors': f'identity must be one of {IDENTITIES}.'})
+    key = f'inventory-compare:{identity}:{left.cache_key()}:{right.cache_key()}'
+    result = cache.get(key)
+    if result is None:
+        result = _compare(left, right, identity)
+        cache.set(key, result, settings.COMPARE_CACHE_SECONDS)
+    return result
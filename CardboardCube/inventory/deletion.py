@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Background deletion of sub-collections, inventories and whole users.
+
+Deleting one of these in a single transaction can mean removing hundreds of thousands of rows while
+holding locks on all of them. Instead the object is marked deleted (deleted_at), which hides it from
+the default managers at once, and a "deletion" job (see inventory.job_handlers) then removes the rows
+that depend on it in batches of DELETION_BATCH_SIZE, each batch in its own short transaction, and
+finally the object itself. A deletion that was interrupted is resumed by submitting the job again.
+
+What goes with each object:
+
+- a sub-collection: its memberships, object permissions and history, then the sub-collection;
+- an inventory: its memberships and history, then the inventory (the items themselves stay);
+- a user: everything they own, then the user, whose jobs and remaining rows cascade in one delete.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.utils import timezone
+from guardian.models import GroupObjectPermission, UserObjectPermission
+
+from inventory.models import (
+    HistoryRecord, InventoryChange, InventoryItem, InventoryMembership, SetCompletion, SubCollectionMembership,
+    UserInventory, UserSubCollection,
+)
+from jobs.models import Job
+from registration.models import User
+
+SUBCOLLECTION = 'subcollection'
+INVENTORY = 'inventory'
+USER = 'user'
+TARGETS = (SUBCOLLECTION, INVENTORY, USER)
+
+# Rows of `queryset` deleted by a step. Batches of membership deletions are logged as change log entries
+# against `change_container`, so clients syncing the container drop them.
+Step = namedtuple('Step', ['queryset', 'change_target', 'change_container'])
+
+
+def _object_permissions(model, object_ids):
+    content_type = ContentType.objects.get_for_model(model)
+    object_pks = [str(object_id) for object_id in object_ids]
+    return [
+        Step(permissions.objects.filter(content_type=content_type, object_pk__in=object_pks), None, None)
+        for permissions in (UserObjectPermission, GroupObjectPermission)
+    ]
+
+
+def deletion_steps(target, object_id, owner_id):
+    """
+    The rows to remove for a deletion, in an order that never leaves a row referring to a deleted one.
+    """
+    if target == SUBCOLLECTION:
+        return [
+            Step(SubCollectionMembership.objects.filter(owner=owner_id, subcollection=object_id),
+                 InventoryChange.SUBCOLLECTION_MEMBERSHIP, object_id),
+            *_object_permissions(UserSubCollection, [object_id]),
+            Step(HistoryRecord.objects.filter(owner=owner_id, container_id=object_id), None, None),
+            Step(UserSubCollection.all_objects.filter(owner=owner_id, pk=object_id), None, None),
+        ]
+    if target == INVENTORY:
+        return [
+            Step(InventoryMembership.objects.filter(owner=owner_id, userinventory=object_id),
+                 InventoryChange.INVENTORY_MEMBERSHIP, object_id),
+            Step(HistoryRecord.objects.filter(owner=owner_id, container_id=object_id), None, None),
+            Step(UserInventory.all_objects.filter(owner=owner_id, pk=object_id), None, None),
+        ]
+    subcollection_ids = UserSubCollection.all_objects.filter(owner=object_id).values_list('pk', flat=True)
+    return [
+        Step(SubCollectionMembership.objects.filter(owner=object_id), None, None),
+        Step(InventoryMembership.objects.filter(owner=object_id), None, None),
+        Step(SetCompletion.objects.filter(owner=object_id), None, None),
+        *_object_permissions(UserSubCollection, subcollection_ids),
+        Step(UserSubCollection.all_objects.filter(owner=object_id), None, None),
+        Step(InventoryItem.objects.filter(owner=object_id), None, None),
+        Step(InventoryChange.objects.filter(owner=object_id), None, None),
+        Step(HistoryRecord.objects.filter(owner=object_id), None, None),
+        Step(UserInventory.all_objects.filter(owner=object_id), None, None),
+    ]
+
+
+def _delete_batch(queryset, batch_size, returning):
+    """
+    Delete up to `batch_size` rows of `queryset` with one statement, returning the `returning` column
+    of each. No signals are sent and nothing cascades, so the steps' order has to take care of that.
+    """
+    meta = queryset.model._meta
+    sql, params = queryset.values('pk')[:batch_size].query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {meta.db_table} WHERE {meta.pk.column} IN ({sql}) '
+            f'RETURNING {meta.get_field(returning).column}',
+            params,
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def run_steps(steps, owner_id, on_batch=None, batch_size=None):
+    """
+    Work through deletion steps a batch at a time, calling `on_batch(<rows deleted>)` after each batch
+    commits. Returns the number of rows deleted.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    deleted = 0
+    for step in steps:
+        returning = 'inventoryitem' if step.change_target else step.queryset.model._meta.pk.name
+        while True:
+            with transaction.atomic():
+                rows = _delete_batch(step.queryset, batch_size, returning)
+                if rows and step.change_target:
+                    InventoryChange.objects.record(owner_id, step.change_target, InventoryChange.DELETE, rows,
+                                                   container_id=step.change_container)
+            if not rows:
+                break
+            deleted += len(rows)
+            if on_batch is not None:
+                on_batch(len(rows))
+    return deleted
+
+
+def run_deletion(target, object_id, owner_id, on_batch=None, batch_size=None):
+    """
+    Remove a marked object and everything depending on it. Returns the number of rows deleted.
+    """
+    deleted = run_steps(deletion_steps(target, object_id, owner_id), owner_id, on_batch, batch_size)
+    if target == USER:
+        # What is left (jobs, avatar, permissions) is small enough to cascade in one ORM delete.
+        with transaction.atomic():
+            User.all_objects.filter(pk=object_id).delete()
+        deleted += 1
+        if on_batch is not None:
+            on_batch(1)
+    return deleted
+
+
+def delete_subcollection(subcollection):
+    """
+    Hide a sub-collection and queue the job removing it. Returns the job, or None if the
+    sub-collection is already being deleted.
+    """
+    with transaction.atomic():
+        if not UserSubCollection.objects.filter(pk=subcollection.pk).update(deleted_at=timezone.now()):
+            return None
+        InventoryChange.objects.record(
+            subcollection.owner_id, InventoryChange.SUBCOLLECTION, InventoryChange.DELETE, [subcollection.pk]
+        )
+        params = {'target': SUBCOLLECTION, 'id': str(subcollection.pk)}
+        return Job.objects.submit(subcollection.owner, 'deletion', params)
+
+
+def delete_inventory(inventory):
+    """
+    Hide an inventory and queue the job removing it. Returns the job, or None if the inventory is
+    already being deleted.
+    """
+    with transaction.atomic():
+        if not UserInventory.objects.filter(pk=inventory.pk).update(deleted_at=timezone.now()):
+            return None
+        return Job.objects.submit(inventory.owner, 'deletion', {'target': INVENTORY, 'id': str(inventory.pk)})
+
+
+def delete_user(user, requested_by=None):
+    """
+    Deactivate and hide a user along with their inventory and sub-collections, and queue the job
+    removing all of it. The job belongs to `requested_by` (e.g. the staff member deleting the
+    account), so it can still be followed once the user is gone; by default it is the user's own.
+    Returns the job, or None if the user is already being deleted.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if not User.objects.filter(pk=user.pk).update(deleted_at=now, is_active=False):
+            return None
+        UserInventory.objects.filter(owner=user.pk).update(deleted_at=now)
+        UserSubCollection.objects.filter(owner=user.pk).update(deleted_at=now)
+        user.refresh_from_db(fields=['deleted_at', 'is_active'])
+        return Job.objects.submit(requested_by or user, 'deletion', {'target': USER, 'id': str(user.pk)})
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by InventoryChange.objects.record() for every batch of recorded changes, inside the transaction
+# making them, with owner_id, target, operation, object_ids and container_id. Receivers doing work
+# outside the database should defer it with transaction.on_commit().
+inventory_changed = Signal()
@@ -10,3 +10,23 @@ class InvalidInventoryItemException(InventoryError):
 
 class InvalidGradingDetailsException(InventoryError):
     pass
+
+
+class InsufficientQuantityException(InventoryError):
+    pass
+
+
+class InvalidFormatException(InventoryError):
+    pass
+
+
+class InvalidSimulationException(InventoryError):
+    pass
+
+
+class InvalidCardListException(InventoryError):
+    pass
+
+
+class SimilarityIndexUnavailableException(InventoryError):
+    pass
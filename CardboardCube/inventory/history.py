@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Point-in-time history of inventories and sub-collections.
+
+The contents of a container are recorded as how many copies of each card, foil and non-foil, it
+holds: quantity owned for an inventory, copies allocated for a sub-collection. Cards rather than
+items identify the contents, so a past state stays readable after its items are deleted.
+
+record() is run for every container whose version moved since its last record (nightly, by
+inventory.tasks.record_history). It normally stores only a diff: the cards whose quantity changed,
+with the change. Once the diffs since the last checkpoint add up to more entries than the container
+holds, or there are HISTORY_MAX_DIFFS of them, it stores a full checkpoint instead. Every checkpoint
+is therefore paid for by at least as much diff volume, so storage grows with how much changes rather
+than with collection size, and rebuilding a past state reads one checkpoint plus diffs no larger
+than it.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from inventory.models import HistoryRecord, InventoryItem, SubCollectionMembership, UserInventory, UserSubCollection
+
+
+def card_key(card_id, is_foil):
+    return card_id * 2 + int(is_foil)
+
+
+def _entry(key, **values):
+    return dict({'card': key // 2, 'foil': bool(key % 2)}, **values)
+
+
+def _container_type(container):
+    return HistoryRecord.INVENTORY if isinstance(container, UserInventory) else HistoryRecord.SUBCOLLECTION
+
+
+def current_state(container):
+    """
+    {card key: quantity} for what the container holds now.
+    """
+    if isinstance(container, UserInventory):
+        rows = InventoryItem.objects.owned_by(container.owner_id).filter(
+            inventory_memberships__userinventory=container, card__isnull=False, quantity_owned__gt=0,
+        ).values('card_id', 'is_foil').annotate(quantity=Sum('quantity_owned'))
+        rows = rows.order_by().values_list('card_id', 'is_foil', 'quantity')
+    else:
+        rows = SubCollectionMembership.objects.filter(
+            owner=container.owner_id, subcollection=container, quantity__gt=0, inventoryitem__card__isnull=False,
+        ).values('inventoryitem__card_id', 'inventoryitem__is_foil').annotate(quantity=Sum('quantity'))
+        rows = rows.order_by().values_list('inventoryitem__card_id', 'inventoryitem__is_foil', 'quantity')
+    return {card_key(card_id, is_foil): quantity for card_id, is_foil, quantity in rows}
+
+
+def _replay(records):
+    """
+    Apply a checkpoint and the diffs after it, in order.
+    """
+    state = {}
+    for record in records:
+        if record.is_checkpoint:
+            state = dict(zip(record.keys, record.quantities))
+            continue
+        for key, delta in zip(record.keys, record.quantities):
+            quantity = state.get(key, 0) + delta
+            if quantity:
+                state[key] = quantity
+            else:
+                state.pop(key, None)
+    return state
+
+
+def _records_since_checkpoint(container_id, at=None):
+    """
+    The latest checkpoint of the container (taken at or before `at`) and the diffs after it.
+    """
+    records = HistoryRecord.objects.filter(container_id=container_id)
+    if at is not None:
+        records = records.filter(taken_at__lte=at)
+    checkpoint = records.filter(is_checkpoint=True).order_by('-id').first()
+    if checkpoint is None:
+        return []
+    return [checkpoint] + list(records.filter(id__gt=checkpoint.id).order_by('id'))
+
+
+def record(container, now=None):
+    """
+    Record the container's contents if its version moved since its last record. Returns the new
+    HistoryRecord, or None if there was nothing to record.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Serialises concurrent recorders of the same container.
+        container = type(container).all_objects.select_for_update().get(pk=container.pk)
+        records = _records_since_checkpoint(container.pk)
+        if records and records[-1].version == container.version:
+            return None
+        state = current_state(container)
+        diffs = records[1:]
+        if records:
+            previous = _replay(records)
+            changed = sorted(key for key in previous.keys() | state.keys() if previous.get(key, 0) != state.get(key, 0))
+            diff_entries = sum(len(diff.keys) for diff in diffs) + len(changed)
+            if diff_entries <= len(state) and len(diffs) < settings.HISTORY_MAX_DIFFS:
+                return HistoryRecord.objects.create(
+                    owner_id=container.owner_id, container_type=_container_type(container), container_id=container.pk,
+                    version=container.version, taken_at=now, keys=changed,
+                    quantities=[state.get(key, 0) - previous.get(key, 0) for key in changed],
+                )
+        keys = sorted(state)
+        return HistoryRecord.objects.create(
+            owner_id=container.owner_id, container_type=_container_type(container), container_id=container.pk,
+            version=container.version, taken_at=now, is_checkpoint=True,
+            keys=keys, quantities=[state[key] for key in keys],
+        )
+
+
+def record_changed(now=None):
+    """
+    Record every live inventory and sub-collection changed since its last record. Returns how many
+    records were written.
+    """
+    latest = HistoryRecord.objects.filter(container_id=OuterRef('pk')).order_by('-id').values('version')[:1]
+    written = 0
+    for model in (UserInventory, UserSubCollection):
+        changed = model.objects.annotate(recorded=Subquery(latest)).filter(
+            Q(recorded__isnull=True) | Q(recorded__lt=F('version'))
+        )
+        for container in changed.iterator():
+            written += record(container, now) is not None
+    return written
+
+
+def state_at(container, at):
+    """
+    The container's contents as of `at`, as a list of {"card", "foil", "quantity"} entries, and when
+    the record they come from was taken; (None, None) if nothing was recorded by then.
+    """
+    records = _records_since_checkpoint(container.pk, at)
+    if not records:
+        return None, None
+    state = _replay(records)
+    return [_entry(key, quantity=state[key]) for key in sorted(state)], records[-1].taken_at
+
+
+def changes_between(container, since, at):
+    """
+    How the container's contents changed from `since` to `at`, as {"card", "foil", "delta"} entries.
+    """
+    before = _replay(_records_since_checkpoint(container.pk, since))
+    after = _replay(_records_since_checkpoint(container.pk, at))
+    return [
+        _entry(key, delta=after.get(key, 0) - before.get(key, 0))
+        for key in sorted(before.keys() | after.keys()) if before.get(key, 0) != after.get(key, 0)
+    ]
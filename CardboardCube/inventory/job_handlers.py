@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Background job handlers for heavy inventory operations (see the jobs app).
+"""
+import random
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from card_catalog.models import Card
+from inventory import deletion
+from inventory.models import InventoryChange, InventoryItem, UserInventory, UserSubCollection
+from inventory.simulation import cube_cards, load_cube, merge_tallies, simulate, summarize
+from jobs.exceptions import InvalidJobException
+from jobs.registry import JobHandler, register_handler
+from registration.models import User
+
+
+def _int_param(params, name, default, low, high):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        value = None
+    if value is None or not low <= value <= high:
+        raise InvalidJobException({'Errors': f'{name} must be a whole number from {low} to {high}.'})
+    return value
+
+
+@register_handler
+class InventoryImportHandler(JobHandler):
+    """
+    Bulk-create inventory items from rows of {"card": <card id>, "quantity_owned": ..., ...}, add
+    them to the owner's inventory and, if "subcollection" is given, allocate every owned copy to it.
+    """
+    kind = 'inventory_import'
+    chunk_size = 500
+    FIELDS = (
+        'card', 'quantity_owned', 'quantity_wanted', 'condition', 'language',
+        'is_foil', 'is_signed', 'is_altered', 'is_misprint', 'is_miscut',
+    )
+
+    def clean(self, owner, params):
+        rows = params.get('items')
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) and 'card' in row for row in rows):
+            raise InvalidJobException({'Errors': 'items must be a non-empty list of objects with a card.'})
+        unknown = {field for row in rows for field in row} - set(self.FIELDS)
+        if unknown:
+            raise InvalidJobException({'Errors': f'Unknown item fields: {sorted(unknown)}'})
+        subcollection = params.get('subcollection')
+        if subcollection is not None:
+            try:
+                exists = UserSubCollection.objects.filter(pk=subcollection, owner=owner).exists()
+            except ValidationError:
+                exists = False
+            if not exists:
+                raise InvalidJobException({'Errors': 'No sub-collection found for user.'})
+        return {'items': rows, 'subcollection': subcollection}
+
+    def chunks(self, job):
+        rows = job.params['items']
+        return [rows[start:start + self.chunk_size] for start in range(0, len(rows), self.chunk_size)]
+
+    def run_chunk(self, job, rows):
+        card_ids = {row['card'] for row in rows}
+        missing = card_ids - set(Card.objects.filter(pk__in=card_ids).values_list('pk', flat=True))
+        if missing:
+            raise InvalidJobException({'Errors': f'Unknown cards: {sorted(missing)}'})
+        items = []
+        for row in rows:
+            item = InventoryItem(owner_id=job.owner_id, card_id=row['card'],
+                                 **{field: value for field, value in row.items() if field != 'card'})
+            item.clean_fields(exclude=['card', 'owner', 'grading_details'])
+            items.append(item)
+
+        with transaction.atomic():
+            InventoryItem.objects.bulk_create(items)
+            pks = [item.pk for item in items]
+            # bulk_create skips the post_save signal, so log the new items here.
+            InventoryChange.objects.record(
+                job.owner_id, InventoryChange.ITEM, InventoryChange.UPSERT, pks,
+                payloads=[item.change_payload() for item in items],
+            )
+            inventory = UserInventory.objects.filter(owner=job.owner_id).first()
+            if inventory is not None:
+                inventory.add_items_to_inventory(pks)
+            if job.params.get('subcollection'):
+                subcollection = UserSubCollection.objects.get(pk=job.params['subcollection'], owner=job.owner_id)
+                subcollection.set_item_quantities({item.pk: item.quantity_owned for item in items
+                                                   if item.quantity_owned > 0})
+        return {'created': len(items)}
+
+    def combine(self, job, results):
+        return {'created': sum(result['created'] for result in results)}
+
+
+@register_handler
+class DraftSimulationHandler(JobHandler):
+    """
+    Simulate drafts of a cube (see inventory.simulation). The cube's card list is captured when the
+    job is submitted so every chunk simulates the same cube, and each chunk gets its own seed.
+    """
+    kind = 'draft_simulation'
+    queue = 'jobs_simulation'
+    chunk_drafts = 2500
+    MAX_DRAFTS = 100000
+
+    def clean(self, owner, params):
+        cube_kind = dict(UserSubCollection.KIND_CHOICES).get('CUBE')
+        try:
+            subcollection = UserSubCollection.objects.get(pk=params.get('subcollection'), owner=owner, kind=cube_kind)
+        except (UserSubCollection.DoesNotExist, ValidationError):
+            raise InvalidJobException({'Errors': 'No cube found for user.'})
+        cleaned = {
+            'subcollection': str(subcollection.pk),
+            'drafts': _int_param(params, 'drafts', 1000, 1, self.MAX_DRAFTS),
+            'drafters': _int_param(params, 'drafters', 8, 2, 16),
+            'packs': _int_param(params, 'packs', 3, 1, 5),
+            'pack_size': _int_param(params, 'pack_size', 15, 1, 30),
+            'seed': _int_param(params, 'seed', random.getrandbits(32), 0, 2 ** 32 - 1),
+            'cards': cube_cards(subcollection),
+        }
+        needed = cleaned['drafters'] * cleaned['packs'] * cleaned['pack_size']
+        size = sum(copies for card_id, copies in cleaned['cards'])
+        if needed > size:
+            raise InvalidJobException({'Errors': f'The draft needs {needed} cards but the cube has {size}.'})
+        return cleaned
+
+    def chunks(self, job):
+        drafts = job.params['drafts']
+        return [
+            {'drafts': min(self.chunk_drafts, drafts - start), 'seed': [job.params['seed'], index]}
+            for index, start in enumerate(range(0, drafts, self.chunk_drafts))
+        ]
+
+    def run_chunk(self, job, chunk):
+        params = job.params
+        tally = simulate(load_cube(params['cards']), chunk['drafts'], drafters=params['drafters'],
+                         packs=params['packs'], pack_size=params['pack_size'], seed=chunk['seed'])
+        return {key: value.tolist() for key, value in tally.items()}
+
+    def combine(self, job, results):
+        return summarize(load_cube(job.params['cards']), merge_tallies(results))
+
+
+@register_handler
+class DeletionHandler(JobHandler):
+    """
+    Remove a sub-collection, inventory or user already marked deleted, in short batches (see
+    inventory.deletion). Params are {"target": "subcollection" | "inventory" | "user", "id": ...}.
+    Progress counts rows deleted rather than chunks.
+    """
+    kind = 'deletion'
+    reports_progress = True
+
+    def clean(self, owner, params):
+        target, object_id = params.get('target'), params.get('id')
+        if target not in deletion.TARGETS:
+            raise InvalidJobException({'Errors': f'target must be one of {deletion.TARGETS}.'})
+        if target == deletion.SUBCOLLECTION:
+            marked = UserSubCollection.all_objects.filter(owner=owner, deleted_at__isnull=False)
+        elif target == deletion.INVENTORY:
+            marked = UserInventory.all_objects.filter(owner=owner, deleted_at__isnull=False)
+        elif owner.is_staff or str(owner.pk) == str(object_id):
+            marked = User.all_objects.filter(deleted_at__isnull=False)
+        else:
+            marked = User.all_objects.none()
+        try:
+            exists = marked.filter(pk=object_id).exists()
+        except ValidationError:
+            exists = False
+        if not exists:
+            raise InvalidJobException({'Errors': f'No {target} being deleted found for user.'})
+        return {'target': target, 'id': str(object_id)}
+
+    def _owner_id(self, job):
+        return job.params['id'] if job.params['target'] == deletion.USER else job.owner_id
+
+    def progress_total(self, job, chunks):
+        steps = deletion.deletion_steps(job.params['target'], job.params['id'], self._owner_id(job))
+        # The user themselves goes in a last step of its own.
+        last = 1 if job.params['target'] == deletion.USER else 0
+        return sum(step.queryset.count() for step in steps) + last
+
+    def run_chunk(self, job, params):
+        owner_id = self._owner_id(job)
+        return {'deleted': deletion.run_deletion(params['target'], params['id'], owner_id,
+                                                 on_batch=lambda rows: self.advance(job, rows))}
+
+    def combine(self, job, results):
+        return {'deleted': sum(result['deleted'] for result in results)}
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Live change events for inventories and sub-collections.
+
+Every batch of changes recorded by InventoryChange.objects.record() (model hooks and bulk paths
+alike) is published once its transaction commits, as a compact event naming what changed:
+
+    {"t": target, "o": operation, "ids": [object ids], "c": container id}
+
+with the same codes as the change log; "ids" is null when more than LIVE_MAX_IDS objects changed.
+Events go to the owner's inventory channel, and to the channel of each sub-collection they touch.
+Subscribers re-read what they need (or follow the change log) instead of polling.
+
+Events travel through a broker chosen with settings.LIVE_BROKER: RedisBroker uses Redis pub/sub so
+every web process sees every event; LocalBroker keeps them in process for tests.
+"""
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+
+import orjson
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from inventory.models import InventoryChange, SubCollectionMembership
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def inventory_channel(owner_id):
+    return f'live:inventory:{owner_id}'
+
+
+def subcollection_channel(subcollection_id):
+    return f'live:subcollection:{subcollection_id}'
+
+
+def change_channels(owner_id, target, object_ids, container_id=None):
+    """
+    The channels an event about these changes is published to.
+    """
+    channels = [inventory_channel(owner_id)]
+    if target == InventoryChange.SUBCOLLECTION:
+        channels.extend(subcollection_channel(pk) for pk in object_ids)
+    elif target == InventoryChange.SUBCOLLECTION_MEMBERSHIP:
+        channels.append(subcollection_channel(container_id))
+    elif target == InventoryChange.ITEM:
+        containing = SubCollectionMembership.objects.filter(
+            owner=owner_id, inventoryitem__in=object_ids
+        ).values_list('subcollection', flat=True).distinct()
+        channels.extend(subcollection_channel(pk) for pk in containing)
+    return channels
+
+
+def change_event(target, operation, object_ids, container_id=None):
+    event = {'t': target, 'o': operation, 'ids': None}
+    if len(object_ids) <= settings.LIVE_MAX_IDS:
+        event['ids'] = [str(object_id) for object_id in object_ids]
+    if container_id is not None:
+        event['c'] = str(container_id)
+    return orjson.dumps(event)
+
+
+def publish_change(owner_id, target, operation, object_ids, container_id=None):
+    """
+    Publish an event for a committed batch of changes. Run from transaction.on_commit().
+    """
+    channels = change_channels(owner_id, target, object_ids, container_id)
+    get_broker().publish(channels, change_event(target, operation, object_ids, container_id))
+
+
+class Broker(object):
+
+    def publish(self, channels, message):
+        """
+        Send `message` (bytes) to every subscriber of each of `channels`.
+        """
+        raise NotImplementedError
+
+    def listener(self):
+        """
+        A new connection for receiving messages, used from the running event loop. It has async
+        subscribe(channels) and unsubscribe(channels), and messages(), an async iterator of
+        (channel, message) pairs for the channels subscribed.
+        """
+        raise NotImplementedError
+
+
+class RedisBroker(Broker):
+
+    def publish(self, channels, message):
+        try:
+            pipeline = get_redis().pipeline(transaction=False)
+            for channel in channels:
+                pipeline.publish(channel, message)
+            pipeline.execute()
+        except redis.RedisError:
+            # The changes are committed and in the change log either way; subscribers catch up there.
+            logger.warning('Could not publish live event to %s', channels, exc_info=True)
+
+    def listener(self):
+        return RedisListener()
+
+
+class RedisListener(object):
+
+    def __init__(self):
+        self.pubsub = redis.asyncio.Redis.from_url(settings.REDIS_HOST).pubsub(ignore_subscribe_messages=True)
+
+    async def subscribe(self, channels):
+        await self.pubsub.subscribe(*channels)
+
+    async def unsubscribe(self, channels):
+        await self.pubsub.unsubscribe(*channels)
+
+    async def messages(self):
+        while True:
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is not None:
+                yield message['channel'].decode(), message['data']
+
+
+class LocalBroker(Broker):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.published = []
+
+    def publish(self, channels, message):
+        with self.lock:
+            self.published.append((list(channels), message))
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener.deliver(channels, message)
+
+    def listener(self):
+        listener = LocalListener()
+        with self.lock:
+            self.listeners.append(listener)
+        return listener
+
+
+class LocalListener(object):
+
+    def __init__(self):
+        self.loop = asyncio.get_event_loop()
+        self.queue = asyncio.Queue()
+        self.channels = set()
+
+    async def subscribe(self, channels):
+        self.channels.update(channels)
+
+    async def unsubscribe(self, channels):
+        self.channels.difference_update(channels)
+
+    def deliver(self, channels, message):
+        # Called from whichever thread published.
+        if self.loop.is_closed():
+            return
+        for channel in channels:
+            if channel in self.channels:
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, (channel, message))
+
+    async def messages(self):
+        while True:
+            yield await self.queue.get()
+
+
+@lru_cache(maxsize=None)
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    return _load_broker(settings.LIVE_BROKER)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the fast item serializer and orjson renderer against the ModelSerializer and DRF's
+JSONRenderer on a generated inventory.
+
+The items are created for a throwaway user inside a transaction that is rolled back at the end, so
+the command is safe to run against any database that has a card catalog loaded. It fails if the two
+paths don't render byte-identical responses.
+"""
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import InventoryItemFastSerializer
+from api.renderers import ORJSONRenderer
+from api.serializers import InventoryItemSerializer
+from card_catalog.models import Card
+from inventory.models import GradingDetails, InventoryItem
+from registration.models import User
+
+GRADED_EVERY = 10
+
+
+def _best_of(rounds, func):
+    best, result = None, None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the fast item serializer against InventoryItemSerializer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=10000, help='Number of items to serialize.')
+        parser.add_argument('--rounds', type=int, default=5, help='Timed rounds per path; the best is reported.')
+
+    def handle(self, *args, **options):
+        card_pks = list(Card.objects.values_list('pk', flat=True)[:options['items']])
+        if not card_pks:
+            raise CommandError('The card catalog is empty.')
+        with transaction.atomic():
+            owner = self._populate(card_pks, options['items'])
+            queryset = InventoryItem.objects.owned_by(owner.pk).order_by('pk')
+            drf_time, drf = _best_of(options['rounds'], lambda: self._drf(queryset))
+            fast_time, fast = _best_of(options['rounds'], lambda: self._fast(queryset))
+            transaction.set_rollback(True)
+        if drf != fast:
+            raise CommandError('The fast path rendered a different response.')
+        self.stdout.write('{} items, identical output ({} bytes)'.format(options['items'], len(fast)))
+        self.stdout.write('ModelSerializer + JSONRenderer: {:8.1f} ms'.format(drf_time * 1000))
+        self.stdout.write('Fast serializer + ORJSONRenderer: {:6.1f} ms'.format(fast_time * 1000))
+        self.stdout.write(self.style.SUCCESS('Speedup: {:.1f}x'.format(drf_time / fast_time)))
+
+    @staticmethod
+    def _populate(card_pks, count):
+        owner = User.objects.create(email='serializer-benchmark@localhost', username='serializer-benchmark')
+        gradings = GradingDetails.objects.bulk_create([
+            GradingDetails(grading_service='PSA', serial_number=str(n), overall_grade=Decimal('9.5'))
+            for n in range(0, count, GRADED_EVERY)
+        ])
+        InventoryItem.objects.bulk_create([
+            InventoryItem(
+                owner=owner, card_id=card_pks[n % len(card_pks)], quantity_owned=n % 4 + 1,
+                is_foil=n % 3 == 0, is_graded=n % GRADED_EVERY == 0,
+                grading_details=gradings[n // GRADED_EVERY] if n % GRADED_EVERY == 0 else None,
+            )
+            for n in range(count)
+        ], batch_size=1000)
+        return owner
+
+    @staticmethod
+    def _drf(queryset):
+        return JSONRenderer().render(InventoryItemSerializer(queryset, many=True).data)
+
+    @staticmethod
+    def _fast(queryset):
+        return ORJSONRenderer().render(InventoryItemFastSerializer().serialize(queryset))
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Switch InventoryItem and its membership tables over to owner-partitioned storage.
+
+Each table is rebuilt as a PostgreSQL table hash-partitioned on owner_id. Primary keys and unique
+constraints gain owner_id (a requirement of declarative partitioning), foreign keys to
+InventoryItem become composite (item, owner) keys, and indexes, triggers and sequence ownership are
+carried over. The whole switch runs in one transaction holding ACCESS EXCLUSIVE locks, so run it in a
+maintenance window. The original tables are kept as <table>__unpartitioned unless --drop-old is given.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from inventory.models import InventoryItem, InventoryMembership, SubCollectionMembership
+
+PARTITION_KEY = 'owner_id'
+MIN_POSTGRES_VERSION = 130000  # Row level BEFORE triggers on partitioned tables.
+
+FOREIGN_KEY_RE = re.compile(r'^FOREIGN KEY \((?P<column>[^)]+)\) REFERENCES (?P<table>[^(]+)\((?P<target>[^)]+)\)(?P<rest>.*)$')
+
+CONSTRAINTS_SQL = """
+SELECT c.conname, c.contype, array_agg(a.attname ORDER BY k.ord)
+  FROM pg_constraint c
+ CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+  JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+ WHERE c.conrelid = %s::regclass AND c.contype IN ('p', 'u')
+ GROUP BY c.conname, c.contype
+"""
+
+FOREIGN_KEYS_SQL = """
+SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'
+"""
+
+INCOMING_FOREIGN_KEYS_SQL = """
+SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+  FROM pg_constraint
+ WHERE confrelid = %s::regclass AND contype = 'f' AND NOT (conrelid::regclass::text = ANY(%s))
+"""
+
+INDEXES_SQL = """
+SELECT i.relname, x.indisunique, pg_get_indexdef(i.oid)
+  FROM pg_index x
+  JOIN pg_class i ON i.oid = x.indexrelid
+ WHERE x.indrelid = %s::regclass
+   AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+"""
+
+TRIGGERS_SQL = """
+SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal
+"""
+
+SEQUENCES_SQL = """
+SELECT attname, pg_get_serial_sequence(%s, attname)
+  FROM pg_attribute
+ WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+"""
+
+COLUMNS_SQL = """
+SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+"""
+
+
+def _parked_name(name):
+    # Index names are schema wide, so the old table's indexes are renamed out of the way.
+    return f'unpartitioned_{hashlib.md5(name.encode()).hexdigest()[:16]}'
+
+
+def _bare_table_name(name):
+    return name.split('.')[-1].strip('"')
+
+
+class Command(BaseCommand):
+    help = 'Convert InventoryItem and the membership tables to storage hash-partitioned by owner.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=settings.INVENTORY_PARTITION_COUNT,
+            help='Number of hash partitions per table.'
+        )
+        parser.add_argument(
+            '--drop-old', action='store_true', help='Drop the original tables instead of keeping them.'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Print the SQL without running it.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql' or connection.pg_version < MIN_POSTGRES_VERSION:
+            raise CommandError('Partitioned storage requires PostgreSQL 13 or newer.')
+        if options['partitions'] < 2:
+            raise CommandError('Use at least two partitions.')
+
+        tables = [model._meta.db_table for model in (InventoryItem, InventoryMembership, SubCollectionMembership)]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SELECT relkind FROM pg_class WHERE oid = %s::regclass', [InventoryItem._meta.db_table])
+            if cursor.fetchone()[0] == 'p':
+                raise CommandError('Inventory storage is already partitioned.')
+            if not options['dry_run']:
+                cursor.execute(f'LOCK TABLE {", ".join(tables)} IN ACCESS EXCLUSIVE MODE')
+
+            statements = self.build_statements(cursor, tables, options['partitions'], options['drop_old'])
+            for sql in statements:
+                if options['dry_run']:
+                    self.stdout.write(f'{sql};')
+                else:
+                    cursor.execute(sql)
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Partitioned {", ".join(tables)} into {options["partitions"]} partitions each.'
+            ))
+
+    def build_statements(self, cursor, tables, partitions, drop_old):
+        item_table = InventoryItem._meta.db_table
+        plans = {table: self.introspect(cursor, table) for table in tables}
+        cursor.execute(INCOMING_FOREIGN_KEYS_SQL, [item_table, tables])
+        incoming_foreign_keys = cursor.fetchall()
+
+        statements = []
+        # Free up the index-backed names so the new tables can reuse them.
+        for table, plan in plans.items():
+            for name, _, _ in plan['constraints']:
+                statements.append(f'ALTER TABLE {table} RENAME CONSTRAINT {name} TO {_parked_name(name)}')
+            for name, _, _ in plan['indexes']:
+                statements.append(f'ALTER INDEX {name} RENAME TO {_parked_name(name)}')
+
+        for table in tables:
+            statements.append(
+                f'CREATE TABLE {table}__partitioned (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+                f'INCLUDING STORAGE) PARTITION BY HASH ({PARTITION_KEY})'
+            )
+            for remainder in range(partitions):
+                statements.append(
+                    f'CREATE TABLE {table}_p{remainder:03d} PARTITION OF {table}__partitioned '
+                    f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+                )
+            statements.append(f'INSERT INTO {table}__partitioned SELECT * FROM {table}')
+            statements.append(f'ALTER TABLE {table} RENAME TO {table}__unpartitioned')
+            statements.append(f'ALTER TABLE {table}__partitioned RENAME TO {table}')
+
+        for table, plan in plans.items():
+            for name, kind, columns in plan['constraints']:
+                if PARTITION_KEY not in columns:
+                    columns = columns + [PARTITION_KEY]
+                constraint = 'PRIMARY KEY' if kind == 'p' else 'UNIQUE'
+                statements.append(f'ALTER TABLE {table} ADD CONSTRAINT {name} {constraint} ({", ".join(columns)})')
+            for name, is_unique, definition in plan['indexes']:
+                if is_unique and PARTITION_KEY not in definition:
+                    raise CommandError(f'Unique index {name} on {table} does not include {PARTITION_KEY}.')
+                statements.append(definition)
+            for column, sequence in plan['sequences']:
+                statements.append(f'ALTER SEQUENCE {sequence} OWNED BY {table}.{column}')
+            for name, definition in plan['foreign_keys']:
+                statements.append(f'ALTER TABLE {table} ADD CONSTRAINT {name} {self.owner_scoped(definition)}')
+            statements.extend(plan['triggers'])
+
+        for table, name, definition in incoming_foreign_keys:
+            statements.append(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+            if PARTITION_KEY in self.columns(cursor, table):
+                statements.append(f'ALTER TABLE {table} ADD CONSTRAINT {name} {self.owner_scoped(definition)}')
+            else:
+                self.stderr.write(
+                    f'{table}.{name} has no {PARTITION_KEY} column; the foreign key is dropped and the relation '
+                    f'is only enforced by the ORM.'
+                )
+
+        for table in tables:
+            if drop_old:
+                statements.append(f'DROP TABLE {table}__unpartitioned CASCADE')
+            statements.append(f'ANALYZE {table}')
+        return statements
+
+    def introspect(self, cursor, table):
+        cursor.execute(CONSTRAINTS_SQL, [table])
+        constraints = [(name, kind, list(columns)) for name, kind, columns in cursor.fetchall()]
+        cursor.execute(FOREIGN_KEYS_SQL, [table])
+        foreign_keys = cursor.fetchall()
+        cursor.execute(INDEXES_SQL, [table])
+        indexes = cursor.fetchall()
+        cursor.execute(TRIGGERS_SQL, [table])
+        triggers = [row[0] for row in cursor.fetchall()]
+        cursor.execute(SEQUENCES_SQL, [table, table])
+        sequences = [(column, sequence) for column, sequence in cursor.fetchall() if sequence]
+        return {
+            'constraints': constraints,
+            'foreign_keys': foreign_keys,
+            'indexes': indexes,
+            'triggers': triggers,
+            'sequences': sequences,
+        }
+
+    def columns(self, cursor, table):
+        cursor.execute(COLUMNS_SQL, [table])
+        return {row[0] for row in cursor.fetchall()}
+
+    def owner_scoped(self, definition):
+        """
+        Rewrite a foreign key to InventoryItem as a composite (item, owner) key, since the partitioned
+        table is only unique on (uuid, owner_id).
+        """
+        match = FOREIGN_KEY_RE.match(definition)
+        if not match or _bare_table_name(match.group('table')) != InventoryItem._meta.db_table:
+            return definition
+        return (
+            f'FOREIGN KEY ({match.group("column")}, {PARTITION_KEY}) '
+            f'REFERENCES {match.group("table")}({match.group("target")}, {PARTITION_KEY}){match.group("rest")}'
+        )
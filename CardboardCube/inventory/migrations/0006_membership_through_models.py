@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Checked immediately so the NOT NULL alteration below does not trip over pending deferred FK checks.
+POPULATE_OWNER_SQL = """
+SET CONSTRAINTS ALL IMMEDIATE;
+
+UPDATE inventory_userinventory_inventory_items AS membership
+   SET owner_id = item.owner_id
+  FROM inventory_inventoryitem AS item
+ WHERE item.uuid = membership.inventoryitem_id;
+
+UPDATE inventory_usersubcollection_inventory_items AS membership
+   SET owner_id = item.owner_id
+  FROM inventory_inventoryitem AS item
+ WHERE item.uuid = membership.inventoryitem_id;
+
+SET CONSTRAINTS ALL DEFERRED;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0005_auto_20200505_0034'),
+    ]
+
+    operations = [
+        # The auto-created M2M tables already match these models, so only the migration state changes.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='InventoryMembership',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('inventoryitem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_memberships', to='inventory.InventoryItem')),
+                        ('userinventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='inventory.UserInventory')),
+                    ],
+                    options={
+                        'db_table': 'inventory_userinventory_inventory_items',
+                        'unique_together': {('userinventory', 'inventoryitem')},
+                    },
+                ),
+                migrations.CreateModel(
+                    name='SubCollectionMembership',
+                    fields=[
+                        ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('inventoryitem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subcollection_memberships', to='inventory.InventoryItem')),
+                        ('subcollection', models.ForeignKey(db_column='usersubcollection_id', on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='inventory.UserSubCollection')),
+                    ],
+                    options={
+                        'db_table': 'inventory_usersubcollection_inventory_items',
+                        'unique_together': {('subcollection', 'inventoryitem')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='userinventory',
+                    name='inventory_items',
+                    field=models.ManyToManyField(blank=True, through='inventory.InventoryMembership', to='inventory.InventoryItem'),
+                ),
+                migrations.AlterField(
+                    model_name='usersubcollection',
+                    name='inventory_items',
+                    field=models.ManyToManyField(blank=True, through='inventory.SubCollectionMembership', to='inventory.InventoryItem'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='inventorymembership',
+            name='owner',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='subcollectionmembership',
+            name='owner',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunSQL(POPULATE_OWNER_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name='inventorymembership',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='subcollectionmembership',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,65 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SEARCH_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION inventory_card_search_vector(name text, types text, subtypes text, oracle_text text)
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(types, '') || ' ' || coalesce(subtypes, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(oracle_text, '')), 'C')
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION inventory_card_search_document_refresh() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO inventory_cardsearchdocument (card_id, search_vector)
+    VALUES (NEW.id, inventory_card_search_vector(NEW.name::text, NEW.types::text, NEW.subtypes::text, NEW.oracle_text::text))
+    ON CONFLICT (card_id) DO UPDATE SET search_vector = EXCLUDED.search_vector;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER inventory_card_search_document_refresh
+AFTER INSERT OR UPDATE OF name, types, subtypes, oracle_text ON card_catalog_card
+FOR EACH ROW EXECUTE PROCEDURE inventory_card_search_document_refresh();
+
+INSERT INTO inventory_cardsearchdocument (card_id, search_vector)
+SELECT id, inventory_card_search_vector(name::text, types::text, subtypes::text, oracle_text::text)
+  FROM card_catalog_card
+    ON CONFLICT (card_id) DO NOTHING;
+"""
+
+DROP_SEARCH_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS inventory_card_search_document_refresh ON card_catalog_card;
+DROP FUNCTION IF EXISTS inventory_card_search_document_refresh();
+DROP FUNCTION IF EXISTS inventory_card_search_vector(text, text, text, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card_catalog', '__first__'),
+        ('inventory', '0006_membership_through_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardSearchDocument',
+            fields=[
+                ('card', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='card_catalog.Card')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+            options={
+                'verbose_name': 'Card Search Document',
+                'verbose_name_plural': 'Card Search Documents',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cardsearchdocument',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='inventory_card_search_gin'),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGER_SQL, reverse_sql=DROP_SEARCH_TRIGGER_SQL),
+    ]
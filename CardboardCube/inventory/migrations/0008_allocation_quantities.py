@@ -0,0 +1,103 @@
+from django.db import migrations, models
+
+
+ALLOCATION_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION inventory_item_availability() RETURNS trigger AS $$
+BEGIN
+    NEW.quantity_available := NEW.quantity_owned - NEW.quantity_allocated;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER inventory_item_availability
+BEFORE INSERT OR UPDATE ON inventory_inventoryitem
+FOR EACH ROW EXECUTE PROCEDURE inventory_item_availability();
+
+CREATE OR REPLACE FUNCTION inventory_adjust_allocation(item_id uuid, item_owner_id uuid, delta integer) RETURNS void AS $$
+DECLARE
+    remaining integer;
+BEGIN
+    IF delta = 0 THEN
+        RETURN;
+    END IF;
+    UPDATE inventory_inventoryitem
+       SET quantity_allocated = quantity_allocated + delta
+     WHERE uuid = item_id AND owner_id = item_owner_id
+    RETURNING quantity_available INTO remaining;
+    IF delta > 0 AND remaining < 0 THEN
+        RAISE EXCEPTION 'Not enough free copies of inventory item %', item_id USING ERRCODE = 'check_violation';
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION inventory_subcollection_allocation() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.inventoryitem_id = OLD.inventoryitem_id THEN
+        PERFORM inventory_adjust_allocation(NEW.inventoryitem_id, NEW.owner_id, NEW.quantity - OLD.quantity);
+    ELSE
+        IF TG_OP <> 'INSERT' THEN
+            PERFORM inventory_adjust_allocation(OLD.inventoryitem_id, OLD.owner_id, -OLD.quantity);
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            PERFORM inventory_adjust_allocation(NEW.inventoryitem_id, NEW.owner_id, NEW.quantity);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Until now a sub-collection claimed the whole stack of each of its items.
+UPDATE inventory_usersubcollection_inventory_items AS membership
+   SET quantity = GREATEST(item.quantity_owned, 0)
+  FROM inventory_inventoryitem AS item
+ WHERE item.uuid = membership.inventoryitem_id;
+
+UPDATE inventory_inventoryitem AS item
+   SET quantity_allocated = COALESCE((
+       SELECT SUM(membership.quantity)
+         FROM inventory_usersubcollection_inventory_items AS membership
+        WHERE membership.inventoryitem_id = item.uuid
+   ), 0);
+
+CREATE TRIGGER inventory_subcollection_allocation
+AFTER INSERT OR UPDATE OR DELETE ON inventory_usersubcollection_inventory_items
+FOR EACH ROW EXECUTE PROCEDURE inventory_subcollection_allocation();
+"""
+
+DROP_ALLOCATION_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS inventory_subcollection_allocation ON inventory_usersubcollection_inventory_items;
+DROP TRIGGER IF EXISTS inventory_item_availability ON inventory_inventoryitem;
+DROP FUNCTION IF EXISTS inventory_subcollection_allocation();
+DROP FUNCTION IF EXISTS inventory_adjust_allocation(uuid, uuid, integer);
+DROP FUNCTION IF EXISTS inventory_item_availability();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_cardsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='quantity_allocated',
+            field=models.IntegerField(default=0, editable=False, help_text='Copies used by sub-collections'),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='quantity_available',
+            field=models.IntegerField(default=0, editable=False, help_text='Copies owned but not allocated'),
+        ),
+        migrations.AddField(
+            model_name='subcollectionmembership',
+            name='quantity',
+            field=models.PositiveIntegerField(default=1, help_text='Copies of the item allocated to the sub-collection'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['owner', 'quantity_available'], name='inventory_item_available_idx'),
+        ),
+        migrations.RunSQL(ALLOCATION_TRIGGERS_SQL, reverse_sql=DROP_ALLOCATION_TRIGGERS_SQL),
+    ]
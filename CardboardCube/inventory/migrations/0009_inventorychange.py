@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0008_allocation_quantities'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('txid', models.BigIntegerField(help_text='Id of the transaction that made the change')),
+                ('target', models.CharField(choices=[('I', 'Inventory item'), ('C', 'Sub-collection'), ('M', 'Inventory membership'), ('S', 'Sub-collection membership')], max_length=1)),
+                ('operation', models.CharField(choices=[('U', 'Created or updated'), ('D', 'Deleted')], max_length=1)),
+                ('object_id', models.UUIDField(help_text='Changed item or sub-collection')),
+                ('container_id', models.UUIDField(help_text='Inventory or sub-collection of a membership', null=True)),
+                ('payload', models.JSONField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Inventory Change',
+                'verbose_name_plural': 'Inventory Changes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventorychange',
+            index=models.Index(fields=['owner', 'txid', 'id'], name='inventory_change_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorychange',
+            index=models.Index(fields=['owner', 'target', 'object_id'], name='inventory_change_object_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorychange',
+            index=models.Index(fields=['created_at'], name='inventory_change_created_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_inventorychange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinventory',
+            name='version',
+            field=models.BigIntegerField(default=1, editable=False, help_text='Bumped on every change to the inventory'),
+        ),
+        migrations.AddField(
+            model_name='usersubcollection',
+            name='version',
+            field=models.BigIntegerField(default=1, editable=False, help_text='Bumped on every change to the sub-collection'),
+        ),
+    ]
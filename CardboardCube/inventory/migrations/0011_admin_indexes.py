@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_versions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersubcollection',
+            index=models.Index(fields=['kind'], name='inventory_sub_kind_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['condition', 'uuid'], name='inventory_item_condition_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['language', 'uuid'], name='inventory_item_language_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(condition=models.Q(is_foil=True), fields=['uuid'], name='inventory_item_foil_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(condition=models.Q(is_graded=True), fields=['uuid'], name='inventory_item_graded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gradingdetails',
+            index=models.Index(fields=['serial_number'], name='inventory_grading_serial_idx'),
+        ),
+    ]
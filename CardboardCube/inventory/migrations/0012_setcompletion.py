@@ -0,0 +1,105 @@
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SET_COMPLETION_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION inventory_touch_set_completion(item_owner_id uuid, item_card_id integer, create_row boolean)
+RETURNS void AS $$
+BEGIN
+    IF item_card_id IS NULL THEN
+        RETURN;
+    END IF;
+    IF NOT create_row THEN
+        -- The row was created when the item entered the set; it is only gone if the owner is being deleted.
+        UPDATE inventory_setcompletion AS completion
+           SET revision = completion.revision + 1
+          FROM card_catalog_card AS card
+         WHERE card.id = item_card_id AND completion.owner_id = item_owner_id
+           AND completion.card_set_id = card.set_id;
+        RETURN;
+    END IF;
+    INSERT INTO inventory_setcompletion (owner_id, card_set_id, total, owned, foil, nonfoil, missing,
+                                         revision, refreshed_revision)
+    SELECT item_owner_id, card.set_id, 0, 0, 0, 0, '{}', 1, 0
+      FROM card_catalog_card AS card
+     WHERE card.id = item_card_id AND card.set_id IS NOT NULL
+    ON CONFLICT (owner_id, card_set_id) DO UPDATE SET revision = inventory_setcompletion.revision + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION inventory_item_set_completion() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.owner_id = OLD.owner_id
+       AND NEW.card_id IS NOT DISTINCT FROM OLD.card_id
+       AND NEW.is_foil = OLD.is_foil
+       AND (NEW.quantity_owned > 0) = (OLD.quantity_owned > 0) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM inventory_touch_set_completion(OLD.owner_id, OLD.card_id, false);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM inventory_touch_set_completion(NEW.owner_id, NEW.card_id, true);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER inventory_item_set_completion
+AFTER INSERT OR UPDATE OR DELETE ON inventory_inventoryitem
+FOR EACH ROW EXECUTE PROCEDURE inventory_item_set_completion();
+
+-- Existing inventories start out stale and are computed on first read.
+INSERT INTO inventory_setcompletion (owner_id, card_set_id, total, owned, foil, nonfoil, missing,
+                                     revision, refreshed_revision)
+SELECT DISTINCT item.owner_id, card.set_id, 0, 0, 0, 0, '{}', 1, 0
+  FROM inventory_inventoryitem AS item
+  JOIN card_catalog_card AS card ON card.id = item.card_id
+ WHERE card.set_id IS NOT NULL;
+"""
+
+DROP_SET_COMPLETION_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS inventory_item_set_completion ON inventory_inventoryitem;
+DROP FUNCTION IF EXISTS inventory_item_set_completion();
+DROP FUNCTION IF EXISTS inventory_touch_set_completion(uuid, integer, boolean);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('card_catalog', '__first__'),
+        ('inventory', '0011_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SetCompletion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0, help_text='Cards in the set')),
+                ('owned', models.PositiveIntegerField(default=0, help_text='Distinct cards of the set owned')),
+                ('foil', models.PositiveIntegerField(default=0, help_text='Distinct cards of the set owned in foil')),
+                ('nonfoil', models.PositiveIntegerField(default=0, help_text='Distinct cards of the set owned in non-foil')),
+                ('missing', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, help_text='Cards of the set not owned', size=None)),
+                ('revision', models.BigIntegerField(default=1, editable=False, help_text='Bumped by every relevant item change')),
+                ('refreshed_revision', models.BigIntegerField(default=0, editable=False, help_text='Revision the figures were computed from')),
+                ('refreshed_at', models.DateTimeField(editable=False, null=True)),
+                ('card_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='card_catalog.cardset')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Set Completion',
+                'verbose_name_plural': 'Set Completions',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='setcompletion',
+            constraint=models.UniqueConstraint(fields=('owner', 'card_set'), name='inventory_setcompletion_owner_set_uniq'),
+        ),
+        migrations.RunSQL(SET_COMPLETION_TRIGGER_SQL, reverse_sql=DROP_SET_COMPLETION_TRIGGER_SQL),
+    ]
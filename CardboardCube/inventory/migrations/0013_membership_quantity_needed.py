@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_setcompletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subcollectionmembership',
+            name='quantity_needed',
+            field=models.PositiveIntegerField(default=0, help_text='Copies of the card the sub-collection calls for, allocated or not'),
+        ),
+    ]
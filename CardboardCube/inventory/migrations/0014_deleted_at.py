@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_membership_quantity_needed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinventory',
+            name='deleted_at',
+            field=models.DateTimeField(editable=False, help_text='When background deletion started', null=True),
+        ),
+        migrations.AddField(
+            model_name='usersubcollection',
+            name='deleted_at',
+            field=models.DateTimeField(editable=False, help_text='When background deletion started', null=True),
+        ),
+    ]
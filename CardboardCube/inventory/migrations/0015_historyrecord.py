@@ -0,0 +1,41 @@
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0014_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryRecord',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('container_type', models.CharField(choices=[('I', 'Inventory'), ('C', 'Sub-collection')], max_length=1)),
+                ('container_id', models.UUIDField(help_text='Inventory or sub-collection recorded')),
+                ('version', models.BigIntegerField(help_text='Version of the container recorded')),
+                ('taken_at', models.DateTimeField()),
+                ('is_checkpoint', models.BooleanField(default=False)),
+                ('keys', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, size=None)),
+                ('quantities', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'History Record',
+                'verbose_name_plural': 'History Records',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='historyrecord',
+            index=models.Index(fields=['container_id', 'taken_at'], name='inventory_history_taken_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historyrecord',
+            index=models.Index(fields=['owner'], name='inventory_history_owner_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card_catalog', '__first__'),
+        ('inventory', '0015_historyrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsPartition',
+            fields=[
+                ('partition', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('computed_at', models.DateTimeField()),
+                ('checked_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Analytics Partition',
+                'verbose_name_plural': 'Analytics Partitions',
+            },
+        ),
+        migrations.CreateModel(
+            name='AnalyticsFigure',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('partition', models.PositiveSmallIntegerField(help_text='Owner range, or null for the totals', null=True)),
+                ('metric', models.CharField(choices=[('owned', 'Copies owned'), ('wanted', 'Copies wanted'), ('included', 'Copies included in sub-collections'), ('condition', 'Copies owned by condition'), ('language', 'Copies owned by language')], max_length=10)),
+                ('dimension', models.CharField(blank=True, default='', help_text='Sub-collection kind, condition or language', max_length=16)),
+                ('quantity', models.BigIntegerField(help_text='Copies')),
+                ('holders', models.BigIntegerField(help_text='Owners holding them, or sub-collections for included copies')),
+                ('card', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='card_catalog.card')),
+            ],
+            options={
+                'verbose_name': 'Analytics Figure',
+                'verbose_name_plural': 'Analytics Figures',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='analyticsfigure',
+            index=models.Index(condition=models.Q(partition__isnull=True), fields=['metric', 'dimension', '-quantity'], name='inventory_analytics_top_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyticsfigure',
+            index=models.Index(fields=['partition'], name='inventory_analytics_part_idx'),
+        ),
+    ]
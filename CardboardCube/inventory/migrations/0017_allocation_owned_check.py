@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+# Lowering quantity_owned below quantity_allocated is refused the same way over-allocating from the
+# membership side is. Rows that are already over-allocated can still be lowered towards consistency.
+OWNED_CHECK_SQL = """
+CREATE OR REPLACE FUNCTION inventory_item_availability() RETURNS trigger AS $$
+BEGIN
+    NEW.quantity_available := NEW.quantity_owned - NEW.quantity_allocated;
+    IF NEW.quantity_available < 0 AND (
+        TG_OP = 'INSERT' OR NEW.quantity_owned < OLD.quantity_owned OR NEW.quantity_allocated > OLD.quantity_allocated
+    ) THEN
+        RAISE EXCEPTION 'Not enough free copies of inventory item %', NEW.uuid USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+AVAILABILITY_SQL = """
+CREATE OR REPLACE FUNCTION inventory_item_availability() RETURNS trigger AS $$
+BEGIN
+    NEW.quantity_available := NEW.quantity_owned - NEW.quantity_allocated;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_analytics'),
+    ]
+
+    operations = [
+        migrations.RunSQL(OWNED_CHECK_SQL, reverse_sql=AVAILABILITY_SQL),
+    ]
@@ -1,25 +1,45 @@
 import uuid
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+from django.db.models.expressions import RawSQL
 from django.db.utils import IntegrityError
 from django.utils.translation import ugettext_lazy as _
+from psycopg2.errorcodes import CHECK_VIOLATION
 
+from card_catalog.models import Card
+from inventory.events import inventory_changed
 from inventory.exceptions import (
+    InsufficientQuantityException,
     InvalidInventoryItemException,
     InvalidGradingDetailsException,
 )
 
 
+class LiveManager(models.Manager):
+    """
+    Default manager hiding rows whose background deletion has started (see inventory.deletion).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class UserInventory(models.Model):
     """
     Class to contain a user's default, overall inventory that will contain all InventoryItem objects they own.
     """
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True)
     owner = models.ForeignKey('registration.User', on_delete=models.CASCADE)
-    inventory_items = models.ManyToManyField('InventoryItem', blank=True)
+    inventory_items = models.ManyToManyField('InventoryItem', blank=True, through='InventoryMembership')
+    version = models.BigIntegerField(default=1, editable=False, help_text=_("Bumped on every change to the inventory"))
+    deleted_at = models.DateTimeField(null=True, editable=False, help_text=_("When background deletion started"))
 
-    objects = models.Manager()
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = _('User Inventory')
@@ -53,23 +73,40 @@ class UserInventory(models.Model):
         kind = dict(UserSubCollection.KIND_CHOICES).get('OTHER')
         return UserSubCollection.objects.filter(owner=self.owner, kind=kind)
 
+    def get_inventory_items(self):
+        """
+        Owner-scoped queryset of the items in this inventory, pruned to the owner's partition.
+        """
+        return InventoryItem.objects.owned_by(self.owner_id).filter(
+            inventory_memberships__owner=self.owner_id,
+            inventory_memberships__userinventory=self,
+        )
+
     def add_items_to_inventory(self, inventory_item_pks):
-        for pk in inventory_item_pks:
-            try:
-                inventory_item = InventoryItem.objects.get(pk=pk)
-            except ObjectDoesNotExist as err:
-                raise InvalidInventoryItemException({'Errors': f'Unable to retrieve inventory item to add: {err}'})
-            self.inventory_items.add(inventory_item)
-        return self.save()
+        inventory_items = InventoryItem.objects.owned_by(self.owner_id).get_by_pks(inventory_item_pks)
+        with transaction.atomic():
+            InventoryMembership.objects.bulk_create(
+                [InventoryMembership(owner_id=self.owner_id, userinventory=self, inventoryitem=item)
+                 for item in inventory_items],
+                ignore_conflicts=True,
+            )
+            InventoryChange.objects.record(
+                self.owner_id, InventoryChange.INVENTORY_MEMBERSHIP, InventoryChange.UPSERT,
+                [item.pk for item in inventory_items], container_id=self.pk,
+            )
+        self.refresh_from_db(fields=['version'])
 
     def remove_items_from_inventory(self, inventory_item_pks):
-        for pk in inventory_item_pks:
-            try:
-                inventory_item = InventoryItem.objects.get(pk=pk)
-            except ObjectDoesNotExist as err:
-                raise InvalidInventoryItemException({'Errors': f'Unable to retrieve inventory item to add: {err}'})
-            self.inventory_items.remove(inventory_item)
-        return self.save()
+        inventory_items = InventoryItem.objects.owned_by(self.owner_id).get_by_pks(inventory_item_pks)
+        with transaction.atomic():
+            InventoryMembership.objects.filter(
+                owner=self.owner_id, userinventory=self, inventoryitem__in=inventory_items
+            ).delete()
+            InventoryChange.objects.record(
+                self.owner_id, InventoryChange.INVENTORY_MEMBERSHIP, InventoryChange.DELETE,
+                [item.pk for item in inventory_items], container_id=self.pk,
+            )
+        self.refresh_from_db(fields=['version'])
 
 
 class UserSubCollection(models.Model):
@@ -90,35 +127,176 @@ class UserSubCollection(models.Model):
     kind_override = models.CharField(null=True, max_length=56)
     description = models.TextField(null=True, max_length=256)
     owner = models.ForeignKey('registration.User', on_delete=models.CASCADE)
-    inventory_items = models.ManyToManyField('InventoryItem', blank=True)
+    inventory_items = models.ManyToManyField('InventoryItem', blank=True, through='SubCollectionMembership')
+    version = models.BigIntegerField(
+        default=1, editable=False, help_text=_("Bumped on every change to the sub-collection")
+    )
+    deleted_at = models.DateTimeField(null=True, editable=False, help_text=_("When background deletion started"))
 
-    objects = models.Manager()
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = _('User Sub-Collection')
         verbose_name_plural = _('User Sub-Collections')
+        indexes = [models.Index(fields=['kind'], name='inventory_sub_kind_idx')]
 
     def __str__(self):
         collection_type = self.kind_override if self.kind == 'other' else self.kind
         return f"{self.owner.username}'s {collection_type}"
 
-    def add_items_to_subcollection(self, inventory_item_pks):
-        for pk in inventory_item_pks:
-            try:
-                inventory_item = InventoryItem.objects.get(pk=pk)
-            except ObjectDoesNotExist as err:
-                raise InvalidInventoryItemException({'Errors': f'Unable to retrieve inventory item to add: {err}'})
-            self.inventory_items.add(inventory_item)
-        return self.save()
+    def change_payload(self):
+        """
+        Compact representation of this sub-collection for the change log.
+        """
+        return {'k': self.kind, 'ko': self.kind_override, 'd': self.description}
+
+    def get_inventory_items(self):
+        """
+        Owner-scoped queryset of the items in this sub-collection, pruned to the owner's partition.
+        """
+        return InventoryItem.objects.owned_by(self.owner_id).filter(
+            subcollection_memberships__owner=self.owner_id,
+            subcollection_memberships__subcollection=self,
+        )
+
+    def add_items_to_subcollection(self, inventory_item_pks, quantity=1):
+        """
+        Allocate `quantity` more copies of each item to this sub-collection.
+        """
+        with transaction.atomic():
+            # Locking the items (in a fixed order) serialises concurrent adds of the same items, including
+            # ones that are not members yet, so each reads the quantities the other wrote.
+            items = InventoryItem.objects.owned_by(self.owner_id).select_for_update().order_by('pk')
+            inventory_items = items.get_by_pks(inventory_item_pks)
+            current = dict(self.memberships.filter(owner=self.owner_id, inventoryitem__in=inventory_items).values_list(
+                'inventoryitem', 'quantity'
+            ))
+            self.set_item_quantities({item.pk: current.get(item.pk, 0) + quantity for item in inventory_items})
 
     def remove_items_from_subcollection(self, inventory_item_pks):
-        for pk in inventory_item_pks:
-            try:
-                inventory_item = InventoryItem.objects.get(pk=pk)
-            except ObjectDoesNotExist as err:
-                raise InvalidInventoryItemException({'Errors': f'Unable to retrieve inventory item to add: {err}'})
-            self.inventory_items.remove(inventory_item)
-        return self.save()
+        inventory_items = InventoryItem.objects.owned_by(self.owner_id).get_by_pks(inventory_item_pks)
+        with transaction.atomic():
+            SubCollectionMembership.objects.filter(
+                owner=self.owner_id, subcollection=self, inventoryitem__in=inventory_items
+            ).delete()
+            InventoryChange.objects.record(
+                self.owner_id, InventoryChange.SUBCOLLECTION_MEMBERSHIP, InventoryChange.DELETE,
+                [item.pk for item in inventory_items], container_id=self.pk,
+            )
+        self.refresh_from_db(fields=['version'])
+
+    def set_item_quantities(self, quantities):
+        """
+        Set how many copies of each item ({inventory item pk: quantity}) this sub-collection uses.
+
+        The database claims or releases the difference on each item's quantity_allocated in the same
+        transaction (see migration 0008), and InsufficientQuantityException is raised, with nothing
+        changed, if any item does not have enough free copies.
+        """
+        inventory_items = InventoryItem.objects.owned_by(self.owner_id).get_by_pks(quantities.keys())
+        quantities = {InventoryItem._meta.pk.to_python(pk): quantity for pk, quantity in quantities.items()}
+        if any(quantity < 0 for quantity in quantities.values()):
+            raise InvalidInventoryItemException({'Errors': 'Quantities cannot be negative.'})
+
+        try:
+            with transaction.atomic():
+                memberships = self.memberships.filter(owner=self.owner_id)
+                existing = {
+                    membership.inventoryitem_id: membership
+                    for membership in memberships.select_for_update().filter(inventoryitem__in=inventory_items)
+                }
+                changed, created = [], []
+                for item in inventory_items:
+                    membership = existing.get(item.pk)
+                    if membership is None:
+                        created.append(SubCollectionMembership(
+                            owner_id=self.owner_id, subcollection=self, inventoryitem=item, quantity=quantities[item.pk]
+                        ))
+                    elif membership.quantity != quantities[item.pk]:
+                        membership.quantity = quantities[item.pk]
+                        changed.append(membership)
+                memberships.bulk_update(changed, ['quantity'])
+                SubCollectionMembership.objects.bulk_create(created)
+                InventoryChange.objects.record(
+                    self.owner_id, InventoryChange.SUBCOLLECTION_MEMBERSHIP, InventoryChange.UPSERT,
+                    [membership.inventoryitem_id for membership in changed + created], container_id=self.pk,
+                    payloads=[membership.change_payload() for membership in changed + created],
+                )
+        except IntegrityError as err:
+            raise InsufficientQuantityException({'Errors': f'Unable to allocate inventory items: {err}'})
+        self.refresh_from_db(fields=['version'])
+
+    def set_needed_quantities(self, quantities):
+        """
+        Set how many copies of each item's card ({inventory item pk: quantity}) this sub-collection
+        calls for, whether or not they are allocated yet. Items that are not members yet join with
+        nothing allocated, so a deck can list cards the user does not own (see inventory.shopping).
+        """
+        inventory_items = InventoryItem.objects.owned_by(self.owner_id).get_by_pks(quantities.keys())
+        quantities = {InventoryItem._meta.pk.to_python(pk): quantity for pk, quantity in quantities.items()}
+        if any(quantity < 0 for quantity in quantities.values()):
+            raise InvalidInventoryItemException({'Errors': 'Quantities cannot be negative.'})
+
+        with transaction.atomic():
+            memberships = self.memberships.filter(owner=self.owner_id)
+            existing = {
+                membership.inventoryitem_id: membership
+                for membership in memberships.select_for_update().filter(inventoryitem__in=inventory_items)
+            }
+            changed, created = [], []
+            for item in inventory_items:
+                membership = existing.get(item.pk)
+                if membership is None:
+                    created.append(SubCollectionMembership(
+                        owner_id=self.owner_id, subcollection=self, inventoryitem=item, quantity=0,
+                        quantity_needed=quantities[item.pk],
+                    ))
+                elif membership.quantity_needed != quantities[item.pk]:
+                    membership.quantity_needed = quantities[item.pk]
+                    changed.append(membership)
+            memberships.bulk_update(changed, ['quantity_needed'])
+            SubCollectionMembership.objects.bulk_create(created)
+            InventoryChange.objects.record(
+                self.owner_id, InventoryChange.SUBCOLLECTION_MEMBERSHIP, InventoryChange.UPSERT,
+                [membership.inventoryitem_id for membership in changed + created], container_id=self.pk,
+                payloads=[membership.change_payload() for membership in changed + created],
+            )
+        self.refresh_from_db(fields=['version'])
+
+
+class InventoryItemQuerySet(models.QuerySet):
+
+    def owned_by(self, owner):
+        """
+        Restrict to a single owner's items. Owner-scoped lookups should always start here so that,
+        with partitioned storage (see the partition_inventory command), PostgreSQL only scans that
+        owner's partition.
+        """
+        return self.filter(owner=owner)
+
+    def available(self):
+        """
+        Items with copies not allocated to any sub-collection, e.g. what is free to put in a new deck.
+        Combined with owned_by() this is served by a single (owner, quantity_available) index scan.
+        """
+        return self.filter(quantity_available__gt=0)
+
+    def get_by_pks(self, inventory_item_pks):
+        """
+        Fetch the given items in one query, raising InvalidInventoryItemException if any are missing.
+        """
+        try:
+            pks = {InventoryItem._meta.pk.to_python(pk) for pk in inventory_item_pks}
+        except ValidationError as err:
+            raise InvalidInventoryItemException({'Errors': f'Unable to retrieve inventory items: {err}'})
+        inventory_items = list(self.filter(pk__in=pks))
+        missing = pks - {item.pk for item in inventory_items}
+        if missing:
+            raise InvalidInventoryItemException(
+                {'Errors': f'Unable to retrieve inventory items: {sorted(str(pk) for pk in missing)}'}
+            )
+        return inventory_items
 
 
 class InventoryItem(models.Model):
@@ -149,9 +327,16 @@ class InventoryItem(models.Model):
         ('ES', 'Spanish')
     )
 
+    # Maintained in the database from sub-collection allocations; never written back from an instance.
+    MAINTAINED_FIELDS = ('quantity_allocated', 'quantity_available')
+    # Packed into a bitmask, in this order, by change_payload().
+    FLAG_FIELDS = ('is_foil', 'is_signed', 'is_altered', 'is_misprint', 'is_miscut', 'is_graded')
+
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True)
     quantity_owned = models.IntegerField(default=0)
     quantity_wanted = models.IntegerField(default=0, null=True)
+    quantity_allocated = models.IntegerField(default=0, editable=False, help_text=_("Copies used by sub-collections"))
+    quantity_available = models.IntegerField(default=0, editable=False, help_text=_("Copies owned but not allocated"))
     card = models.ForeignKey('card_catalog.Card', null=True, blank=True, on_delete=models.SET_NULL)
     condition = models.CharField(
         max_length=3, choices=CONDITION_CHOICES, default=DEFAULT_CONDITION, help_text=_("Card condition")
@@ -170,11 +355,19 @@ class InventoryItem(models.Model):
                                         help_text=_("Details of card grade"))
     owner = models.ForeignKey('registration.User', on_delete=models.CASCADE)
 
-    objects = models.Manager()
+    objects = InventoryItemQuerySet.as_manager()
 
     class Meta:
         verbose_name = _('Inventory Item')
         verbose_name_plural = _('Inventory Items')
+        indexes = [
+            models.Index(fields=['owner', 'quantity_available'], name='inventory_item_available_idx'),
+            # Admin list filters: each serves "filter, newest pk first, first page" as an index scan.
+            models.Index(fields=['condition', 'uuid'], name='inventory_item_condition_idx'),
+            models.Index(fields=['language', 'uuid'], name='inventory_item_language_idx'),
+            models.Index(fields=['uuid'], condition=models.Q(is_foil=True), name='inventory_item_foil_idx'),
+            models.Index(fields=['uuid'], condition=models.Q(is_graded=True), name='inventory_item_graded_idx'),
+        ]
 
     def __str__(self):
         if self.is_graded and self.grading_details:
@@ -194,6 +387,46 @@ class InventoryItem(models.Model):
                 name += f" {field_name}"
         return name
 
+    def save(self, *args, **kwargs):
+        """
+        Saving an existing item writes every field but the MAINTAINED_FIELDS, which only the database
+        changes. Because of that the save is always an UPDATE: saving an item whose row has been
+        deleted raises DatabaseError instead of inserting it again (pass force_insert=True for that).
+        Owning fewer copies than are allocated raises InsufficientQuantityException.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+            ]
+        try:
+            with transaction.atomic():
+                super(InventoryItem, self).save(*args, **kwargs)
+        except IntegrityError as err:
+            if getattr(err.__cause__, 'pgcode', None) != CHECK_VIOLATION:
+                raise
+            raise InsufficientQuantityException({'Errors': f'Unable to change owned quantity: {err}'})
+        self.quantity_available = self.quantity_owned - self.quantity_allocated
+
+    def change_payload(self):
+        """
+        Compact representation of this item for the change log. Allocation counts are left out since
+        clients derive them from the sub-collection membership changes.
+        """
+        flags = 0
+        for bit, field in enumerate(self.FLAG_FIELDS):
+            if getattr(self, field):
+                flags |= 1 << bit
+        return {
+            'c': self.card_id,
+            'qo': self.quantity_owned,
+            'qw': self.quantity_wanted,
+            'cd': self.condition,
+            'l': self.language,
+            'f': flags,
+            'g': str(self.grading_details_id) if self.grading_details_id else None,
+        }
+
     def add_grading_details(self, grading_data):
         try:
             grading_details = GradingDetails.objects.create(
@@ -239,6 +472,7 @@ class GradingDetails(models.Model):
     class Meta:
         verbose_name = _('Grading Details')
         verbose_name_plural = _('Grading Details')
+        indexes = [models.Index(fields=['serial_number'], name='inventory_grading_serial_idx')]
 
     def determine_abbreviation(self):
         subgrades = [self.centering_grade, self.corners_grade, self.edges_grade, self.surface_grade]
@@ -251,3 +485,406 @@ class GradingDetails(models.Model):
                 modifier += '+'
         formatted_grade = f'{self.overall_grade:.1f}'
         return f'{formatted_grade} {base}{modifier}'
+
+
+class InventoryMembership(models.Model):
+    """
+    Links an InventoryItem to a UserInventory. The owner is repeated here so the table can be
+    partitioned by it alongside InventoryItem.
+    """
+    userinventory = models.ForeignKey('UserInventory', on_delete=models.CASCADE, related_name='memberships')
+    inventoryitem = models.ForeignKey('InventoryItem', on_delete=models.CASCADE, related_name='inventory_memberships')
+    owner = models.ForeignKey('registration.User', on_delete=models.CASCADE, related_name='+')
+
+    objects = models.Manager()
+
+    class Meta:
+        db_table = 'inventory_userinventory_inventory_items'
+        unique_together = (('userinventory', 'inventoryitem'),)
+
+
+class SubCollectionMembership(models.Model):
+    """
+    Allocates copies of an InventoryItem to a UserSubCollection. The owner is repeated here so the
+    table can be partitioned by it alongside InventoryItem.
+    """
+    subcollection = models.ForeignKey(
+        'UserSubCollection', on_delete=models.CASCADE, related_name='memberships', db_column='usersubcollection_id'
+    )
+    inventoryitem = models.ForeignKey(
+        'InventoryItem', on_delete=models.CASCADE, related_name='subcollection_memberships'
+    )
+    owner = models.ForeignKey('registration.User', on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(default=1, help_text=_("Copies of the item allocated to the sub-collection"))
+    quantity_needed = models.PositiveIntegerField(
+        default=0, help_text=_("Copies of the card the sub-collection calls for, allocated or not")
+    )
+
+    objects = models.Manager()
+
+    class Meta:
+        db_table = 'inventory_usersubcollection_inventory_items'
+        unique_together = (('subcollection', 'inventoryitem'),)
+
+    def change_payload(self):
+        return {'q': self.quantity, 'n': self.quantity_needed}
+
+
+class CardSearchDocument(models.Model):
+    """
+    Full-text search vector for a card_catalog Card, weighted over name, type line and oracle text.
+    Rows are maintained by a trigger on the card table (see migration 0007), so catalog imports that
+    bypass the ORM stay searchable.
+    """
+    card = models.OneToOneField(
+        'card_catalog.Card', primary_key=True, on_delete=models.CASCADE, related_name='search_document'
+    )
+    search_vector = SearchVectorField(null=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = _('Card Search Document')
+        verbose_name_plural = _('Card Search Documents')
+        indexes = [GinIndex(fields=['search_vector'], name='inventory_card_search_gin')]
+
+
+class TxidCurrent(models.Func):
+    function = 'txid_current'
+    template = '%(function)s()'
+    output_field = models.BigIntegerField()
+
+
+INITIAL_CURSOR = '0-0'
+
+
+def encode_cursor(txid, change_id):
+    """
+    Change log cursors are handed to clients as "<txid>-<change id>".
+    """
+    return f'{txid}-{change_id}'
+
+
+def decode_cursor(cursor):
+    txid, change_id = cursor.split('-')
+    return int(txid), int(change_id)
+
+
+class InventoryChangeManager(models.Manager):
+
+    def record(self, owner_id, target, operation, object_ids, container_id=None, payloads=None):
+        """
+        Append one change per object id and bump the versions of the affected inventory and
+        sub-collections. Call inside the transaction making the change so the log entries commit
+        (and are stamped with the transaction id) together with it.
+        """
+        if payloads is None:
+            payloads = [None] * len(object_ids)
+        self.bump_versions(owner_id, target, object_ids, container_id)
+        changes = self.bulk_create([
+            InventoryChange(
+                txid=TxidCurrent(), owner_id=owner_id, target=target, operation=operation,
+                object_id=object_id, container_id=container_id, payload=payload,
+            )
+            for object_id, payload in zip(object_ids, payloads)
+        ])
+        inventory_changed.send(sender=InventoryChange, owner_id=owner_id, target=target, operation=operation,
+                               object_ids=object_ids, container_id=container_id)
+        return changes
+
+    def bump_versions(self, owner_id, target, object_ids, container_id=None):
+        """
+        Every change bumps the owner's inventory version, plus the version of each sub-collection
+        whose contents it touches.
+        """
+        UserInventory.objects.filter(owner=owner_id).update(version=models.F('version') + 1)
+        if target == InventoryChange.SUBCOLLECTION:
+            subcollections = UserSubCollection.objects.filter(owner=owner_id, pk__in=object_ids)
+        elif target == InventoryChange.SUBCOLLECTION_MEMBERSHIP:
+            subcollections = UserSubCollection.objects.filter(owner=owner_id, pk=container_id)
+        elif target == InventoryChange.ITEM:
+            containing = SubCollectionMembership.objects.filter(owner=owner_id, inventoryitem__in=object_ids)
+            subcollections = UserSubCollection.objects.filter(owner=owner_id, pk__in=containing.values('subcollection'))
+        else:
+            return
+        subcollections.update(version=models.F('version') + 1)
+
+    def since(self, owner, cursor=None, settled=True):
+        """
+        Changes for an owner after `cursor`, a (txid, id) pair, in commit-safe order.
+
+        Only transactions older than the oldest one still in progress are returned, so a change that
+        commits late can never end up behind a cursor a client has already been given. Pass
+        settled=False for every change visible to the current transaction instead, e.g. to catch up
+        state that is re-read from the database and so tolerates seeing a change twice.
+        """
+        changes = self.filter(owner=owner)
+        if settled:
+            changes = changes.filter(txid__lt=RawSQL('txid_snapshot_xmin(txid_current_snapshot())', []))
+        if cursor is not None:
+            txid, change_id = cursor
+            changes = changes.filter(models.Q(txid__gt=txid) | models.Q(txid=txid, id__gt=change_id))
+        return changes.order_by('txid', 'id')
+
+    def compact(self, older_than):
+        """
+        Delete changes older than `older_than` that a later change to the same object supersedes.
+        Replaying the log from any cursor still yields the same final state.
+        """
+        table = self.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                DELETE FROM {table} AS old
+                 USING {table} AS new
+                 WHERE new.owner_id = old.owner_id
+                   AND new.target = old.target
+                   AND new.object_id = old.object_id
+                   AND new.container_id IS NOT DISTINCT FROM old.container_id
+                   AND (new.txid, new.id) > (old.txid, old.id)
+                   AND old.created_at < %s
+            """, [older_than])
+            return cursor.rowcount
+
+
+class InventoryChange(models.Model):
+    """
+    Append-only log of changes to a user's items, sub-collections and memberships, used by clients
+    to sync deltas instead of re-downloading their whole inventory.
+    """
+    ITEM = 'I'
+    SUBCOLLECTION = 'C'
+    INVENTORY_MEMBERSHIP = 'M'
+    SUBCOLLECTION_MEMBERSHIP = 'S'
+    TARGET_CHOICES = (
+        (ITEM, 'Inventory item'),
+        (SUBCOLLECTION, 'Sub-collection'),
+        (INVENTORY_MEMBERSHIP, 'Inventory membership'),
+        (SUBCOLLECTION_MEMBERSHIP, 'Sub-collection membership'),
+    )
+    UPSERT = 'U'
+    DELETE = 'D'
+    OPERATION_CHOICES = (
+        (UPSERT, 'Created or updated'),
+        (DELETE, 'Deleted'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    txid = models.BigIntegerField(help_text=_("Id of the transaction that made the change"))
+    owner = models.ForeignKey('registration.User', on_delete=models.CASCADE, related_name='+')
+    target = models.CharField(max_length=1, choices=TARGET_CHOICES)
+    operation = models.CharField(max_length=1, choices=OPERATION_CHOICES)
+    object_id = models.UUIDField(help_text=_("Changed item or sub-collection"))
+    container_id = models.UUIDField(null=True, help_text=_("Inventory or sub-collection of a membership"))
+    payload = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = InventoryChangeManager()
+
+    class Meta:
+        verbose_name = _('Inventory Change')
+        verbose_name_plural = _('Inventory Changes')
+        indexes = [
+            models.Index(fields=['owner', 'txid', 'id'], name='inventory_change_cursor_idx'),
+            models.Index(fields=['owner', 'target', 'object_id'], name='inventory_change_object_idx'),
+            models.Index(fields=['created_at'], name='inventory_change_created_idx'),
+        ]
+
+
+class SetCompletionManager(models.Manager):
+
+    def for_owner(self, owner_id):
+        """
+        The owner's completion rows, newest figures guaranteed: rows marked stale since their last
+        refresh are refreshed first, which normally they already have been after commit.
+        """
+        rows = self.filter(owner=owner_id).select_related('card_set').order_by('card_set__name')
+        if any(row.revision > row.refreshed_revision for row in rows):
+            self.refresh(owner_id)
+            rows = rows.all()
+        return rows
+
+    def refresh(self, owner_id):
+        """
+        Recompute the owner's stale rows with one grouped query over their items joined to the cards
+        of the stale sets, and return how many were refreshed.
+
+        Each row keeps the revision it was computed from, so a change marking the row stale again
+        while this runs leaves it stale rather than being overwritten.
+        """
+        table = self.model._meta.db_table
+        card_table = Card._meta.db_table
+        set_column = Card._meta.get_field('set').column
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                WITH stale AS (
+                    SELECT card_set_id, revision FROM {table}
+                     WHERE owner_id = %(owner)s AND revision > refreshed_revision
+                ), owned AS (
+                    SELECT i.card_id, bool_or(i.is_foil) AS foil, bool_or(NOT i.is_foil) AS nonfoil
+                      FROM {InventoryItem._meta.db_table} i
+                      JOIN {card_table} c ON c.id = i.card_id
+                     WHERE i.owner_id = %(owner)s AND i.quantity_owned > 0
+                       AND c.{set_column} IN (SELECT card_set_id FROM stale)
+                     GROUP BY i.card_id
+                )
+                INSERT INTO {table} (owner_id, card_set_id, total, owned, foil, nonfoil, missing,
+                                     revision, refreshed_revision, refreshed_at)
+                SELECT %(owner)s, s.card_set_id, count(c.id), count(o.card_id),
+                       count(*) FILTER (WHERE o.foil), count(*) FILTER (WHERE o.nonfoil),
+                       coalesce(array_agg(c.id ORDER BY c.id) FILTER (WHERE c.id IS NOT NULL AND o.card_id IS NULL),
+                                '{{}}'),
+                       s.revision, s.revision, now()
+                  FROM stale s
+                  LEFT JOIN {card_table} c ON c.{set_column} = s.card_set_id
+                  LEFT JOIN owned o ON o.card_id = c.id
+                 GROUP BY s.card_set_id, s.revision
+                ON CONFLICT (owner_id, card_set_id) DO UPDATE
+                   SET total = EXCLUDED.total, owned = EXCLUDED.owned, foil = EXCLUDED.foil,
+                       nonfoil = EXCLUDED.nonfoil, missing = EXCLUDED.missing,
+                       refreshed_revision = EXCLUDED.refreshed_revision, refreshed_at = EXCLUDED.refreshed_at
+            """, {'owner': owner_id})
+            return cursor.rowcount
+
+    def rebuild(self, owner_id):
+        """
+        Mark every set the owner has items in stale and refresh, e.g. after the card catalog changed.
+        """
+        set_column = Card._meta.get_field('set').column
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {self.model._meta.db_table} (owner_id, card_set_id, total, owned, foil, nonfoil,
+                                                          missing, revision, refreshed_revision)
+                SELECT DISTINCT i.owner_id, c.{set_column}, 0, 0, 0, 0, '{{}}', 1, 0
+                  FROM {InventoryItem._meta.db_table} i
+                  JOIN {Card._meta.db_table} c ON c.id = i.card_id
+                 WHERE i.owner_id = %s AND c.{set_column} IS NOT NULL
+                ON CONFLICT (owner_id, card_set_id) DO UPDATE SET revision = {self.model._meta.db_table}.revision + 1
+            """, [owner_id])
+        return self.refresh(owner_id)
+
+
+class SetCompletion(models.Model):
+    """
+    How much of a card set a user owns. Rows are derived from the user's items: a trigger on the
+    item table (see migration 0012) bumps the revision of every (owner, set) an item change touches,
+    and SetCompletion.objects.refresh() recomputes the rows whose figures are older than their revision.
+    """
+    owner = models.ForeignKey('registration.User', on_delete=models.CASCADE, related_name='+')
+    card_set = models.ForeignKey('card_catalog.CardSet', on_delete=models.CASCADE, related_name='+')
+    total = models.PositiveIntegerField(default=0, help_text=_("Cards in the set"))
+    owned = models.PositiveIntegerField(default=0, help_text=_("Distinct cards of the set owned"))
+    foil = models.PositiveIntegerField(default=0, help_text=_("Distinct cards of the set owned in foil"))
+    nonfoil = models.PositiveIntegerField(default=0, help_text=_("Distinct cards of the set owned in non-foil"))
+    missing = ArrayField(models.IntegerField(), default=list, blank=True, help_text=_("Cards of the set not owned"))
+    revision = models.BigIntegerField(default=1, editable=False, help_text=_("Bumped by every relevant item change"))
+    refreshed_revision = models.BigIntegerField(
+        default=0, editable=False, help_text=_("Revision the figures were computed from")
+    )
+    refreshed_at = models.DateTimeField(null=True, editable=False)
+
+    objects = SetCompletionManager()
+
+    class Meta:
+        verbose_name = _('Set Completion')
+        verbose_name_plural = _('Set Completions')
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'card_set'], name='inventory_setcompletion_owner_set_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.card_set.name}: {self.owned}/{self.total}, {self.foil} foil"
+
+
+class HistoryRecord(models.Model):
+    """
+    One point in the recorded history of an inventory or sub-collection (see inventory.history): its
+    full contents at a checkpoint, or the changes since the previous record. Contents are kept as
+    parallel arrays of card keys (card id * 2, plus 1 for foil) and quantities, or quantity deltas.
+    """
+    INVENTORY = 'I'
+    SUBCOLLECTION = 'C'
+    CONTAINER_CHOICES = (
+        (INVENTORY, 'Inventory'),
+        (SUBCOLLECTION, 'Sub-collection'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    owner = models.ForeignKey('registration.User', on_delete=models.CASCADE, related_name='+')
+    container_type = models.CharField(max_length=1, choices=CONTAINER_CHOICES)
+    container_id = models.UUIDField(help_text=_("Inventory or sub-collection recorded"))
+    version = models.BigIntegerField(help_text=_("Version of the container recorded"))
+    taken_at = models.DateTimeField()
+    is_checkpoint = models.BooleanField(default=False)
+    keys = ArrayField(models.BigIntegerField(), default=list, blank=True)
+    quantities = ArrayField(models.IntegerField(), default=list, blank=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = _('History Record')
+        verbose_name_plural = _('History Records')
+        indexes = [
+            models.Index(fields=['container_id', 'taken_at'], name='inventory_history_taken_idx'),
+            models.Index(fields=['owner'], name='inventory_history_owner_idx'),
+        ]
+
+
+class AnalyticsPartition(models.Model):
+    """
+    One owner range of the analytics rollups (see inventory.analytics): the fingerprint of its owners'
+    latest changes its figures were computed from, and when they were computed and last checked.
+    """
+    partition = models.PositiveSmallIntegerField(primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    computed_at = models.DateTimeField()
+    checked_at = models.DateTimeField()
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = _('Analytics Partition')
+        verbose_name_plural = _('Analytics Partitions')
+
+    def __str__(self):
+        return f"Analytics partition {self.partition}"
+
+
+class AnalyticsFigure(models.Model):
+    """
+    An aggregate over every user's items (see inventory.analytics): copies and holders of a card owned,
+    wanted or included in sub-collections of a kind, or of a condition or language. Rows with a
+    partition cover one owner range; rows without are the totals served by the API.
+    """
+    OWNED = 'owned'
+    WANTED = 'wanted'
+    INCLUDED = 'included'
+    CONDITION = 'condition'
+    LANGUAGE = 'language'
+    METRIC_CHOICES = (
+        (OWNED, 'Copies owned'),
+        (WANTED, 'Copies wanted'),
+        (INCLUDED, 'Copies included in sub-collections'),
+        (CONDITION, 'Copies owned by condition'),
+        (LANGUAGE, 'Copies owned by language'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    partition = models.PositiveSmallIntegerField(null=True, help_text=_("Owner range, or null for the totals"))
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES)
+    dimension = models.CharField(
+        max_length=16, blank=True, default='', help_text=_("Sub-collection kind, condition or language")
+    )
+    card = models.ForeignKey('card_catalog.Card', null=True, on_delete=models.CASCADE, related_name='+')
+    quantity = models.BigIntegerField(help_text=_("Copies"))
+    holders = models.BigIntegerField(help_text=_("Owners holding them, or sub-collections for included copies"))
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = _('Analytics Figure')
+        verbose_name_plural = _('Analytics Figures')
+        indexes = [
+            models.Index(fields=['metric', 'dimension', '-quantity'], name='inventory_analytics_top_idx',
+                         condition=models.Q(partition__isnull=True)),
+            models.Index(fields=['partition'], name='inventory_analytics_part_idx'),
+        ]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import json
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    The planner's row estimate for a queryset, from EXPLAIN, without running it.
+    """
+    queryset = queryset.order_by()
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over very large tables. An exact COUNT(*) over millions of rows
+    takes seconds, so once the planner expects more than settings.ADMIN_EXACT_COUNT_LIMIT rows its
+    estimate is used instead.
+    """
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimate_count(self.object_list)
+            if estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super(EstimatedCountPaginator, self).count
@@ -0,0 +1,24 @@
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F
+
+# Must match the configuration used by inventory_card_search_vector() in migration 0007.
+SEARCH_CONFIG = 'english'
+
+
+def search_inventory_items(inventory_items, query_text):
+    """
+    Filter an InventoryItem queryset down to items whose card matches a web-search style query
+    (e.g. `draw a card`, `"enters the battlefield" -token`), best matches first.
+
+    Each row is annotated with its `rank` and an oracle text `headline` with the matched terms
+    wrapped in <b> tags.
+    """
+    query = SearchQuery(query_text, config=SEARCH_CONFIG, search_type='websearch')
+    return inventory_items.filter(
+        card__search_document__search_vector=query,
+    ).annotate(
+        rank=SearchRank(F('card__search_document__search_vector'), query),
+        headline=SearchHeadline(
+            'card__oracle_text', query, config=SEARCH_CONFIG, start_sel='<b>', stop_sel='</b>', max_fragments=2
+        ),
+    ).order_by('-rank', 'card__name')
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Shopping lists: the cards a user still has to acquire to complete one or more decks or cubes.
+
+A sub-collection calls for max(quantity_needed, quantity) copies of each member item's card. What it
+calls for is covered first by the copies already allocated to the chosen sub-collections and then by
+the owner's unallocated copies of the card anywhere in their inventory. The whole subtraction is one
+grouped query, matching cards by printing ("card") or by name ("name", ignoring printing and set).
+"""
+from django.db import connection, transaction
+
+from card_catalog.models import Card
+from inventory.compare import IDENTITIES
+from inventory.exceptions import InvalidCardListException
+from inventory.models import InventoryChange, InventoryItem, SubCollectionMembership, UserInventory
+
+MAX_SUBCOLLECTIONS = 50
+
+
+def _shopping_sql(owner_id, subcollection_ids, identity):
+    item = InventoryItem._meta.db_table
+    card = Card._meta.db_table
+    membership = SubCollectionMembership._meta
+    subcollection_column = membership.get_field('subcollection').column
+    if identity == 'name':
+        need_key, need_join = 'c.name', f'JOIN {card} c ON c.id = i.card_id'
+        have_key, have_join = 'c.name', f'JOIN {card} c ON c.id = i.card_id'
+    else:
+        need_key, need_join = 'i.card_id', ''
+        have_key, have_join = 'i.card_id', ''
+    return (
+        f"""
+        WITH need AS (
+            SELECT {need_key} AS key, MIN(i.card_id) AS card_id,
+                   SUM(GREATEST(m.quantity_needed, m.quantity)) AS needed, SUM(m.quantity) AS allocated
+              FROM {membership.db_table} m
+              JOIN {item} i ON i.uuid = m.inventoryitem_id AND i.owner_id = m.owner_id
+              {need_join}
+             WHERE m.owner_id = %s AND m.{subcollection_column} = ANY(%s::uuid[]) AND i.card_id IS NOT NULL
+             GROUP BY {need_key}
+        ), have AS (
+            SELECT {have_key} AS key, SUM(i.quantity_available) AS available
+              FROM {item} i
+              {have_join}
+             WHERE i.owner_id = %s AND i.quantity_available > 0 AND {have_key} IN (SELECT key FROM need)
+             GROUP BY {have_key}
+        )
+        SELECT need.key, need.card_id, need.needed, need.allocated, COALESCE(have.available, 0)
+          FROM need LEFT JOIN have ON have.key = need.key
+         WHERE need.needed > need.allocated + COALESCE(have.available, 0)
+         ORDER BY need.key
+        """,
+        [owner_id, [str(pk) for pk in subcollection_ids], owner_id],
+    )
+
+
+def shopping_list(owner_id, subcollection_ids, identity='card'):
+    """
+    The cards the owner is short of for the given sub-collections, as a list of {"card", "needed",
+    "allocated", "available", "short"} entries. With identity "name" each entry also has the card's
+    "name", and "card" is the lowest-numbered printing the sub-collections use.
+    """
+    if identity not in IDENTITIES:
+        raise InvalidCardListException({'Errors': f'identity must be one of {IDENTITIES}.'})
+    if not subcollection_ids or len(subcollection_ids) > MAX_SUBCOLLECTIONS:
+        raise InvalidCardListException({'Errors': f'Give between 1 and {MAX_SUBCOLLECTIONS} sub-collections.'})
+    sql, params = _shopping_sql(owner_id, subcollection_ids, identity)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    entries = []
+    for key, card_id, needed, allocated, available in rows:
+        entry = {'card': card_id, 'needed': int(needed), 'allocated': int(allocated), 'available': int(available),
+                 'short': int(needed - allocated - available)}
+        if identity == 'name':
+            entry['name'] = key
+        entries.append(entry)
+    return entries
+
+
+def fold_into_wanted(owner_id, entries):
+    """
+    Raise quantity_wanted to at least the shortfall of each shopping list entry, on the owner's
+    non-foil item of the card where there is one and on a new item with no copies owned otherwise.
+    Returns the primary keys of the items changed or created.
+    """
+    short = {entry['card']: entry['short'] for entry in entries}
+    with transaction.atomic():
+        items = {}
+        for item in InventoryItem.objects.owned_by(owner_id).select_for_update().filter(
+            card__in=short
+        ).order_by('is_foil', 'pk'):
+            items.setdefault(item.card_id, item)
+        changed = [item for item in items.values() if (item.quantity_wanted or 0) < short[item.card_id]]
+        for item in changed:
+            item.quantity_wanted = short[item.card_id]
+        InventoryItem.objects.bulk_update(changed, ['quantity_wanted'])
+        created = InventoryItem.objects.bulk_create([
+            InventoryItem(owner_id=owner_id, card_id=card_id, quantity_owned=0, quantity_wanted=quantity)
+            for card_id, quantity in short.items() if card_id not in items
+        ])
+        items = changed + created
+        if not items:
+            return []
+        # Neither bulk_update() nor bulk_create() sends post_save, so log the changes here.
+        InventoryChange.objects.record(
+            owner_id, InventoryChange.ITEM, InventoryChange.UPSERT, [item.pk for item in items],
+            payloads=[item.change_payload() for item in items],
+        )
+        inventory = UserInventory.objects.filter(owner=owner_id).first()
+        if inventory is not None and created:
+            inventory.add_items_to_inventory([item.pk for item in created])
+    return [item.pk for item in items]
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from inventory import live, snapshots
+from inventory.events import inventory_changed
+from inventory.models import InventoryChange, InventoryItem, UserSubCollection
+
+
+@receiver(post_save, sender=InventoryItem)
+def record_item_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    InventoryChange.objects.record(
+        instance.owner_id, InventoryChange.ITEM, InventoryChange.UPSERT, [instance.pk],
+        payloads=[instance.change_payload()],
+    )
+
+
+@receiver(post_delete, sender=InventoryItem)
+def record_item_deleted(sender, instance, **kwargs):
+    InventoryChange.objects.record(instance.owner_id, InventoryChange.ITEM, InventoryChange.DELETE, [instance.pk])
+
+
+@receiver(post_save, sender=UserSubCollection)
+def record_subcollection_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    InventoryChange.objects.record(
+        instance.owner_id, InventoryChange.SUBCOLLECTION, InventoryChange.UPSERT, [instance.pk],
+        payloads=[instance.change_payload()],
+    )
+
+
+@receiver(post_delete, sender=UserSubCollection)
+def record_subcollection_deleted(sender, instance, **kwargs):
+    InventoryChange.objects.record(
+        instance.owner_id, InventoryChange.SUBCOLLECTION, InventoryChange.DELETE, [instance.pk]
+    )
+
+
+@receiver(inventory_changed)
+def schedule_snapshot_refresh(sender, owner_id, target, **kwargs):
+    if target in snapshots.ITEM_TARGETS:
+        transaction.on_commit(lambda: snapshots.schedule_refresh(owner_id))
+
+
+@receiver(inventory_changed)
+def schedule_set_completion_refresh(sender, owner_id, target, **kwargs):
+    if target == InventoryChange.ITEM:
+        from inventory.tasks import refresh_set_completion
+        transaction.on_commit(lambda: refresh_set_completion.delay(str(owner_id)))
+
+
+@receiver(inventory_changed)
+def schedule_live_event(sender, owner_id, target, operation, object_ids, container_id=None, **kwargs):
+    object_ids = list(object_ids)
+    transaction.on_commit(lambda: live.publish_change(owner_id, target, operation, object_ids, container_id))
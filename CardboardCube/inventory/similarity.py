@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+"Cards like this one that I already own": nearest-neighbour search over card attribute vectors.
+
+Every catalog card gets a fixed-length float32 vector with one block each for colour identity, mana
+value, card types, subtypes and the keyword abilities and effects its oracle text names. Each block
+is scaled to unit length and weighted, and the whole vector normalised, so the dot product of two
+cards' vectors is a similarity between 0 and 1.
+
+build_index() computes the vectors once per catalog version and writes them as .npy files under
+SIMILARITY_INDEX_ROOT/<version>/, then points the CURRENT file at that version. Workers memory-map
+the files read-only, so every process on a host shares one copy through the page cache, and switch to
+a new version on their next query after CURRENT changes. A query scores the user's cards with one
+matrix-vector product (over the whole catalog once that is cheaper than gathering their rows) and
+keeps the best.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from django.conf import settings
+from django.utils import timezone
+
+from card_catalog.models import Card
+from inventory.exceptions import SimilarityIndexUnavailableException
+from inventory.models import InventoryItem
+from inventory.simulation import COLORS, parse_list
+from inventory.snapshots import get_snapshot_store
+
+CURRENT_FILE = 'CURRENT'
+BUILD_PENDING_KEY = 'similarity:build-pending'
+ARRAYS = ('card_ids', 'features', 'name_keys', 'color_masks')
+
+COLOR_DIMENSIONS = COLORS + 'C'  # C marks colourless cards, so they resemble each other.
+CMC_CENTERS = np.arange(8, dtype=np.float32)  # Mana values of 7 and more share the last bump.
+CMC_WIDTH = 0.75
+TYPES = ('Artifact', 'Battle', 'Creature', 'Enchantment', 'Instant', 'Land', 'Planeswalker', 'Sorcery', 'Tribal')
+SUBTYPE_BUCKETS = 32
+KEYWORDS = (
+    'flying', 'first strike', 'double strike', 'deathtouch', 'haste', 'hexproof', 'indestructible',
+    'lifelink', 'menace', 'reach', 'trample', 'vigilance', 'defender', 'flash', 'ward', 'prowess',
+    'protection from', 'shroud', 'cycling', 'kicker', 'flashback', 'madness', 'morph', 'equip',
+    'enchant creature', 'landfall', 'cascade', 'convoke', 'delve', 'storm', 'affinity', 'undying',
+    'persist', 'evoke', 'unearth', 'exploit', 'ninjutsu', 'suspend', 'echo', 'buyback',
+    'draw', 'discard', 'destroy', 'exile', 'counter target', 'sacrifice', 'search your library',
+    'create', 'token', 'return target', 'from your graveyard', 'gain life', 'lose life', 'deals damage',
+    'damage to any target', '+1/+1 counter', '-1/-1 counter', 'add {', 'untap', 'tap target',
+    'scry', 'mill', 'copy', 'each opponent', 'enters the battlefield', 'dies', 'attacks', 'can\'t block',
+)
+KEYWORD_PATTERNS = [re.compile(r'(?<![\w+-])' + re.escape(keyword)) for keyword in KEYWORDS]
+REMINDER_TEXT = re.compile(r'\([^)]*\)')
+WEIGHTS = (
+    ('colors', len(COLOR_DIMENSIONS), 1.0),
+    ('cmc', len(CMC_CENTERS), 0.8),
+    ('types', len(TYPES), 1.0),
+    ('subtypes', SUBTYPE_BUCKETS, 0.6),
+    ('keywords', len(KEYWORDS), 1.0),
+)
+DIMENSIONS = sum(size for name, size, weight in WEIGHTS)
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+SimilarCard = namedtuple('SimilarCard', ['card_id', 'score'])
+
+_lock = threading.Lock()
+_loaded = None
+
+
+def _root():
+    return settings.SIMILARITY_INDEX_ROOT
+
+
+def _stable_hash(text):
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def card_vector(card_name, cmc, types, subtypes, color_identity, oracle_text):
+    """
+    The feature vector for one card, plus its colour identity as a WUBRG bit mask.
+    """
+    blocks = {name: np.zeros(size, dtype=np.float32) for name, size, weight in WEIGHTS}
+    mask = 0
+    for color in parse_list(color_identity):
+        if color in COLORS:
+            mask |= 1 << COLORS.index(color)
+            blocks['colors'][COLORS.index(color)] = 1
+    if not mask:
+        blocks['colors'][-1] = 1
+    blocks['cmc'][:] = np.exp(-((min(float(cmc or 0), CMC_CENTERS[-1]) - CMC_CENTERS) / CMC_WIDTH) ** 2)
+    for card_type in parse_list(types):
+        if card_type in TYPES:
+            blocks['types'][TYPES.index(card_type)] = 1
+    for subtype in parse_list(subtypes):
+        blocks['subtypes'][_stable_hash(subtype) % SUBTYPE_BUCKETS] = 1
+    text = oracle_text or ''
+    if card_name:
+        text = text.replace(card_name, '~')
+    text = REMINDER_TEXT.sub('', text).lower()
+    for index, pattern in enumerate(KEYWORD_PATTERNS):
+        if pattern.search(text):
+            blocks['keywords'][index] = 1
+
+    vector = np.concatenate([
+        blocks[name] / (np.linalg.norm(blocks[name]) or 1) * np.sqrt(weight) for name, size, weight in WEIGHTS
+    ])
+    return vector / (np.linalg.norm(vector) or 1), mask
+
+
+def build_index(force=False):
+    """
+    Compute the feature matrix for the current card catalog and make it the live index, unless the
+    live index already covers this catalog version. Returns the version.
+    """
+    rows = Card.objects.order_by('pk').values_list(
+        'pk', 'name', 'cmc', 'types', 'subtypes', 'color_identity', 'oracle_text'
+    )
+    card_ids, name_keys, color_masks, vectors = [], [], [], []
+    digest = hashlib.sha1(repr(WEIGHTS + (KEYWORDS, TYPES)).encode('utf-8'))
+    for row in rows.iterator(chunk_size=5000):
+        digest.update(repr(row).encode('utf-8'))
+        card_id, name = row[0], row[1]
+        vector, mask = card_vector(*row[1:])
+        card_ids.append(card_id)
+        name_keys.append(_stable_hash(name or ''))
+        color_masks.append(mask)
+        vectors.append(vector)
+    version = digest.hexdigest()[:16]
+    if not force and current_version() == version:
+        return version
+
+    root = _root()
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f'.{version}-', dir=root)
+    arrays = {
+        'card_ids': np.array(card_ids, dtype=np.int64),
+        'features': np.array(vectors, dtype=np.float32).reshape(len(vectors), DIMENSIONS),
+        'name_keys': np.array(name_keys, dtype=np.uint32),
+        'color_masks': np.array(color_masks, dtype=np.uint8),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, name + '.npy'), array)
+    with open(os.path.join(staging, 'meta.json'), 'w') as meta:
+        json.dump({'version': version, 'cards': len(card_ids), 'built_at': timezone.now().isoformat()}, meta)
+    target = os.path.join(root, version)
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(staging, target)
+
+    pointer = os.path.join(root, f'.{CURRENT_FILE}-{os.getpid()}')
+    with open(pointer, 'w') as current:
+        current.write(version)
+    previous = current_version()
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+    # Keep the version being replaced for processes still reading it; older ones can go.
+    for entry in os.listdir(root):
+        if entry not in (version, previous, CURRENT_FILE) and not entry.startswith('.'):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return version
+
+
+def schedule_build():
+    """
+    Queue a build of the index, unless one was queued in the last SIMILARITY_BUILD_DEBOUNCE seconds.
+    The marker lives in the snapshot store (Redis), so the debounce holds across every process.
+    """
+    from inventory.tasks import build_similarity_index
+
+    if get_snapshot_store().add(BUILD_PENDING_KEY, b'1', settings.SIMILARITY_BUILD_DEBOUNCE):
+        build_similarity_index.delay()
+
+
+def current_version():
+    try:
+        with open(os.path.join(_root(), CURRENT_FILE)) as current:
+            return current.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class SimilarityIndex(object):
+    """
+    A memory-mapped index version: card ids in ascending order and, row for row, their feature
+    vectors, name hashes and colour masks.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        directory = os.path.join(_root(), version)
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, name + '.npy'), mmap_mode='r'))
+
+    def rows(self, card_ids):
+        """
+        Index rows of the given card ids, leaving out cards the index doesn't know.
+        """
+        card_ids = np.asarray(card_ids, dtype=np.int64)
+        rows = np.clip(np.searchsorted(self.card_ids, card_ids), 0, max(len(self.card_ids) - 1, 0))
+        return rows[self.card_ids[rows] == card_ids] if len(self.card_ids) else rows[:0]
+
+    def nearest(self, card_id, candidate_ids, limit=DEFAULT_LIMIT, same_colors=False):
+        """
+        The `limit` candidates most similar to `card_id`, best first, skipping printings of the same
+        card name. With same_colors only candidates with the same colour identity are considered.
+        """
+        row = self.rows([card_id])
+        if not len(row):
+            return []
+        row = row[0]
+        candidates = self.rows(candidate_ids)
+        candidates = candidates[self.name_keys[candidates] != self.name_keys[row]]
+        if same_colors:
+            candidates = candidates[self.color_masks[candidates] == self.color_masks[row]]
+        if not len(candidates):
+            return []
+        if len(candidates) < len(self.card_ids) // 8:
+            scores = self.features[candidates] @ self.features[row]
+        else:
+            # Past a point one pass over the whole matrix beats gathering scattered rows.
+            scores = (self.features @ self.features[row])[candidates]
+        limit = min(limit, len(candidates))
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [SimilarCard(int(self.card_ids[candidates[index]]), float(scores[index])) for index in best]
+
+
+def get_index():
+    """
+    The live index for this process, reloaded when CURRENT points at a new version.
+    """
+    global _loaded
+    version = current_version()
+    if version is None:
+        raise SimilarityIndexUnavailableException({'Errors': 'The card similarity index has not been built yet.'})
+    loaded = _loaded
+    if loaded is None or loaded.version != version:
+        with _lock:
+            if _loaded is None or _loaded.version != version:
+                _loaded = SimilarityIndex(version)
+            loaded = _loaded
+    return loaded
+
+
+def similar_owned_cards(owner_id, card_id, limit=DEFAULT_LIMIT, same_colors=False, items=None):
+    """
+    Cards among the owner's items (or `items`, e.g. a sub-collection's) most similar to `card_id`.
+    """
+    if items is None:
+        items = InventoryItem.objects.owned_by(owner_id).filter(quantity_owned__gt=0)
+    owned = list(items.exclude(card=None).values_list('card_id', flat=True).distinct())
+    return get_index().nearest(card_id, np.unique(owned), max(1, min(limit, MAX_LIMIT)), same_colors)
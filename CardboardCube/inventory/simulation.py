@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo cube draft simulation.
+
+A cube is loaded once into per-card attribute arrays (colour identity, a pick-quality heuristic and
+which two-colour archetypes each card is playable in). A batch of drafts is then simulated at once:
+every draft's packs come from one vectorised shuffle, and each pick is made for all drafters of all
+drafts in the batch with a single argmax over scores. A card's score is its quality plus a bonus for
+matching the colours the drafter has already picked, plus noise.
+
+Simulations return a tally of raw sums that can be merged across batches or job chunks, and
+summarize() turns a tally into the statistics shown to users.
+"""
+import ast
+from collections import namedtuple
+from itertools import combinations
+
+import numpy as np
+
+from django.db.models import Sum
+
+from card_catalog.models import Card
+from inventory.exceptions import InvalidSimulationException
+
+COLORS = 'WUBRG'
+ARCHETYPES = list(combinations(range(len(COLORS)), 2))
+ARCHETYPE_NAMES = [COLORS[first] + COLORS[second] for first, second in ARCHETYPES]
+
+BATCH_SIZE = 2500
+# Picks within this many of the start of a pack count as early picks.
+EARLY_PICKS = 3
+# Playable non-land cards in an archetype's colours needed for that deck to come together.
+PLAYABLES_NEEDED = 22
+# How strongly drafters favour cards in the colours they have already picked, once committed.
+COMMITMENT = 1.5
+COMMITMENT_PICKS = 8
+NOISE = 0.75
+
+Cube = namedtuple('Cube', ['card_ids', 'names', 'slots', 'colors', 'quality', 'fits'])
+
+
+def parse_list(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    try:
+        parsed = ast.literal_eval(value or '[]')
+    except (ValueError, SyntaxError):
+        return []
+    return list(parsed) if isinstance(parsed, (list, tuple)) else []
+
+
+def build_cube(cards):
+    """
+    Build the attribute arrays from (card id, name, types, colour identity, copies) rows.
+    """
+    card_ids, names, copies = [], [], []
+    colors = np.zeros((len(cards), len(COLORS)), dtype=np.float32)
+    is_land = np.zeros(len(cards), dtype=bool)
+    for index, (card_id, name, types, color_identity, quantity) in enumerate(cards):
+        card_ids.append(card_id)
+        names.append(name)
+        copies.append(quantity)
+        for color in parse_list(color_identity):
+            if color in COLORS:
+                colors[index, COLORS.index(color)] = 1
+        is_land[index] = 'Land' in parse_list(types)
+
+    color_count = colors.sum(axis=1)
+    # Spells are what drafters take; lands are worth more the more colours they fix.
+    quality = np.where(is_land, 0.25 * color_count, 1.0).astype(np.float32)
+    # A non-land card is playable in an archetype if all of its colours belong to it.
+    archetype_colors = np.zeros((len(ARCHETYPES), len(COLORS)), dtype=np.float32)
+    for index, pair in enumerate(ARCHETYPES):
+        archetype_colors[index, list(pair)] = 1
+    fits = ((colors @ (1 - archetype_colors).T) == 0) & ~is_land[:, None]
+
+    slots = np.repeat(np.arange(len(cards)), copies)
+    return Cube(np.array(card_ids), names, slots, colors, quality, fits)
+
+
+def cube_cards(subcollection):
+    """
+    [card id, copies] for every card allocated to a sub-collection.
+    """
+    copies = subcollection.memberships.filter(
+        owner=subcollection.owner_id, quantity__gt=0, inventoryitem__card__isnull=False,
+    ).values_list('inventoryitem__card_id').annotate(copies=Sum('quantity')).order_by('inventoryitem__card_id')
+    return [[card_id, total] for card_id, total in copies]
+
+
+def load_cube(card_copies):
+    """
+    Cube arrays for [card id, copies] pairs, with one slot per copy.
+    """
+    copies = dict(card_copies)
+    rows = Card.objects.filter(pk__in=copies).order_by('pk').values_list('pk', 'name', 'types', 'color_identity')
+    return build_cube([(pk, name, types, color_identity, copies[pk]) for pk, name, types, color_identity in rows])
+
+
+def empty_tally(cube):
+    n_cards = len(cube.card_ids)
+    return {
+        'drafts': np.zeros(1, dtype=np.int64),
+        'packs': np.zeros(1, dtype=np.int64),
+        'pack_color_sum': np.zeros(len(COLORS), dtype=np.float64),
+        'pack_color_sq_sum': np.zeros(len(COLORS), dtype=np.float64),
+        'pack_color_missing': np.zeros(len(COLORS), dtype=np.int64),
+        'appearances': np.zeros(n_cards, dtype=np.int64),
+        'pick_sum': np.zeros(n_cards, dtype=np.int64),
+        'early_picks': np.zeros(n_cards, dtype=np.int64),
+        'archetype_drafted': np.zeros(len(ARCHETYPES), dtype=np.int64),
+        'archetype_complete': np.zeros(len(ARCHETYPES), dtype=np.int64),
+    }
+
+
+def merge_tallies(tallies):
+    merged = None
+    for tally in tallies:
+        tally = {key: np.asarray(value) for key, value in tally.items()}
+        merged = tally if merged is None else {key: merged[key] + tally[key] for key in merged}
+    return merged
+
+
+def _simulate_batch(cube, tally, rng, drafts, drafters, packs, pack_size):
+    n_cards = len(cube.card_ids)
+    dealt = drafters * packs * pack_size
+    # One shuffle per draft: the first `dealt` slots of each permutation are its packs.
+    order = rng.random((drafts, len(cube.slots))).argsort(axis=1)[:, :dealt]
+    cards = cube.slots[order].reshape(drafts, packs, drafters, pack_size)
+
+    pack_colors = cube.colors[cards].sum(axis=3)
+    tally['packs'] += drafts * packs * drafters
+    tally['pack_color_sum'] += pack_colors.sum(axis=(0, 1, 2))
+    tally['pack_color_sq_sum'] += (pack_colors ** 2).sum(axis=(0, 1, 2))
+    tally['pack_color_missing'] += (pack_colors == 0).sum(axis=(0, 1, 2))
+    tally['appearances'] += np.bincount(cards.ravel(), minlength=n_cards)
+
+    pool_colors = np.zeros((drafts, drafters, len(COLORS)), dtype=np.float32)
+    playables = np.zeros((drafts, drafters, len(ARCHETYPES)), dtype=np.int32)
+    color_count = cube.colors.sum(axis=1)
+    flexibility = np.where(color_count == 0, 0.5, 0).astype(np.float32)
+    weights = (cube.colors / np.maximum(color_count, 1)[:, None]).astype(np.float32)
+    seats = np.arange(drafters)
+    picks_made = 0
+    for pack_number in range(packs):
+        # Packs stay put and drafters move: at each pick, pack n is held by seat (n + pick) % drafters,
+        # passing left then right alternately. Card attributes are gathered once per round.
+        pack = cards[:, pack_number]
+        pack_weights = weights[pack]
+        pack_quality = cube.quality[pack]
+        pack_flexibility = flexibility[pack]
+        taken = np.zeros(pack.shape, dtype=bool)
+        direction = 1 if pack_number % 2 == 0 else -1
+        for pick in range(pack_size):
+            holder = (seats + direction * pick) % drafters
+            commitment = COMMITMENT * min(1.0, picks_made / COMMITMENT_PICKS)
+            share = pool_colors[:, holder] / max(picks_made, 1)
+            affinity = np.einsum('dnpc,dnc->dnp', pack_weights, share) + pack_flexibility
+            scores = pack_quality + commitment * affinity + NOISE * rng.random(pack.shape, dtype=np.float32)
+            scores[taken] = -np.inf
+            choice = scores.argmax(axis=2)[..., None]
+            np.put_along_axis(taken, choice, True, axis=2)
+            picked = np.take_along_axis(pack, choice, axis=2)[..., 0]
+
+            pool_colors[:, holder] += cube.colors[picked]
+            playables[:, holder] += cube.fits[picked]
+            picked = picked.ravel()
+            tally['pick_sum'] += np.bincount(picked, minlength=n_cards) * pick
+            if pick < EARLY_PICKS:
+                tally['early_picks'] += np.bincount(picked, minlength=n_cards)
+            picks_made += 1
+
+    archetype = playables.argmax(axis=2).ravel()
+    complete = playables.max(axis=2).ravel() >= PLAYABLES_NEEDED
+    tally['archetype_drafted'] += np.bincount(archetype, minlength=len(ARCHETYPES))
+    tally['archetype_complete'] += np.bincount(archetype[complete], minlength=len(ARCHETYPES))
+    tally['drafts'] += drafts
+
+
+def simulate(cube, drafts, drafters=8, packs=3, pack_size=15, seed=None):
+    """
+    Simulate `drafts` drafts of the cube and return their tally.
+    """
+    needed = drafters * packs * pack_size
+    if needed > len(cube.slots):
+        raise InvalidSimulationException({
+            'Errors': f'The draft needs {needed} cards but the cube has {len(cube.slots)}.'
+        })
+    rng = np.random.default_rng(seed)
+    tally = empty_tally(cube)
+    for start in range(0, drafts, BATCH_SIZE):
+        _simulate_batch(cube, tally, rng, min(BATCH_SIZE, drafts - start), drafters, packs, pack_size)
+    return tally
+
+
+def summarize(cube, tally):
+    """
+    Statistics for a tally: colour balance per pack, how often each two-colour archetype is drafted
+    and comes together, and how early each card is picked (picks are numbered from 1 within a pack).
+    """
+    tally = {key: np.asarray(value) for key, value in tally.items()}
+    packs = max(int(tally['packs'][0]), 1)
+    mean = tally['pack_color_sum'] / packs
+    std = np.sqrt(np.maximum(tally['pack_color_sq_sum'] / packs - mean ** 2, 0))
+    missing = tally['pack_color_missing'] / packs
+    colors = {
+        color: {'mean': round(float(mean[index]), 3), 'std': round(float(std[index]), 3),
+                'missing_rate': round(float(missing[index]), 4)}
+        for index, color in enumerate(COLORS)
+    }
+
+    drafted = tally['archetype_drafted']
+    complete = tally['archetype_complete']
+    archetypes = [
+        {'archetype': name, 'drafted_rate': round(float(drafted[index] / max(drafted.sum(), 1)), 4),
+         'complete_rate': round(float(complete[index] / max(drafted[index], 1)), 4)}
+        for index, name in enumerate(ARCHETYPE_NAMES)
+    ]
+
+    appearances = tally['appearances']
+    seen = np.maximum(appearances, 1)
+    average_pick = tally['pick_sum'] / seen + 1
+    early_rate = tally['early_picks'] / seen
+    cards = [
+        {'card': int(cube.card_ids[index]), 'name': cube.names[index], 'appearances': int(appearances[index]),
+         'average_pick': round(float(average_pick[index]), 2), 'early_pick_rate': round(float(early_rate[index]), 4)}
+        for index in np.lexsort((average_pick, appearances == 0))
+    ]
+    return {'drafts': int(tally['drafts'][0]), 'colors': colors, 'archetypes': archetypes, 'cards': cards}
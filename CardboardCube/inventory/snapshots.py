@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Compressed per-user inventory snapshots for read endpoints.
+
+A snapshot holds every item a user owns, joined with its card and grading details, serialized once
+to gzip-compressed JSON and kept in a store (Redis in production). It records the inventory version
+and the change log cursor it reflects. A read whose version matches is served from the store as is.
+A stale snapshot is brought up to date by re-reading only the items changed since its cursor. Item
+changes schedule a background refresh, debounced so a bulk operation triggers a single refresh.
+"""
+import gzip
+import json
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from db_router import use_primary
+from inventory.models import (
+    INITIAL_CURSOR,
+    InventoryChange,
+    InventoryItem,
+    UserInventory,
+    decode_cursor,
+    encode_cursor,
+)
+from redis_client import get_redis
+
+# Change log targets that alter an item's snapshot entry; membership changes move its allocation.
+ITEM_TARGETS = (InventoryChange.ITEM, InventoryChange.SUBCOLLECTION_MEMBERSHIP)
+# Above this many changed items a snapshot is rebuilt rather than patched.
+PATCH_LIMIT = 2000
+
+CARD_FIELDS = ('name', 'set__code', 'set__name', 'image_url', 'mana_cost', 'cmc', 'types', 'colors')
+GRADING_FIELDS = (
+    'grading_service', 'serial_number', 'overall_grade', 'autograph_grade',
+    'centering_grade', 'corners_grade', 'edges_grade', 'surface_grade',
+)
+ITEM_FIELDS = (
+    'uuid', 'quantity_owned', 'quantity_wanted', 'quantity_allocated', 'quantity_available', 'condition',
+    'language', 'is_foil', 'is_signed', 'is_altered', 'is_misprint', 'is_miscut', 'is_graded',
+)
+
+
+class SnapshotStore(object):
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl):
+        """
+        Set `key` only if it is not set yet, returning whether it was.
+        """
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class RedisSnapshotStore(SnapshotStore):
+
+    def __init__(self):
+        self.redis = get_redis()
+
+    def get(self, key):
+        return self.redis.get(key)
+
+    def set(self, key, value, ttl):
+        self.redis.set(key, value, ex=ttl)
+
+    def add(self, key, value, ttl):
+        return bool(self.redis.set(key, value, ex=ttl, nx=True))
+
+    def exists(self, key):
+        return bool(self.redis.exists(key))
+
+    def delete(self, key):
+        self.redis.delete(key)
+
+
+class LocalSnapshotStore(SnapshotStore):
+    """
+    In-process store for tests and single-process development; ignores expiry.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl):
+        self.data[key] = value
+
+    def add(self, key, value, ttl):
+        with self.lock:
+            if key in self.data:
+                return False
+            self.data[key] = value
+            return True
+
+    def exists(self, key):
+        return key in self.data
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@lru_cache(maxsize=None)
+def _load_store(path):
+    return import_string(path)()
+
+
+def get_snapshot_store():
+    return _load_store(settings.INVENTORY_SNAPSHOT_STORE)
+
+
+def snapshot_key(owner_id):
+    return f'inventory-snapshot:{owner_id}'
+
+
+def _pending_key(owner_id):
+    return f'inventory-snapshot-pending:{owner_id}'
+
+
+def _item(row):
+    item = {field: row[field] for field in ITEM_FIELDS}
+    item['card'] = None if row['card_id'] is None else dict(
+        {'id': row['card_id']}, **{field.replace('__', '_'): row[f'card__{field}'] for field in CARD_FIELDS}
+    )
+    item['grading_details'] = None if row['grading_details_id'] is None else dict(
+        {'uuid': row['grading_details_id']}, **{field: row[f'grading_details__{field}'] for field in GRADING_FIELDS}
+    )
+    return item
+
+
+def _serialize_items(owner_id, pks=None):
+    """
+    {item uuid: snapshot entry} for an owner's items, optionally only those in `pks`, in one joined query.
+    """
+    items = InventoryItem.objects.owned_by(owner_id)
+    if pks is not None:
+        items = items.filter(pk__in=pks)
+    rows = items.values(
+        *ITEM_FIELDS, 'card_id', 'grading_details_id',
+        *(f'card__{field}' for field in CARD_FIELDS), *(f'grading_details__{field}' for field in GRADING_FIELDS),
+    )
+    return {str(row['uuid']): _item(row) for row in rows}
+
+
+def _encode(version, cursor, items):
+    body = json.dumps(
+        {'version': version, 'cursor': cursor, 'items': [items[pk] for pk in sorted(items)]},
+        cls=DjangoJSONEncoder, separators=(',', ':'),
+    )
+    return b'%d\n' % version + gzip.compress(body.encode(), mtime=0)
+
+
+def _decode(blob):
+    version, _, body = blob.partition(b'\n')
+    return int(version), body
+
+
+def refresh_snapshot(owner_id):
+    """
+    Bring an owner's snapshot up to date, patching the stored one when few items changed. Returns
+    (version, gzip-compressed JSON).
+    """
+    store = get_snapshot_store()
+    stored = store.get(snapshot_key(owner_id))
+    # Every read below must come from the one connection whose transaction they share, never a replica.
+    with use_primary():
+        outermost = not connection.in_atomic_block
+        with transaction.atomic():
+            if outermost:
+                # Read the version, change log and items from one consistent snapshot.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            version = UserInventory.objects.filter(owner=owner_id).values_list('version', flat=True).first() or 0
+            items = None
+            if stored is not None:
+                data = json.loads(gzip.decompress(_decode(stored)[1]))
+                # Every visible change, settled or not: re-reading an item twice is harmless.
+                since = InventoryChange.objects.since(owner_id, decode_cursor(data['cursor']), settled=False)
+                changed = set(since.filter(target__in=ITEM_TARGETS).order_by().values_list(
+                    'object_id', flat=True
+                ).distinct()[:PATCH_LIMIT + 1])
+                if len(changed) <= PATCH_LIMIT:
+                    items = {item['uuid']: item for item in data['items']}
+                    fresh = _serialize_items(owner_id, changed)
+                    for pk in map(str, changed):
+                        if pk in fresh:
+                            items[pk] = fresh[pk]
+                        else:
+                            items.pop(pk, None)
+            if items is None:
+                items = _serialize_items(owner_id)
+            last = InventoryChange.objects.since(owner_id).order_by('-txid', '-id').values_list('txid', 'id').first()
+    blob = _encode(version, encode_cursor(*last) if last else INITIAL_CURSOR, items)
+    store.set(snapshot_key(owner_id), blob, settings.INVENTORY_SNAPSHOT_TTL)
+    return _decode(blob)
+
+
+def get_snapshot(owner_id, version):
+    """
+    gzip-compressed JSON snapshot of an owner's inventory at `version` or later.
+    """
+    stored = get_snapshot_store().get(snapshot_key(owner_id))
+    if stored is not None:
+        stored_version, body = _decode(stored)
+        if stored_version >= version:
+            return body
+    return refresh_snapshot(owner_id)[1]
+
+
+def schedule_refresh(owner_id):
+    """
+    Queue a background refresh of an owner's snapshot, if they have one and none is queued yet.
+    """
+    from inventory.tasks import refresh_inventory_snapshot
+
+    store = get_snapshot_store()
+    debounce = settings.INVENTORY_SNAPSHOT_DEBOUNCE
+    if store.exists(snapshot_key(owner_id)) and store.add(_pending_key(owner_id), b'1', debounce * 10):
+        refresh_inventory_snapshot.apply_async((str(owner_id),), countdown=debounce)
+
+
+def clear_pending_refresh(owner_id):
+    get_snapshot_store().delete(_pending_key(owner_id))
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from celery import chord, group, shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from inventory import analytics
+from inventory.history import record_changed
+from inventory.models import InventoryChange, SetCompletion
+from inventory.similarity import build_index
+from inventory.snapshots import clear_pending_refresh, refresh_snapshot
+
+
+@shared_task
+def compact_inventory_changes():
+    """
+    Drop superseded change log entries older than INVENTORY_CHANGE_COMPACT_AFTER.
+    """
+    older_than = timezone.now() - timedelta(seconds=settings.INVENTORY_CHANGE_COMPACT_AFTER)
+    return InventoryChange.objects.compact(older_than)
+
+
+@shared_task
+def refresh_inventory_snapshot(owner_id):
+    clear_pending_refresh(owner_id)
+    refresh_snapshot(owner_id)
+
+
+@shared_task
+def refresh_set_completion(owner_id):
+    return SetCompletion.objects.refresh(owner_id)
+
+
+@shared_task
+def build_similarity_index():
+    """
+    Rebuild the card similarity index if the card catalog changed since the last build.
+    """
+    return build_index()
+
+
+@shared_task
+def record_history():
+    """
+    Record the contents of every inventory and sub-collection that changed since the last run.
+    """
+    return record_changed()
+
+
+@shared_task
+def refresh_analytics():
+    """
+    Roll up every owner range in parallel, then rebuild the totals (see inventory.analytics).
+    """
+    partitions = settings.ANALYTICS_PARTITIONS
+    chord(
+        group(rollup_analytics_partition.s(partition, partitions) for partition in range(partitions))
+    )(publish_analytics.s(partitions))
+
+
+@shared_task
+def rollup_analytics_partition(partition, partitions):
+    return analytics.rollup_partition(partition, partitions)
+
+
+@shared_task
+def publish_analytics(results, partitions):
+    return analytics.publish_totals(partitions, changed=any(results))
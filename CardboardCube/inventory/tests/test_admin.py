@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from card_catalog.models import Card
+from inventory.models import InventoryItem, SubCollectionMembership, UserInventory, UserSubCollection
+from inventory.paginators import EstimatedCountPaginator
+from jobs.models import Job
+from registration.models import User
+
+
+class TestInventoryAdmin(TestCase):
+    """
+    Tests for the inventory admin changelists and forms
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.admin = User.objects.create_superuser(email="admin@domain.com", password="password", username="Admin")
+        self.client.force_login(self.admin)
+        self.cards = list(Card.objects.order_by('pk')[:20])
+
+    def _changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/inventory/inventoryitem/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_item_changelist_query_count_is_constant(self):
+        InventoryItem.objects.create(owner=self.user, card=self.cards[0], quantity_owned=1)
+        baseline = self._changelist_queries()
+        for card in self.cards[1:]:
+            InventoryItem.objects.create(owner=self.user, card=card, quantity_owned=1, is_foil=True)
+        self.assertEqual(self._changelist_queries(), baseline)
+
+    def test_list_filters(self):
+        InventoryItem.objects.create(owner=self.user, card=self.cards[0], quantity_owned=1, is_foil=True)
+        InventoryItem.objects.create(owner=self.user, card=self.cards[1], quantity_owned=1, condition='LP')
+        response = self.client.get('/admin/inventory/inventoryitem/', {'is_foil__exact': 1})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_inventory_change_form(self):
+        inventory = UserInventory.objects.get(owner=self.user)
+        response = self.client.get(f'/admin/inventory/userinventory/{inventory.pk}/change/')
+        self.assertContains(response, f'?owner__id__exact={self.user.pk}')
+
+    def test_estimated_count(self):
+        for card in self.cards:
+            InventoryItem.objects.create(owner=self.user, card=card, quantity_owned=1)
+        queryset = InventoryItem.objects.all()
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 20)
+        with override_settings(ADMIN_EXACT_COUNT_LIMIT=-1):
+            estimate = EstimatedCountPaginator(queryset, 10).count
+        self.assertIsInstance(estimate, int)
+        self.assertGreaterEqual(estimate, 0)
+
+    def test_rejected_membership_edit_changes_nothing(self):
+        cube = UserInventory.objects.get(owner=self.user).cubes.first()
+        kept = InventoryItem.objects.create(owner=self.user, card=self.cards[0], quantity_owned=1)
+        scarce = InventoryItem.objects.create(owner=self.user, card=self.cards[1], quantity_owned=1)
+        cube.set_item_quantities({kept.pk: 1, scarce.pk: 1})
+        rows = list(SubCollectionMembership.objects.filter(subcollection=cube).order_by('inventoryitem__card'))
+        data = {
+            'kind': cube.kind, 'kind_override': cube.kind_override or '', 'description': cube.description or '',
+            'owner': self.user.pk,
+            'memberships-TOTAL_FORMS': 2, 'memberships-INITIAL_FORMS': 2,
+            'memberships-MIN_NUM_FORMS': 0, 'memberships-MAX_NUM_FORMS': 1000,
+        }
+        for index, row in enumerate(rows):
+            data.update({f'memberships-{index}-id': row.pk, f'memberships-{index}-subcollection': cube.pk,
+                         f'memberships-{index}-inventoryitem': row.inventoryitem_id,
+                         f'memberships-{index}-quantity': 1})
+        # Drop the first item and over-allocate the second: the removal must not stick.
+        data['memberships-0-DELETE'] = 'on'
+        data['memberships-1-quantity'] = 5
+        response = self.client.post(f'/admin/inventory/usersubcollection/{cube.pk}/change/', data, follow=True)
+        messages = [str(message) for message in response.context['messages']]
+        self.assertTrue(any('allocate' in message for message in messages))
+        self.assertFalse(any('successfully' in message for message in messages))
+        self.assertEqual(
+            dict(SubCollectionMembership.objects.filter(subcollection=cube).values_list('inventoryitem', 'quantity')),
+            {kept.pk: 1, scarce.pk: 1},
+        )
+
+    def test_deletes_go_through_background_deletion(self):
+        for path in ('/admin/registration/user/', '/admin/inventory/userinventory/',
+                     '/admin/inventory/usersubcollection/'):
+            actions = dict(self.client.get(path).context['action_form'].fields['action'].choices)
+            self.assertNotIn('delete_selected', actions)
+            self.assertIn('delete_in_background', actions)
+
+        cube = UserInventory.objects.get(owner=self.user).cubes.first()
+        response = self.client.post(f'/admin/inventory/usersubcollection/{cube.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNotNone(UserSubCollection.all_objects.get(pk=cube.pk).deleted_at)
+
+        response = self.client.post(f'/admin/registration/user/{self.user.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        user = User.all_objects.get(pk=self.user.pk)
+        self.assertIsNotNone(user.deleted_at)
+        self.assertFalse(user.is_active)
+        self.assertTrue(InventoryItem.objects.filter(owner=self.user.pk).exists())
+        job = Job.objects.get(kind='deletion', params__target='user')
+        self.assertEqual((job.owner, job.params['id']), (self.admin, str(self.user.pk)))
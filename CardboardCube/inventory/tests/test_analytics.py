@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from inventory import analytics
+from inventory.models import AnalyticsFigure, InventoryItem, UserInventory, UserSubCollection
+from inventory.tasks import refresh_analytics
+from registration.models import User
+
+
+@override_settings(ANALYTICS_PARTITIONS=4)
+class TestAnalytics(TestCase):
+    """
+    Tests for the catalog-wide analytics rollups
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.other = User.objects.create(email="other@domain.com", username="Other")
+        UserInventory.objects.create(owner=self.other)
+        self.cube = UserSubCollection.objects.filter(owner=self.user, kind='cube').order_by('pk').first()
+        self.items = [
+            InventoryItem.objects.create(owner=self.user, card_id=1, quantity_owned=2, quantity_wanted=1),
+            InventoryItem.objects.create(owner=self.user, card_id=2, quantity_owned=1, condition='LP'),
+            InventoryItem.objects.create(owner=self.other, card_id=1, quantity_owned=3, language='JA'),
+            InventoryItem.objects.create(owner=self.other, card_id=3, quantity_owned=0, quantity_wanted=4),
+        ]
+        self.cube.set_item_quantities({self.items[0].pk: 2, self.items[1].pk: 1})
+
+    def totals(self, metric):
+        return {(figure.dimension, figure.card_id): (figure.quantity, figure.holders)
+                for figure in AnalyticsFigure.objects.filter(partition__isnull=True, metric=metric)}
+
+    def test_rollup(self):
+        refresh_analytics.delay()
+        self.assertEqual(self.totals(AnalyticsFigure.OWNED), {('', 1): (5, 2), ('', 2): (1, 1)})
+        self.assertEqual(self.totals(AnalyticsFigure.WANTED), {('', 1): (1, 1), ('', 3): (4, 1)})
+        self.assertEqual(self.totals(AnalyticsFigure.INCLUDED), {('cube', 1): (2, 1), ('cube', 2): (1, 1)})
+        self.assertEqual(self.totals(AnalyticsFigure.CONDITION), {('NM', None): (5, 2), ('LP', None): (1, 1)})
+        self.assertEqual(self.totals(AnalyticsFigure.LANGUAGE), {('EN', None): (3, 1), ('JA', None): (3, 1)})
+
+    def test_only_changed_partitions_recomputed(self):
+        changed = [analytics.rollup_partition(partition, 4) for partition in range(4)]
+        self.assertEqual(changed, [True] * 4)
+        self.assertEqual([analytics.rollup_partition(partition, 4) for partition in range(4)], [False] * 4)
+
+        self.items[2].quantity_owned = 1
+        self.items[2].save()
+        changed = [analytics.rollup_partition(partition, 4) for partition in range(4)]
+        self.assertEqual(changed.count(True), 1)
+        self.assertTrue(changed[int(self.other.pk.int * 4 >> 128)])
+        analytics.publish_totals(4)
+        self.assertEqual(self.totals(AnalyticsFigure.OWNED)[('', 1)], (3, 2))
+
+    def test_owners_without_an_inventory_tracked(self):
+        loner = User.objects.create(email="loner@domain.com", username="Loner")
+        item = InventoryItem.objects.create(owner=loner, card_id=2, quantity_owned=1)
+        partition = int(loner.pk.int * 4 >> 128)
+        analytics.rollup_partition(partition, 4)
+        self.assertFalse(analytics.rollup_partition(partition, 4))
+        item.quantity_owned = 2
+        item.save()
+        self.assertTrue(analytics.rollup_partition(partition, 4))
+
+    def test_deleted_users_left_out(self):
+        User.all_objects.filter(pk=self.other.pk).update(deleted_at='2020-06-01T00:00:00Z')
+        refresh_analytics.delay()
+        self.assertEqual(self.totals(AnalyticsFigure.OWNED)[('', 1)], (2, 1))
+
+    def test_endpoints(self):
+        refresh_analytics.delay()
+        client = APIClient()
+        client.force_authenticate(user=self.other)
+        data = client.get('/api/analytics/owned/').json()
+        self.assertIsNotNone(data['as_of'])
+        self.assertEqual([(row['card'], row['quantity'], row['holders']) for row in data['results']],
+                         [(1, 5, 2), (2, 1, 1)])
+        self.assertEqual(len(client.get('/api/analytics/wanted/', {'limit': 1}).json()['results']), 1)
+        self.assertEqual(client.get('/api/analytics/included/').json()['results'][0]['card'], 1)
+        self.assertEqual(client.get('/api/analytics/included/', {'kind': 'binder'}).status_code, 400)
+        self.assertEqual(client.get('/api/analytics/languages/').json()['results'][0]['quantity'], 3)
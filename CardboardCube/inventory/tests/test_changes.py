@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from card_catalog.models import Card
+from inventory.models import InventoryChange, InventoryItem
+from registration.models import User
+
+
+class TestInventoryChangeLog(TransactionTestCase):
+    """
+    Tests for change log compaction (the delta sync endpoint is tested in api.tests.test_changes)
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.item = InventoryItem.objects.create(owner=self.user, card=Card.objects.get(pk=1), quantity_owned=2)
+
+    def test_compaction(self):
+        for quantity in (3, 4):
+            self.item.quantity_owned = quantity
+            self.item.save()
+        InventoryChange.objects.compact(older_than=timezone.now() + timedelta(seconds=1))
+        changes = InventoryChange.objects.filter(object_id=self.item.pk)
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].payload['qo'], 4)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card, CardSet
+from inventory.models import InventoryItem, SetCompletion
+from registration.models import User
+
+
+class TestSetCompletion(TestCase):
+    """
+    Tests for per-set completion figures maintained from item changes
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.expeditions = CardSet.objects.get(code='EXP')
+        self.total = Card.objects.filter(set=self.expeditions).count()
+        self.items = [
+            InventoryItem.objects.create(owner=self.user, card_id=1, quantity_owned=2),
+            InventoryItem.objects.create(owner=self.user, card_id=2, quantity_owned=1),
+            InventoryItem.objects.create(owner=self.user, card_id=3, quantity_owned=1),
+            InventoryItem.objects.create(owner=self.user, card_id=3, quantity_owned=1, is_foil=True),
+            InventoryItem.objects.create(owner=self.user, card_id=4, quantity_owned=0, quantity_wanted=1, is_foil=True),
+        ]
+
+    def completion(self, card_set):
+        return {row.card_set_id: row for row in SetCompletion.objects.for_owner(self.user.pk)}[card_set.pk]
+
+    def test_figures(self):
+        row = self.completion(self.expeditions)
+        self.assertEqual((row.total, row.owned, row.foil, row.nonfoil), (self.total, 3, 1, 3))
+        self.assertEqual(row.missing, list(Card.objects.filter(set=self.expeditions).exclude(
+            pk__in=[1, 2, 3]).order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(str(row), 'Zendikar Expeditions: 3/{}, 1 foil'.format(self.total))
+
+    def test_fresh_rows_are_one_read(self):
+        self.completion(self.expeditions)
+        with self.assertNumQueries(1):
+            list(SetCompletion.objects.for_owner(self.user.pk))
+
+    def test_item_changes_mark_rows_stale(self):
+        self.completion(self.expeditions)
+        self.items[0].delete()
+        self.items[3].is_foil = False
+        self.items[3].save()
+        row = self.completion(self.expeditions)
+        self.assertEqual((row.owned, row.foil, row.nonfoil), (2, 0, 2))
+        self.assertIn(1, row.missing)
+
+    def test_moving_an_item_to_another_set_refreshes_both(self):
+        other = CardSet.objects.create(code='TST', name='Test Set', tcgplayer_group_id=1,
+                                       release_date=datetime.date(2020, 1, 1))
+        Card.objects.filter(pk=45).update(set=other)
+        self.completion(self.expeditions)
+        self.items[1].card_id = 45
+        self.items[1].save()
+        self.assertEqual(self.completion(self.expeditions).owned, 2)
+        row = self.completion(other)
+        self.assertEqual((row.total, row.owned, row.missing), (1, 1, []))
+
+    def test_rebuild(self):
+        SetCompletion.objects.filter(owner=self.user).delete()
+        self.assertEqual(SetCompletion.objects.rebuild(self.user.pk), 1)
+        self.assertEqual(self.completion(self.expeditions).owned, 3)
+
+    def test_completion_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.get('/api/inventory/{}/completion/'.format(self.user.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['set'], 'EXP')
+        self.assertEqual(response.json()[0]['owned'], 3)
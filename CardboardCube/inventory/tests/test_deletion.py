@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from inventory.deletion import delete_user
+from inventory.models import (
+    InventoryChange, InventoryItem, InventoryMembership, SubCollectionMembership, UserInventory, UserSubCollection,
+)
+from jobs.models import Job
+from registration.models import User
+
+
+@override_settings(DELETION_BATCH_SIZE=2)
+class TestDeletion(TransactionTestCase):
+    """
+    Tests for soft deletion followed by batched background removal. Jobs are queued on commit, so
+    these run outside a wrapping test transaction.
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.inventory = UserInventory.objects.get(owner=self.user)
+        self.deck = UserSubCollection.objects.filter(owner=self.user, kind='deck').order_by('pk').first()
+        self.items = [InventoryItem.objects.create(owner=self.user, card_id=card_id, quantity_owned=2)
+                      for card_id in range(1, 6)]
+        self.inventory.add_items_to_inventory([item.pk for item in self.items])
+        self.deck.set_item_quantities({item.pk: 1 for item in self.items})
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_delete_subcollection(self):
+        response = self.client.delete(f'/api/subcollection/{self.deck.pk}/')
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.data['uuid'])
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, {'deleted': 6}))
+        self.assertFalse(UserSubCollection.all_objects.filter(pk=self.deck.pk).exists())
+        self.assertFalse(SubCollectionMembership.objects.filter(subcollection=self.deck.pk).exists())
+        self.assertEqual({item.quantity_available for item in InventoryItem.objects.filter(owner=self.user)}, {2})
+        self.assertEqual(InventoryChange.objects.filter(
+            target=InventoryChange.SUBCOLLECTION_MEMBERSHIP, operation=InventoryChange.DELETE, container_id=self.deck.pk
+        ).count(), 5)
+        self.assertEqual(self.client.delete(f'/api/subcollection/{self.deck.pk}/').status_code, 404)
+
+    def test_marked_objects_are_hidden(self):
+        UserSubCollection.objects.filter(pk=self.deck.pk).update(deleted_at='2020-01-01T00:00Z')
+        self.assertFalse(UserSubCollection.objects.filter(pk=self.deck.pk).exists())
+        self.assertEqual(self.client.get(f'/api/subcollection/{self.deck.pk}/').status_code, 404)
+
+    def test_delete_inventory_keeps_items(self):
+        other = User.objects.create_user('other@domain.com', username='other')
+        self.assertEqual(self.client.delete(f'/api/inventory/{other.pk}/').status_code, 403)
+        response = self.client.delete(f'/api/inventory/{self.user.pk}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get(pk=response.data['uuid']).status, Job.SUCCEEDED)
+        self.assertFalse(UserInventory.all_objects.filter(owner=self.user).exists())
+        self.assertFalse(InventoryMembership.objects.filter(owner=self.user).exists())
+        self.assertEqual(InventoryItem.objects.filter(owner=self.user).count(), 5)
+
+    def test_delete_user(self):
+        staff = User.objects.create_user('staff@domain.com', username='staff', is_staff=True)
+        job = delete_user(self.user, requested_by=staff)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.progress, 100.0)
+        self.assertFalse(User.all_objects.filter(pk=self.user.pk).exists())
+        for model in (InventoryItem, SubCollectionMembership, InventoryMembership, InventoryChange):
+            self.assertFalse(model.objects.filter(owner=self.user.pk).exists())
+        self.assertFalse(UserSubCollection.all_objects.filter(owner=self.user.pk).exists())
+
+    def test_deletion_jobs_need_a_marked_object(self):
+        response = self.client.post('/api/jobs/', {
+            'kind': 'deletion', 'params': {'target': 'subcollection', 'id': str(self.deck.pk)},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(UserSubCollection.objects.filter(pk=self.deck.pk).exists())
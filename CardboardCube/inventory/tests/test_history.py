@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from inventory.history import changes_between, record, record_changed, state_at
+from inventory.models import HistoryRecord, InventoryItem, UserInventory, UserSubCollection
+from registration.models import User
+
+
+def day(number):
+    return timezone.make_aware(datetime.datetime(2020, 6, number, 12))
+
+
+class TestHistory(TestCase):
+    """
+    Tests for point-in-time history recorded as checkpoints and diffs
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.inventory = UserInventory.objects.get(owner=self.user)
+        self.cube = UserSubCollection.objects.filter(owner=self.user, kind='cube').order_by('pk').first()
+        self.items = [InventoryItem.objects.create(owner=self.user, card_id=card_id, quantity_owned=2)
+                      for card_id in range(1, 5)]
+        self.foil = InventoryItem.objects.create(owner=self.user, card_id=1, quantity_owned=1, is_foil=True)
+        self.inventory.add_items_to_inventory([item.pk for item in self.items + [self.foil]])
+        self.cube.set_item_quantities({item.pk: 1 for item in self.items})
+
+    def inventory_state(self, at):
+        cards, taken_at = state_at(self.inventory, at)
+        return {(card['card'], card['foil']): card['quantity'] for card in cards}
+
+    def test_checkpoint_then_diffs(self):
+        first = record(self.inventory, day(1))
+        self.assertTrue(first.is_checkpoint)
+        self.assertIsNone(record(UserInventory.objects.get(pk=self.inventory.pk), day(2)))
+
+        self.items[0].quantity_owned = 3
+        self.items[0].save()
+        self.items[1].delete()
+        diff = record(self.inventory, day(3))
+        self.assertFalse(diff.is_checkpoint)
+        self.assertEqual(diff.quantities, [1, -2])
+
+        self.assertEqual(self.inventory_state(day(2)), {(1, False): 2, (1, True): 1, (2, False): 2, (3, False): 2,
+                                                        (4, False): 2})
+        self.assertEqual(self.inventory_state(day(3)), {(1, False): 3, (1, True): 1, (3, False): 2, (4, False): 2})
+        self.assertEqual(changes_between(self.inventory, day(2), day(4)), [
+            {'card': 1, 'foil': False, 'delta': 1}, {'card': 2, 'foil': False, 'delta': -2},
+        ])
+        self.assertEqual(state_at(self.inventory, day(1) - datetime.timedelta(days=1)), (None, None))
+
+    def test_checkpoint_once_diffs_outgrow_contents(self):
+        record(self.cube, day(1))
+        quantities = [{self.items[0].pk: 2}, {self.items[1].pk: 2}, {self.items[2].pk: 2}, {self.items[3].pk: 2},
+                      {self.items[0].pk: 1}]
+        for number, change in enumerate(quantities, start=2):
+            self.cube.set_item_quantities(change)
+            record(self.cube, day(number))
+        kinds = list(HistoryRecord.objects.filter(container_id=self.cube.pk).order_by('id').values_list(
+            'is_checkpoint', flat=True))
+        self.assertEqual(kinds, [True, False, False, False, False, True])
+        cards, taken_at = state_at(self.cube, day(5))
+        self.assertEqual([card['quantity'] for card in cards], [2, 2, 2, 2])
+
+    @override_settings(HISTORY_MAX_DIFFS=1)
+    def test_max_diffs(self):
+        record(self.cube, day(1))
+        self.cube.set_item_quantities({self.items[0].pk: 2})
+        self.assertFalse(record(self.cube, day(2)).is_checkpoint)
+        self.cube.set_item_quantities({self.items[1].pk: 2})
+        self.assertTrue(record(self.cube, day(3)).is_checkpoint)
+
+    def test_record_changed(self):
+        containers = UserInventory.objects.count() + UserSubCollection.objects.count()
+        self.assertEqual(record_changed(day(1)), containers)
+        self.assertEqual(record_changed(day(2)), 0)
+        self.cube.set_item_quantities({self.items[0].pk: 2})
+        # The item change moves the inventory's version as well as the cube's.
+        self.assertEqual(record_changed(day(3)), 2)
+
+    def test_endpoints(self):
+        record(self.cube, day(1))
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = f'/api/subcollection/{self.cube.pk}/history/'
+        self.assertEqual(len(client.get(url).json()), 1)
+        response = client.get(url, {'at': day(2).isoformat()})
+        self.assertEqual(len(response.json()['cards']), 4)
+        self.assertEqual(client.get(url, {'at': day(2).isoformat(), 'since': day(1).isoformat()}).json()['changes'], [])
+        self.assertEqual(client.get(url, {'at': 'yesterday'}).status_code, 400)
+        for impossible in ('2024-02-30T00:00', '2024-13-01T00:00:00'):
+            self.assertEqual(client.get(url, {'at': impossible}).status_code, 400)
+            self.assertEqual(client.get(url, {'at': day(2).isoformat(), 'since': impossible}).status_code, 400)
+            self.assertEqual(client.get(f'/api/inventory/{self.user.pk}/history/', {'at': impossible}).status_code,
+                             400)
+        self.assertEqual(client.get(f'/api/inventory/{self.user.pk}/history/', {'at': day(2).isoformat()}).status_code,
+                         404)
@@ -1,13 +1,21 @@
 # -*- coding: utf-8 -*-
-from django.test import TestCase
+import threading
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
 
 from card_catalog.models import CardSet, Card
-from inventory.exceptions import InvalidInventoryItemException, InvalidGradingDetailsException
+from inventory.exceptions import (
+    InsufficientQuantityException,
+    InvalidInventoryItemException,
+    InvalidGradingDetailsException,
+)
 from inventory.models import (
     UserInventory,
     UserSubCollection,
     InventoryItem,
     GradingDetails,
+    SubCollectionMembership,
 )
 from registration.models import User
 
@@ -151,6 +159,18 @@ class TestInventory(InventoryModelsTestCase):
         with self.assertRaises(InvalidInventoryItemException):
             self.inventory.remove_items_from_inventory([999999999999999999999])
 
+    def test_add_items_to_inventory__other_owner(self):
+        other_user = User.objects.create_user(email="other_user@domain.com", username="OtherUser")
+        other_item = InventoryItem.objects.create(owner=other_user, card=self.arid_mesa, quantity_owned=1)
+        with self.assertRaises(InvalidInventoryItemException):
+            self.inventory.add_items_to_inventory([other_item.pk])
+
+    def test_get_inventory_items(self):
+        self.inventory.add_items_to_inventory(self.pk_list)
+        self.inventory.add_items_to_inventory(self.pk_list)
+        self.assertEqual(set(self.inventory.get_inventory_items().values_list('pk', flat=True)), set(self.pk_list))
+        self.assertEqual(self.inventory.memberships.filter(owner=self.user).count(), 2)
+
     def test_cubes(self):
         self.assertEqual(len(self.inventory.cubes), 2)
         for cube in self.inventory.cubes:
@@ -220,3 +240,72 @@ class TestSubCollection(InventoryModelsTestCase):
     def test_remove_items_from_subcollection__failure(self):
         with self.assertRaises(InvalidInventoryItemException):
             self.collection.remove_items_from_subcollection([999999999999999999999])
+
+    def test_allocation__availability(self):
+        self.inventory_item1.quantity_owned = 4
+        self.inventory_item1.save()
+        self.collection.add_items_to_subcollection([self.inventory_item1.pk], quantity=3)
+        self.inventory_item1.refresh_from_db()
+        self.assertEqual(self.inventory_item1.quantity_allocated, 3)
+        self.assertEqual(self.inventory_item1.quantity_available, 1)
+        self.assertIn(self.inventory_item1, InventoryItem.objects.owned_by(self.user).available())
+
+        self.collection.set_item_quantities({self.inventory_item1.pk: 4})
+        self.assertNotIn(self.inventory_item1, InventoryItem.objects.owned_by(self.user).available())
+
+    def test_allocation__insufficient_quantity(self):
+        deck = self.inventory.decks.first()
+        self.collection.add_items_to_subcollection([self.inventory_item1.pk])
+        with self.assertRaises(InsufficientQuantityException):
+            deck.add_items_to_subcollection([self.inventory_item1.pk])
+        self.assertEqual(deck.inventory_items.count(), 0)
+
+    def test_allocation__owned_below_allocated(self):
+        self.inventory_item1.quantity_owned = 2
+        self.inventory_item1.save()
+        self.collection.add_items_to_subcollection([self.inventory_item1.pk], quantity=2)
+        self.inventory_item1.quantity_owned = 1
+        with self.assertRaises(InsufficientQuantityException):
+            self.inventory_item1.save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            InventoryItem.objects.bulk_update([self.inventory_item1], ['quantity_owned'])
+        self.inventory_item1.refresh_from_db()
+        self.assertEqual((self.inventory_item1.quantity_owned, self.inventory_item1.quantity_available), (2, 0))
+
+    def test_allocation__released_on_remove(self):
+        self.collection.add_items_to_subcollection([self.inventory_item1.pk])
+        self.collection.remove_items_from_subcollection([self.inventory_item1.pk])
+        self.inventory_item1.refresh_from_db()
+        self.assertEqual(self.inventory_item1.quantity_available, 1)
+
+
+class TestConcurrentAllocation(TransactionTestCase):
+    """
+    Concurrent adds to a sub-collection, each in its own connection and transaction
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def test_concurrent_adds_both_count(self):
+        user = User.objects.get(email="test_user@domain.com")
+        collection = UserInventory.objects.get(owner=user).collections.first()
+        item = InventoryItem.objects.create(owner=user, card_id=1, quantity_owned=4)
+        barrier = threading.Barrier(2)
+        errors = []
+
+        def add():
+            try:
+                barrier.wait()
+                UserSubCollection.objects.get(pk=collection.pk).add_items_to_subcollection([item.pk])
+            except Exception as err:
+                errors.append(err)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=add) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(SubCollectionMembership.objects.get(subcollection=collection, inventoryitem=item).quantity, 2)
+        self.assertEqual(InventoryItem.objects.get(pk=item.pk).quantity_allocated, 2)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from inventory.management.commands.partition_inventory import MIN_POSTGRES_VERSION
+from inventory.models import InventoryItem, InventoryMembership, SubCollectionMembership, UserInventory
+from registration.models import User
+
+TABLES = [model._meta.db_table for model in (InventoryItem, InventoryMembership, SubCollectionMembership)]
+
+
+class TestPartitionInventory(TestCase):
+    """
+    Tests for the partition_inventory command. PostgreSQL DDL is transactional, so the switch is undone
+    with the rest of each test.
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        if connection.pg_version < MIN_POSTGRES_VERSION:
+            self.skipTest('Partitioned storage requires PostgreSQL 13 or newer.')
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.inventory = UserInventory.objects.get(owner=self.user)
+        self.cube = self.inventory.cubes.first()
+        self.kept = InventoryItem.objects.create(owner=self.user, card_id=1, quantity_owned=2)
+        self.cube.set_item_quantities({self.kept.pk: 1})
+
+    def relkinds(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT relname, relkind FROM pg_class WHERE relname = ANY(%s)', [TABLES])
+            return dict(cursor.fetchall())
+
+    def test_dry_run_changes_nothing(self):
+        out = StringIO()
+        call_command('partition_inventory', partitions=2, dry_run=True, stdout=out)
+        self.assertIn('PARTITION BY HASH (owner_id)', out.getvalue())
+        self.assertEqual(set(self.relkinds().values()), {'r'})
+
+    def test_partition(self):
+        call_command('partition_inventory', partitions=2, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(self.relkinds(), {table: 'p' for table in TABLES})
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT array_agg(a.attname ORDER BY k.ord)
+                  FROM pg_constraint c
+                 CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+                  JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                 WHERE c.conrelid = %s::regclass AND c.confrelid = %s::regclass AND c.contype = 'f'
+                 GROUP BY c.oid
+            """, [SubCollectionMembership._meta.db_table, InventoryItem._meta.db_table])
+            self.assertEqual([row[0] for row in cursor.fetchall()], [['inventoryitem_id', 'owner_id']])
+        with self.assertRaises(CommandError):
+            call_command('partition_inventory', partitions=2, stdout=StringIO())
+
+        # Rows carried over, and the ORM (with the allocation triggers) works on the new tables.
+        self.kept.refresh_from_db()
+        self.assertEqual(self.kept.quantity_allocated, 1)
+        item = InventoryItem.objects.create(owner=self.user, card_id=2, quantity_owned=1)
+        self.inventory.add_items_to_inventory([item.pk])
+        self.cube.set_item_quantities({item.pk: 1})
+        item.refresh_from_db()
+        self.assertEqual((item.quantity_allocated, item.quantity_available), (1, 0))
+        self.cube.remove_items_from_subcollection([item.pk])
+        self.inventory.remove_items_from_inventory([item.pk])
+        item.delete()
+        self.assertFalse(InventoryItem.objects.filter(pk=item.pk).exists())
+        self.assertEqual(set(self.cube.get_inventory_items()), {self.kept})
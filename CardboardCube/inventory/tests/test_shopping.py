@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from inventory.exceptions import InvalidCardListException
+from inventory.models import InventoryItem, UserSubCollection
+from inventory.shopping import fold_into_wanted, shopping_list
+from registration.models import User
+
+
+class TestShoppingList(TestCase):
+    """
+    Tests for the cards-needed shopping list across sub-collections
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.deck, self.other_deck = UserSubCollection.objects.filter(owner=self.user, kind='deck').order_by('pk')
+        # Card 3 becomes a reprint of card 4.
+        Card.objects.filter(pk=3).update(name=Card.objects.get(pk=4).name)
+        self.owned = InventoryItem.objects.create(owner=self.user, card_id=1, quantity_owned=4)
+        self.unowned = InventoryItem.objects.create(owner=self.user, card_id=2, quantity_owned=0)
+        self.reprint = InventoryItem.objects.create(owner=self.user, card_id=4, quantity_owned=1)
+        self.wanted_printing = InventoryItem.objects.create(owner=self.user, card_id=3, quantity_owned=0)
+        self.deck.set_item_quantities({self.owned.pk: 2})
+        self.deck.set_needed_quantities({self.owned.pk: 4, self.unowned.pk: 3})
+        self.other_deck.set_needed_quantities({self.owned.pk: 2, self.wanted_printing.pk: 1})
+
+    def shortfalls(self, subcollections, identity='card'):
+        return {entry['card']: entry['short'] for entry in shopping_list(
+            self.user.pk, [subcollection.pk for subcollection in subcollections], identity
+        )}
+
+    def test_single_deck(self):
+        # Two copies are allocated and the two free ones cover the rest of card 1.
+        self.assertEqual(self.shortfalls([self.deck]), {2: 3})
+
+    def test_decks_share_free_copies(self):
+        self.assertEqual(self.shortfalls([self.deck, self.other_deck]), {1: 2, 2: 3, 3: 1})
+
+    def test_name_identity_counts_other_printings(self):
+        entries = shopping_list(self.user.pk, [self.deck.pk, self.other_deck.pk], 'name')
+        self.assertEqual({entry['card']: entry['short'] for entry in entries}, {1: 2, 2: 3})
+        self.assertEqual({entry['name'] for entry in entries}, set(Card.objects.filter(pk__in=[1, 2]).values_list(
+            'name', flat=True)))
+
+    def test_invalid_identity(self):
+        with self.assertRaises(InvalidCardListException):
+            shopping_list(self.user.pk, [self.deck.pk], 'set')
+
+    def test_fold_into_wanted(self):
+        entries = shopping_list(self.user.pk, [self.deck.pk, self.other_deck.pk])
+        entries.append({'card': 5, 'short': 2})
+        fold_into_wanted(self.user.pk, entries)
+        self.owned.refresh_from_db()
+        self.unowned.refresh_from_db()
+        self.assertEqual((self.owned.quantity_wanted, self.unowned.quantity_wanted), (2, 3))
+        created = InventoryItem.objects.get(owner=self.user, card_id=5)
+        self.assertEqual((created.quantity_owned, created.quantity_wanted), (0, 2))
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = '/api/subcollection/shopping-list/'
+        response = client.get(url, {'subcollections': '{},{}'.format(self.deck.pk, self.other_deck.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['cards']), 3)
+        response = client.post(url, {'subcollections': [str(self.deck.pk)], 'update_wanted': True}, format='json')
+        self.assertEqual(response.json()['updated'], [str(self.unowned.pk)])
+        self.assertEqual(client.get(url, {'subcollections': 'not-a-pk'}).status_code, 404)
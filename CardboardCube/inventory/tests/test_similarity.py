@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from inventory.exceptions import SimilarityIndexUnavailableException
+from inventory.models import InventoryItem
+from inventory.similarity import (
+    BUILD_PENDING_KEY, DIMENSIONS, build_index, card_vector, current_version, get_index, similar_owned_cards,
+)
+from inventory.snapshots import get_snapshot_store
+from registration.models import User
+
+
+class TestSimilarity(TestCase):
+    """
+    Tests for the memory-mapped card similarity index
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.settings_override = override_settings(SIMILARITY_INDEX_ROOT=tempfile.mkdtemp())
+        self.settings_override.enable()
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.land = Card.objects.get(pk=1)
+        for card in Card.objects.order_by('pk')[1:12]:
+            InventoryItem.objects.create(owner=self.user, card=card, quantity_owned=1)
+
+    def tearDown(self):
+        self.settings_override.disable()
+
+    def test_vectors_are_normalised(self):
+        vector, mask = card_vector('Lightning Bolt', 1, "['Instant']", '[]', "['R']",
+                                   'Lightning Bolt deals 3 damage to any target.')
+        self.assertEqual(vector.shape, (DIMENSIONS,))
+        self.assertAlmostEqual(float((vector ** 2).sum()), 1.0, places=5)
+        self.assertEqual(mask, 1 << 3)
+
+    def test_build_once_per_catalog_version(self):
+        version = build_index()
+        self.assertEqual(current_version(), version)
+        self.assertEqual(build_index(), version)
+        self.assertEqual(len(get_index().card_ids), Card.objects.count())
+        Card.objects.filter(pk=2).update(oracle_text='Flying')
+        self.assertNotEqual(build_index(), version)
+
+    def test_nearest_owned_cards(self):
+        build_index()
+        similar = similar_owned_cards(self.user.pk, self.land.pk, limit=3)
+        self.assertEqual(len(similar), 3)
+        owned = set(InventoryItem.objects.filter(owner=self.user).values_list('card_id', flat=True))
+        self.assertTrue({card.card_id for card in similar} <= owned)
+        self.assertEqual([card.score for card in similar], sorted((card.score for card in similar), reverse=True))
+        self.assertNotIn(self.land.pk, [card.card_id for card in similar])
+
+    def test_same_colors(self):
+        build_index()
+        index = get_index()
+        similar = similar_owned_cards(self.user.pk, self.land.pk, limit=20, same_colors=True)
+        land_mask = index.color_masks[index.rows([self.land.pk])[0]]
+        for card in similar:
+            self.assertEqual(index.color_masks[index.rows([card.card_id])[0]], land_mask)
+
+    def test_unbuilt_index(self):
+        with self.assertRaises(SimilarityIndexUnavailableException):
+            get_index()
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        build_index()
+        response = client.get('/api/search/similar/', {'card': self.land.pk, 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(client.get('/api/search/similar/', {'card': 'x'}).status_code, 400)
+
+    def test_missing_index_queues_one_build(self):
+        get_snapshot_store().delete(BUILD_PENDING_KEY)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with mock.patch('inventory.tasks.build_similarity_index.delay') as delay:
+            for _ in range(3):
+                self.assertEqual(client.get('/api/search/similar/', {'card': self.land.pk}).status_code, 503)
+        delay.assert_called_once_with()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from django.test import SimpleTestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from inventory.exceptions import InvalidSimulationException
+from inventory.models import InventoryItem, UserInventory
+from inventory.simulation import build_cube, merge_tallies, simulate, summarize
+from jobs.models import Job
+from registration.models import User
+
+
+def _cube(size):
+    colors = ["['W']", "['U']", "['B']", "['R']", "['G']", "['U', 'W']", '[]']
+    return build_cube([
+        (pk, f'Card {pk}', "['Creature']", colors[pk % len(colors)], 1) for pk in range(size - 10)
+    ] + [
+        (pk, f'Land {pk}', "['Land']", '[]', 1) for pk in range(size - 10, size)
+    ])
+
+
+class TestDraftSimulation(SimpleTestCase):
+    """
+    Tests for the vectorised draft simulator
+    """
+
+    def test_simulate(self):
+        cube = _cube(120)
+        stats = summarize(cube, simulate(cube, 50, drafters=4, packs=2, pack_size=15, seed=7))
+        self.assertEqual(stats['drafts'], 50)
+        self.assertEqual(sum(card['appearances'] for card in stats['cards']), 50 * 4 * 2 * 15)
+        self.assertAlmostEqual(sum(archetype['drafted_rate'] for archetype in stats['archetypes']), 1, places=3)
+        # Spells are taken before vanilla lands.
+        self.assertTrue(stats['cards'][-1]['name'].startswith('Land'))
+        self.assertTrue(all(1 <= card['average_pick'] <= 15 for card in stats['cards'] if card['appearances']))
+
+    def test_tallies_merge(self):
+        cube = _cube(120)
+        tallies = [simulate(cube, 10, drafters=4, packs=2, seed=seed) for seed in (1, 2)]
+        merged = merge_tallies(tallies)
+        self.assertEqual(merged['drafts'][0], 20)
+        self.assertEqual(summarize(cube, merged)['drafts'], 20)
+
+    def test_seeded_runs_repeat(self):
+        cube = _cube(120)
+        first, second = (simulate(cube, 5, drafters=4, packs=2, seed=3) for _ in range(2))
+        self.assertEqual(first['pick_sum'].tolist(), second['pick_sum'].tolist())
+
+    def test_cube_too_small(self):
+        with self.assertRaises(InvalidSimulationException):
+            simulate(_cube(100), 1, drafters=8)
+
+
+class TestDraftSimulationJob(TransactionTestCase):
+    """
+    Tests for running draft simulations as jobs through the API
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.cube = UserInventory.objects.get(owner=self.user).cubes.first()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        items = [InventoryItem.objects.create(owner=self.user, card=card, quantity_owned=1)
+                 for card in Card.objects.all()]
+        self.cube.add_items_to_subcollection([item.pk for item in items])
+
+    def test_simulation_job(self):
+        response = self.client.post(f'/api/subcollection/{self.cube.pk}/simulate/',
+                                    {'drafts': 30, 'drafters': 2, 'packs': 1, 'seed': 1}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.data['uuid'])
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['drafts'], 30)
+        self.assertEqual(len(job.result['cards']), Card.objects.count())
+
+    def test_cube_too_small_for_draft(self):
+        response = self.client.post(f'/api/subcollection/{self.cube.pk}/simulate/', {'drafters': 8}, format='json')
+        self.assertEqual(response.status_code, 400)
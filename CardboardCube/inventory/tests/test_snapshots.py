@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from card_catalog.models import Card
+from db_router import use_replica
+from inventory import snapshots
+from inventory.models import InventoryItem
+from registration.models import User
+
+
+class TestInventorySnapshots(TestCase):
+    """
+    Tests for the compressed inventory snapshot cache
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        snapshots.get_snapshot_store().delete(snapshots.snapshot_key(self.user.pk))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/api/inventory/{self.user.pk}/snapshot/'
+        self.arid_mesa = InventoryItem.objects.create(owner=self.user, card=Card.objects.get(pk=1), quantity_owned=2)
+        self.steam_vents = InventoryItem.objects.create(owner=self.user, card=Card.objects.get(pk=2), is_foil=True)
+
+    def _items(self, **kwargs):
+        response = self.client.get(self.url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        content = response.content
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return {item['uuid']: item for item in json.loads(content)['items']}
+
+    def test_snapshot(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        items = self._items()
+        self.assertEqual(items[str(self.arid_mesa.pk)]['card']['name'], 'Arid Mesa')
+        self.assertEqual(items[str(self.arid_mesa.pk)]['quantity_available'], 2)
+        self.assertTrue(items[str(self.steam_vents.pk)]['is_foil'])
+
+    def test_stale_snapshot_is_patched(self):
+        self._items()
+        self.arid_mesa.quantity_owned = 4
+        self.arid_mesa.save()
+        self.steam_vents.delete()
+        with mock.patch.object(snapshots, '_serialize_items', wraps=snapshots._serialize_items) as serialize:
+            items = self._items()
+        serialize.assert_called_once_with(self.user.pk, {self.arid_mesa.pk, self.steam_vents.pk})
+        self.assertEqual(items[str(self.arid_mesa.pk)]['quantity_owned'], 4)
+        self.assertNotIn(str(self.steam_vents.pk), items)
+
+    def test_fresh_snapshot_is_served_from_store(self):
+        self._items()
+        with self.assertNumQueries(2):
+            self._items()
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_refresh_reads_primary_inside_replica_context(self):
+        # Queries to the replica are refused here, and would not see this test's rows anyway.
+        with use_replica():
+            version, body = snapshots.refresh_snapshot(self.user.pk)
+        items = {item['uuid'] for item in json.loads(gzip.decompress(body))['items']}
+        self.assertEqual(items, {str(self.arid_mesa.pk), str(self.steam_vents.pk)})
+
+    def test_conditional_get_and_ownership(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        other = User.objects.create(email="other@domain.com", username="Other")
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from rest_framework.test import APIClient
+
+from inventory.exceptions import InvalidFormatException
+from inventory.models import InventoryItem
+from inventory.tests.test_models import InventoryModelsTestCase
+from inventory.validation import CopyLimit, MinimumSize, validate_subcollections
+
+
+class TestValidation(InventoryModelsTestCase):
+    """
+    Tests for the deck legality and cube composition rules
+    """
+    def setUp(self):
+        super(TestValidation, self).setUp()
+        self.deck, self.other_deck = self.inventory.decks
+        self.mesas = InventoryItem.objects.create(owner=self.user, card=self.arid_mesa, quantity_owned=5)
+        self.deck.set_item_quantities({self.mesas.pk: 5, self.inventory_item2.pk: 1})
+
+    def test_validate__violations(self):
+        violations = validate_subcollections([self.deck], 'standard')[self.deck.pk]
+        self.assertEqual(sorted(v.rule for v in violations), ['copy_limit', 'minimum_size'])
+        copy_limit = [v for v in violations if v.rule == 'copy_limit'][0]
+        self.assertEqual(copy_limit.card, 'Arid Mesa')
+
+    def test_validate__batch(self):
+        violations = validate_subcollections([self.deck, self.other_deck], [MinimumSize(6), CopyLimit(5)])
+        self.assertEqual(violations[self.deck.pk], [])
+        self.assertEqual([v.rule for v in violations[self.other_deck.pk]], ['minimum_size'])
+
+    def test_validate__unknown_format(self):
+        with self.assertRaises(InvalidFormatException):
+            validate_subcollections([self.deck], 'not-a-format')
+
+    def test_validate__missing_format(self):
+        for rules in (None, '', {'name': 'standard'}):
+            with self.assertRaises(InvalidFormatException):
+                validate_subcollections([self.deck], rules)
+
+    def test_validate_endpoints__missing_format(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        self.assertEqual(client.get(f'/api/subcollection/{self.deck.pk}/validate/').status_code, 400)
+        response = client.post('/api/subcollection/validate/', {'subcollections': [str(self.deck.pk)]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = client.post('/api/subcollection/validate/', {'format': 'standard', 'subcollections': 'nope'},
+                               format='json')
+        self.assertEqual(response.status_code, 400)
+        response = client.post('/api/subcollection/validate/', {
+            'format': 'standard', 'subcollections': [str(self.deck.pk), str(self.other_deck.pk)],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {str(self.deck.pk), str(self.other_deck.pk)})
@@ -0,0 +1,161 @@
+"""
+Deck legality and cube composition rules.
+
+Each rule checks a whole batch of sub-collections with a single grouped aggregate query over the
+sub-collection memberships, so validating a 540 card cube (or fifty decks at once) costs a handful of
+queries regardless of size.
+"""
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Sum
+
+from inventory.exceptions import InvalidFormatException
+from inventory.models import SubCollectionMembership, UserSubCollection
+
+Violation = namedtuple('Violation', ['subcollection', 'rule', 'card', 'message'])
+
+BASIC_LAND_NAMES = (
+    'Plains', 'Island', 'Swamp', 'Mountain', 'Forest', 'Wastes',
+    'Snow-Covered Plains', 'Snow-Covered Island', 'Snow-Covered Swamp', 'Snow-Covered Mountain',
+    'Snow-Covered Forest',
+)
+
+# Number of copies of a card a membership puts into its sub-collection.
+COPIES = F('quantity')
+
+
+class FormatRule(object):
+    """
+    Base class for format rules. `evaluate` receives the primary keys being validated and a queryset
+    of all their memberships, and yields a Violation for every breach it finds.
+    """
+    name = None
+
+    def evaluate(self, subcollection_pks, memberships):
+        raise NotImplementedError
+
+
+class MinimumSize(FormatRule):
+    name = 'minimum_size'
+
+    def __init__(self, minimum):
+        self.minimum = minimum
+
+    def evaluate(self, subcollection_pks, memberships):
+        totals = dict(memberships.values('subcollection').annotate(total=Sum(COPIES)).values_list('subcollection', 'total'))
+        for pk in subcollection_pks:
+            total = totals.get(pk) or 0
+            if total < self.minimum:
+                yield Violation(pk, self.name, None, f'Contains {total} cards, at least {self.minimum} are required.')
+
+
+class MaximumSize(FormatRule):
+    name = 'maximum_size'
+
+    def __init__(self, maximum):
+        self.maximum = maximum
+
+    def evaluate(self, subcollection_pks, memberships):
+        oversized = memberships.values('subcollection').annotate(total=Sum(COPIES)).filter(total__gt=self.maximum)
+        for pk, total in oversized.values_list('subcollection', 'total'):
+            yield Violation(pk, self.name, None, f'Contains {total} cards, at most {self.maximum} are allowed.')
+
+
+class CopyLimit(FormatRule):
+    """
+    No more than `limit` copies of any card, counted by name across printings.
+    """
+    name = 'copy_limit'
+
+    def __init__(self, limit, exempt_basic_lands=True):
+        self.limit = limit
+        self.exempt_basic_lands = exempt_basic_lands
+
+    def evaluate(self, subcollection_pks, memberships):
+        if self.exempt_basic_lands:
+            memberships = memberships.exclude(inventoryitem__card__name__in=BASIC_LAND_NAMES)
+        over_limit = memberships.values('subcollection', 'inventoryitem__card__name').annotate(
+            copies=Sum(COPIES),
+        ).filter(copies__gt=self.limit)
+        for pk, card_name, copies in over_limit.values_list('subcollection', 'inventoryitem__card__name', 'copies'):
+            yield Violation(pk, self.name, card_name, f'Contains {copies} copies of {card_name}, the limit is {self.limit}.')
+
+
+class Singleton(CopyLimit):
+    name = 'singleton'
+
+    def __init__(self, exempt_basic_lands=True):
+        super(Singleton, self).__init__(limit=1, exempt_basic_lands=exempt_basic_lands)
+
+
+class KnownCards(FormatRule):
+    """
+    Every item must be linked to a catalog card, otherwise it cannot be checked.
+    """
+    name = 'known_cards'
+
+    def evaluate(self, subcollection_pks, memberships):
+        unknown = memberships.filter(inventoryitem__card__isnull=True).values_list('subcollection', 'inventoryitem')
+        for pk, inventory_item_pk in unknown:
+            yield Violation(pk, self.name, None, f'Inventory item {inventory_item_pk} is not linked to a card.')
+
+
+FORMATS = {
+    'standard': [KnownCards(), MinimumSize(60), CopyLimit(4)],
+    'modern': [KnownCards(), MinimumSize(60), CopyLimit(4)],
+    'legacy': [KnownCards(), MinimumSize(60), CopyLimit(4)],
+    'commander': [KnownCards(), MinimumSize(100), MaximumSize(100), Singleton()],
+    'cube': [KnownCards(), MinimumSize(360), Singleton(exempt_basic_lands=False)],
+}
+
+
+def register_format(name, rules):
+    """
+    Register (or replace) the list of rules checked for a format.
+    """
+    FORMATS[name] = list(rules)
+
+
+def get_format_rules(format_name):
+    if not format_name:
+        raise InvalidFormatException({'Errors': 'A format is required.'})
+    try:
+        return FORMATS[format_name]
+    except (KeyError, TypeError):
+        raise InvalidFormatException({'Errors': f'Unknown format: {format_name}'})
+
+
+def subcollection_pks(subcollections):
+    """
+    The primary keys of a list of sub-collections (instances or primary keys).
+    """
+    if not isinstance(subcollections, (list, tuple)):
+        raise InvalidFormatException({'Errors': 'Sub-collections must be a list.'})
+    try:
+        return [UserSubCollection._meta.pk.to_python(getattr(subcollection, 'pk', subcollection))
+                for subcollection in subcollections]
+    except ValidationError as err:
+        raise InvalidFormatException({'Errors': f'Invalid sub-collection: {err}'})
+
+
+def validate_subcollections(subcollections, rules, owner=None):
+    """
+    Check sub-collections (instances or primary keys) against a format name or a list of rules.
+
+    Returns a dict mapping each sub-collection primary key to the list of all its violations; an
+    empty list means it is legal. Passing `owner` keeps the membership scans on that owner's partition.
+    """
+    if not isinstance(rules, (list, tuple)):
+        rules = get_format_rules(rules)
+    pks = subcollection_pks(subcollections)
+
+    memberships = SubCollectionMembership.objects.filter(subcollection__in=pks)
+    if owner is not None:
+        memberships = memberships.filter(owner=owner)
+
+    violations = {pk: [] for pk in pks}
+    for rule in rules:
+        for violation in rule.evaluate(pks, memberships):
+            violations[violation.subcollection].append(violation)
+    return violations
@@ -0,0 +1,8 @@
+class JobError(Exception):
+
+    def __init__(self, msg, *args, **kwargs):
+        super(JobError, self).__init__(msg)
+
+
+class InvalidJobException(JobError):
+    pass
@@ -0,0 +1,86 @@
+import uuid
+
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from jobs.progress import get_progress_store
+from jobs.registry import get_handler
+
+
+class JobManager(models.Manager):
+
+    def submit(self, owner, kind, params=None):
+        """
+        Validate and store a job, then queue it once the surrounding transaction commits.
+        """
+        from jobs.tasks import start_job
+
+        params = get_handler(kind).clean(owner, params or {})
+        job = self.create(owner=owner, kind=kind, params=params)
+        transaction.on_commit(lambda: start_job.delay(str(job.pk)))
+        return job
+
+
+class Job(models.Model):
+    """
+    Class to track a long-running operation a user started, from submission through its result.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    )
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    uuid = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True)
+    owner = models.ForeignKey('registration.User', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=64, help_text=_("Registered handler that runs the job"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    params = models.JSONField(default=dict)
+    result = models.JSONField(null=True)
+    error = models.TextField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    objects = JobManager()
+
+    class Meta:
+        verbose_name = _('Job')
+        verbose_name_plural = _('Jobs')
+        indexes = [models.Index(fields=['owner', '-created_at'], name='jobs_job_owner_created_idx')]
+
+    def __str__(self):
+        return f"{self.kind} job ({self.status})"
+
+    @property
+    def progress(self):
+        """
+        Percentage of the job's work that has finished: its chunks, or the units its handler counts.
+        """
+        if self.status == self.SUCCEEDED:
+            return 100.0
+        counters = get_progress_store().get(self.pk)
+        if not counters or not counters[1]:
+            return 0.0
+        done, total = counters
+        return round(100.0 * done / total, 1)
+
+    def cancel(self):
+        """
+        Stop a pending or running job; chunks that have not started yet are skipped. Returns False if
+        the job had already finished.
+        """
+        cancelled = Job.objects.filter(pk=self.pk, status__in=self.ACTIVE_STATUSES).update(
+            status=self.CANCELLED, finished_at=timezone.now()
+        )
+        self.refresh_from_db(fields=['status', 'finished_at'])
+        return bool(cancelled)
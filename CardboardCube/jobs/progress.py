@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Progress counters for running jobs. Chunks of one job run on many workers and all report here,
+so the default store keeps the counters in Redis; LocalProgressStore keeps them in process memory
+for eager (CELERY_ALWAYS_EAGER) runs. The store is chosen with settings.JOB_PROGRESS_STORE.
+"""
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from redis_client import get_redis
+
+
+class ProgressStore(object):
+
+    def start(self, job_id, total):
+        """
+        Reset the job's counters to 0 of `total` chunks.
+        """
+        raise NotImplementedError
+
+    def advance(self, job_id, amount=1):
+        """
+        Record `amount` more finished chunks.
+        """
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """
+        (done, total) for the job, or None if nothing has been recorded.
+        """
+        raise NotImplementedError
+
+
+class RedisProgressStore(ProgressStore):
+
+    def __init__(self):
+        self.redis = get_redis()
+        self.ttl = settings.JOB_PROGRESS_TTL
+
+    def _key(self, job_id):
+        return f'job:{job_id}:progress'
+
+    def start(self, job_id, total):
+        key = self._key(job_id)
+        self.redis.pipeline().hset(key, mapping={'done': 0, 'total': total}).expire(key, self.ttl).execute()
+
+    def advance(self, job_id, amount=1):
+        self.redis.hincrby(self._key(job_id), 'done', amount)
+
+    def get(self, job_id):
+        done, total = self.redis.hmget(self._key(job_id), 'done', 'total')
+        if total is None:
+            return None
+        return int(done), int(total)
+
+
+class LocalProgressStore(ProgressStore):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def start(self, job_id, total):
+        with self.lock:
+            self.counters[str(job_id)] = [0, total]
+
+    def advance(self, job_id, amount=1):
+        with self.lock:
+            self.counters[str(job_id)][0] += amount
+
+    def get(self, job_id):
+        counters = self.counters.get(str(job_id))
+        return tuple(counters) if counters else None
+
+
+@lru_cache(maxsize=None)
+def _load_store(path):
+    return import_string(path)()
+
+
+def get_progress_store():
+    return _load_store(settings.JOB_PROGRESS_STORE)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from jobs.exceptions import InvalidJobException
+from jobs.progress import get_progress_store
+
+
+class JobHandler(object):
+    """
+    The work behind one kind of job. `chunks()` splits a job into JSON-serialisable pieces that
+    run in parallel as `run_chunk()` calls on the chunk queue, and `combine()` merges the chunk
+    results (which travel through the result backend, so keep them small) into the job's result.
+    """
+    kind = None
+    queue = 'jobs_chunks'
+    # Handlers whose chunks report finer-grained progress themselves, through advance(), set this and
+    # override progress_total().
+    reports_progress = False
+
+    def clean(self, owner, params):
+        """
+        Validate the submitted params, raising InvalidJobException, and return the params to store.
+        """
+        return params
+
+    def chunks(self, job):
+        return [job.params]
+
+    def progress_total(self, job, chunks):
+        """
+        Units of progress the job will report; by default one per chunk.
+        """
+        return len(chunks)
+
+    def advance(self, job, amount=1):
+        get_progress_store().advance(job.pk, amount)
+
+    def run_chunk(self, job, chunk):
+        raise NotImplementedError
+
+    def combine(self, job, results):
+        return results
+
+
+HANDLERS = {}
+
+
+def register_handler(handler_class):
+    """
+    Class decorator registering (or replacing) the handler for its `kind`.
+    """
+    HANDLERS[handler_class.kind] = handler_class()
+    return handler_class
+
+
+def get_handler(kind):
+    try:
+        return HANDLERS[kind]
+    except KeyError:
+        raise InvalidJobException({'Errors': f'Unknown job kind: {kind}'})
@@ -0,0 +1,73 @@
+import logging
+
+from celery import chord, group, shared_task
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.progress import get_progress_store
+from jobs.registry import get_handler
+
+logger = logging.getLogger(__name__)
+
+
+def _fail(job_id, err):
+    logger.exception('Job %s failed', job_id)
+    Job.objects.filter(pk=job_id, status__in=Job.ACTIVE_STATUSES).update(
+        status=Job.FAILED, error=str(err), finished_at=timezone.now()
+    )
+
+
+@shared_task
+def start_job(job_id):
+    """
+    Split a pending job into chunks and fan them out as a chord that finishes the job.
+    """
+    if not Job.objects.filter(pk=job_id, status=Job.PENDING).update(status=Job.RUNNING, started_at=timezone.now()):
+        return
+    job = Job.objects.get(pk=job_id)
+    handler = get_handler(job.kind)
+    try:
+        chunks = list(handler.chunks(job))
+        total = handler.progress_total(job, chunks)
+    except Exception as err:
+        _fail(job_id, err)
+        return
+    get_progress_store().start(job_id, total)
+    if not chunks:
+        finish_job([], job_id)
+        return
+    chord(
+        group(run_job_chunk.s(job_id, chunk).set(queue=handler.queue) for chunk in chunks)
+    )(finish_job.s(job_id))
+
+
+@shared_task
+def run_job_chunk(job_id, chunk):
+    job = Job.objects.filter(pk=job_id).first()
+    if job is None or job.status != Job.RUNNING:
+        # Cancelled, another chunk failed, or the job went with its owner (see inventory.deletion).
+        return None
+    handler = get_handler(job.kind)
+    try:
+        result = handler.run_chunk(job, chunk)
+    except Exception as err:
+        _fail(job_id, err)
+        return None
+    if not handler.reports_progress:
+        get_progress_store().advance(job_id)
+    return result
+
+
+@shared_task
+def finish_job(results, job_id):
+    job = Job.objects.filter(pk=job_id).first()
+    if job is None or job.status != Job.RUNNING:
+        return
+    try:
+        result = get_handler(job.kind).combine(job, [result for result in results if result is not None])
+    except Exception as err:
+        _fail(job_id, err)
+        return
+    Job.objects.filter(pk=job_id, status=Job.RUNNING).update(
+        status=Job.SUCCEEDED, result=result, finished_at=timezone.now()
+    )
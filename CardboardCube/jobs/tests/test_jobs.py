@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from inventory.job_handlers import InventoryImportHandler
+from inventory.models import UserInventory
+from jobs.models import Job
+from jobs.tasks import start_job
+from registration.models import User
+
+
+class TestJobs(TransactionTestCase):
+    """
+    Tests for background jobs, run eagerly. Jobs are queued on commit, so these run outside a
+    wrapping test transaction.
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.inventory = UserInventory.objects.get(owner=self.user)
+        self.collection = self.inventory.collections.first()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.chunk_size = InventoryImportHandler.chunk_size
+        InventoryImportHandler.chunk_size = 2
+
+    def tearDown(self):
+        InventoryImportHandler.chunk_size = self.chunk_size
+
+    def _submit(self, params, kind='inventory_import'):
+        return self.client.post('/api/jobs/', {'kind': kind, 'params': params}, format='json')
+
+    def test_import_job(self):
+        items = [{'card': 1, 'quantity_owned': 2}, {'card': 2, 'quantity_owned': 1}, {'card': 3, 'is_foil': True}]
+        response = self._submit({'items': items, 'subcollection': str(self.collection.pk)})
+        self.assertEqual(response.status_code, 202)
+
+        response = self.client.get(f"/api/jobs/{response.data['uuid']}/")
+        self.assertEqual(response.data['status'], Job.SUCCEEDED)
+        self.assertEqual(response.data['progress'], 100.0)
+        self.assertEqual(response.data['result'], {'created': 3})
+        self.assertEqual(self.inventory.get_inventory_items().count(), 3)
+        self.assertEqual(sorted(self.collection.memberships.values_list('quantity', flat=True)), [1, 2])
+
+    def test_failed_chunk_fails_job(self):
+        response = self._submit({'items': [{'card': 1}, {'card': 1}, {'card': 999999}]})
+        job = Job.objects.get(pk=response.data['uuid'])
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('999999', job.error)
+        self.assertEqual(job.progress, 50.0)
+
+    def test_invalid_submission(self):
+        self.assertEqual(self._submit({}, kind='nonsense').status_code, 400)
+        self.assertEqual(self._submit({'items': [{'card': 1, 'price': 3}]}).status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_cancel(self):
+        job = Job.objects.create(owner=self.user, kind='inventory_import', params={'items': [{'card': 1}]})
+        response = self.client.post(f'/api/jobs/{job.pk}/cancel/')
+        self.assertEqual(response.data['status'], Job.CANCELLED)
+        start_job(str(job.pk))
+        self.assertEqual(self.inventory.get_inventory_items().count(), 0)
+        self.assertEqual(self.client.post(f'/api/jobs/{job.pk}/cancel/').status_code, 409)
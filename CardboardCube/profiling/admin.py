@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import RequestProfile
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('method', 'path', 'status_code', 'duration_ms', 'trigger', 'user', 'created_at')
+    list_filter = ('trigger', 'method')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    exclude = ('speedscope',)
+    readonly_fields = ('uuid', 'user', 'trigger', 'method', 'path', 'view', 'status_code', 'duration_ms', 'samples')
+
+    def get_queryset(self, request):
+        return super(RequestProfileAdmin, self).get_queryset(request).defer('speedscope')
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+On-demand request profiling.
+
+A request is profiled when its ``X-Profile`` header holds a valid profiling token, or when it is
+picked at random with probability PROFILING_SAMPLE_RATE. Tokens are issued to staff by
+``POST /api/profiles/token/`` and signed with the secret key, so checking one needs no database and
+other clients cannot make a request pay for profiling. Header-triggered profiles are kept (and their id
+returned in ``X-Profile-Id``) only when the request was made by the staff user the token was issued
+to; sampled profiles are kept for every user, which is how slow pages of other users get caught.
+
+Requests that are not profiled cost one header lookup and, with sampling turned on, one random().
+"""
+import random
+import sys
+
+from django.conf import settings
+from django.core import signing
+
+from profiling.models import RequestProfile
+from profiling.sampler import StackSampler
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+TOKEN_SALT = 'profiling.token'
+
+
+def make_token(user):
+    """
+    A profiling token for `user`, valid for PROFILING_TOKEN_AGE seconds.
+    """
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def token_user_id(token):
+    """
+    The id of the user a profiling token was issued to, or None if it is invalid or expired.
+    """
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_AGE)
+    except signing.BadSignature:
+        return None
+
+
+class ProfilingMiddleware(object):
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token_user = token_user_id(request.META[PROFILE_HEADER]) if PROFILE_HEADER in request.META else None
+        if token_user is not None:
+            trigger = RequestProfile.HEADER
+        elif settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            trigger = RequestProfile.SAMPLED
+        else:
+            return self.get_response(request)
+
+        sampler = StackSampler(sys._getframe(), settings.PROFILING_INTERVAL).start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+
+        user = getattr(request, 'user', None)
+        authenticated = user is not None and user.is_authenticated
+        if trigger == RequestProfile.HEADER and not (authenticated and user.is_staff and str(user.pk) == token_user):
+            return response
+        match = getattr(request, 'resolver_match', None)
+        name = f'{request.method} {request.get_full_path()}'
+        profile = RequestProfile.objects.create(
+            user=user if authenticated else None,
+            trigger=trigger,
+            method=request.method,
+            path=request.get_full_path()[:2048],
+            view=(match._func_path if match is not None else '')[:255],
+            status_code=response.status_code,
+            duration_ms=round(sampler.duration * 1000, 3),
+            samples=sampler.samples,
+            speedscope=sampler.to_speedscope(name),
+        )
+        if trigger == RequestProfile.HEADER:
+            response['X-Profile-Id'] = str(profile.pk)
+        return response
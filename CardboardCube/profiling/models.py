@@ -0,0 +1,39 @@
+import uuid
+
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class RequestProfile(models.Model):
+    """
+    Class to store a statistical profile of one request (see profiling.middleware) in speedscope format.
+    """
+    HEADER = 'header'
+    SAMPLED = 'sampled'
+    TRIGGER_CHOICES = (
+        (HEADER, 'Requested by header'),
+        (SAMPLED, 'Sampled from traffic'),
+    )
+
+    uuid = models.UUIDField(default=uuid.uuid4, unique=True, primary_key=True)
+    user = models.ForeignKey('registration.User', null=True, on_delete=models.SET_NULL, related_name='+',
+                             help_text=_("User the request was made as"))
+    trigger = models.CharField(max_length=7, choices=TRIGGER_CHOICES)
+    method = models.CharField(max_length=8)
+    path = models.CharField(max_length=2048, help_text=_("Path and query string"))
+    view = models.CharField(max_length=255, blank=True, help_text=_("Dotted path of the view that handled it"))
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    samples = models.PositiveIntegerField()
+    speedscope = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = _('Request Profile')
+        verbose_name_plural = _('Request Profiles')
+        indexes = [models.Index(fields=['-created_at'], name='profiling_created_idx')]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
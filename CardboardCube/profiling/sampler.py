@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Statistical profiling of a single request.
+
+A StackSampler runs a background thread that reads the request thread's current stack every
+PROFILING_INTERVAL seconds (through sys._current_frames(), so the profiled code is not instrumented
+and runs at full speed between samples) and adds the time since the previous sample to that stack.
+Stacks are cut at the frame that started the sampler, so a profile starts at the view middleware
+and goes down through DRF, serializers, the ORM and model methods such as InventoryItem.__str__.
+
+Profiles are kept in the speedscope file format (https://www.speedscope.app/), with identical stacks
+folded into one weighted sample; to_collapsed() turns one into the "folded stacks" text that
+flamegraph.pl and most other flame graph tools read.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+@lru_cache(maxsize=4096)
+def short_path(filename):
+    """
+    `filename` relative to the sys.path entry it was imported from, e.g. django/db/models/query.py.
+    """
+    best = None
+    for entry in sys.path:
+        if entry and filename.startswith(entry.rstrip(os.sep) + os.sep) and (best is None or len(entry) > len(best)):
+            best = entry
+    return filename if best is None else os.path.relpath(filename, best)
+
+
+def _frame_key(code):
+    # co_qualname (Python 3.11+) names methods with their class, e.g. InventoryItem.__str__.
+    return getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno
+
+
+class StackSampler(object):
+    """
+    Samples the stack of the thread that created it, below `root_frame`, until stop() is called.
+    """
+
+    def __init__(self, root_frame, interval, max_depth=256):
+        self.thread_id = threading.get_ident()
+        self.root_frame = root_frame
+        self.interval = interval
+        self.max_depth = max_depth
+        self.weights = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        previous = self._started
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if self._stopped.is_set():
+                # The profiled thread is already inside stop().
+                break
+            if frame is not None:
+                stack = self._stack(frame)
+                if stack:
+                    self.weights[stack] += now - previous
+                    self.samples += 1
+            previous = now
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None and frame is not self.root_frame:
+            stack.append(_frame_key(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack[:self.max_depth])
+
+    def to_speedscope(self, name):
+        """
+        The profile as a speedscope document, heaviest stacks first, with weights in seconds.
+        """
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, weight in self.weights.most_common():
+            sample = []
+            for key in stack:
+                if key not in index:
+                    index[key] = len(frames)
+                    function, filename, line = key
+                    frames.append({'name': function, 'file': short_path(filename), 'line': line})
+                sample.append(index[key])
+            samples.append(sample)
+            weights.append(round(weight, 6))
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'CardboardCube',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': round(self.duration, 6),
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+
+
+def to_collapsed(document):
+    """
+    A speedscope document as folded stacks: one "frame;frame;frame <microseconds>" line per stack.
+    """
+    names = [f"{frame['name']} ({frame['file']}:{frame['line']})" for frame in document['shared']['frames']]
+    lines = []
+    for profile in document['profiles']:
+        for sample, weight in zip(profile['samples'], profile['weights']):
+            lines.append('{} {}'.format(';'.join(names[index] for index in sample), round(weight * 1e6)))
+    return '\n'.join(lines) + '\n'
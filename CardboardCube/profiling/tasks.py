@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from profiling.models import RequestProfile
+
+
+@shared_task
+def prune_profiles():
+    """
+    Drop request profiles older than PROFILING_RETENTION.
+    """
+    older_than = timezone.now() - timedelta(seconds=settings.PROFILING_RETENTION)
+    deleted, _ = RequestProfile.objects.filter(created_at__lt=older_than).delete()
+    return deleted
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import sys
+import time
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from profiling.middleware import make_token
+from profiling.models import RequestProfile
+from profiling.sampler import StackSampler, to_collapsed
+from registration.models import User
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+@override_settings(PROFILING_INTERVAL=0.001, PROFILING_SAMPLE_RATE=0)
+class TestProfiling(TestCase):
+    """
+    Tests for the on-demand request profiler
+    """
+    fixtures = ['card_catalog.json', 'inventory.json']
+
+    def setUp(self):
+        self.user = User.objects.get(email="test_user@domain.com")
+        self.staff = User.objects.create_user('staff@domain.com', username='staff', is_staff=True)
+        self.client = APIClient()
+
+    def test_sampler(self):
+        sampler = StackSampler(sys._getframe(), 0.001).start()
+        busy(0.05)
+        sampler.stop()
+        self.assertGreater(sampler.samples, 0)
+        document = sampler.to_speedscope('busy')
+        profile = document['profiles'][0]
+        self.assertEqual(len(profile['samples']), len(profile['weights']))
+        names = {frame['name'] for frame in document['shared']['frames']}
+        self.assertIn('busy', names)
+        self.assertNotIn('test_sampler', names)
+        collapsed = to_collapsed(document)
+        self.assertTrue(collapsed.startswith('busy ('))
+        self.assertIn('test_profiling.py:', collapsed)
+
+    def test_header_profiles_staff_requests(self):
+        self.client.force_authenticate(user=self.staff)
+        token = self.client.post('/api/profiles/token/').json()['token']
+        response = self.client.get('/api/subcollection/', HTTP_X_PROFILE=token)
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((profile.user, profile.trigger, profile.path), (self.staff, RequestProfile.HEADER,
+                                                                         '/api/subcollection/'))
+        self.assertEqual(profile.speedscope['profiles'][0]['type'], 'sampled')
+
+    def test_header_is_ignored_for_other_users(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/subcollection/', HTTP_X_PROFILE=make_token(self.staff))
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+        self.assertEqual(self.client.post('/api/profiles/token/').status_code, 403)
+
+    def test_invalid_header_does_not_start_sampler(self):
+        self.client.force_authenticate(user=self.staff)
+        with mock.patch('profiling.middleware.StackSampler') as sampler:
+            self.client.get('/api/subcollection/', HTTP_X_PROFILE='1')
+            self.client.get('/api/subcollection/', HTTP_X_PROFILE=make_token(self.staff) + 'x')
+            with self.settings(PROFILING_TOKEN_AGE=-1):
+                self.client.get('/api/subcollection/', HTTP_X_PROFILE=make_token(self.staff))
+        sampler.assert_not_called()
+
+    def test_sampled_requests(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/subcollection/')
+        self.assertFalse(RequestProfile.objects.exists())
+        with self.settings(PROFILING_SAMPLE_RATE=1.0):
+            self.client.get('/api/subcollection/')
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.user, profile.trigger), (self.user, RequestProfile.SAMPLED))
+
+    def test_listing_is_staff_only(self):
+        self.client.force_authenticate(user=self.staff)
+        profile_id = self.client.get('/api/subcollection/', HTTP_X_PROFILE=make_token(self.staff))['X-Profile-Id']
+        response = self.client.get('/api/profiles/', {'path': '/api/subcollection/'})
+        self.assertEqual([row['uuid'] for row in response.json()], [profile_id])
+        self.assertEqual(len(self.client.get('/api/profiles/', {'limit': -5}).json()), 1)
+        self.assertNotIn('speedscope', response.json()[0])
+        self.assertIn('$schema', self.client.get(f'/api/profiles/{profile_id}/').json())
+        self.assertEqual(self.client.get(f'/api/profiles/{profile_id}/collapsed/').status_code, 200)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get('/api/profiles/').status_code, 403)
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+Shared Redis connections for application data (job progress, caches). Celery manages its own
+broker and result backend connections.
+"""
+import redis
+from django.conf import settings
+
+_clients = {}
+
+
+def get_redis(url=None):
+    """
+    Client for `url` (settings.REDIS_HOST by default). Clients are thread safe and pool their
+    connections, so one is kept per URL for the life of the process.
+    """
+    url = url or settings.REDIS_HOST
+    if url not in _clients:
+        _clients[url] = redis.Redis.from_url(url)
+    return _clients[url]
@@ -1,5 +1,20 @@
 from django.contrib import admin
 
+from inventory.admin import BackgroundDeletionAdmin
+from inventory.deletion import delete_user
 from .models import User
 
-admin.site.register(User)
+
+class UserAdmin(BackgroundDeletionAdmin):
+    list_display = ('email', 'username', 'is_staff', 'date_joined')
+    list_filter = ('is_staff', 'is_active')
+    # Also used by the autocomplete widgets for owner fields.
+    search_fields = ('email', 'username')
+    ordering = ('email',)
+    actions = ['delete_in_background']
+
+    def start_deletion(self, request, obj):
+        return delete_user(obj, requested_by=request.user)
+
+
+admin.site.register(User, UserAdmin)
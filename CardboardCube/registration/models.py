@@ -8,6 +8,10 @@ from django.utils.translation import ugettext_lazy as _
 class UserManager(BaseUserManager):
     use_in_migrations = True
 
+    def get_queryset(self):
+        # Users whose background deletion has started (see inventory.deletion) can no longer be found or log in.
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
     def _create_user(self, email, password, **extra_fields):
         """
         Creates and saves a User with the given email and password.
@@ -45,8 +49,10 @@ class User(AbstractBaseUser, PermissionsMixin):
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
     is_staff = models.BooleanField(_('Staff'), default=False)
     is_superuser = models.BooleanField(_('Superuser'), default=False)
+    deleted_at = models.DateTimeField(_('Deleted At'), null=True, editable=False)
 
     objects = UserManager()
+    all_objects = models.Manager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
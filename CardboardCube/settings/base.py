@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -37,6 +39,7 @@ DJANGO_AND_EXTERNAL_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'card_catalog',
     'rest_framework',
@@ -44,7 +47,10 @@ DJANGO_AND_EXTERNAL_APPS = [
 ]
 
 LOCAL_APPS = [
+    'images',
     'inventory',
+    'jobs',
+    'profiling',
     'registration',
 ]
 
@@ -52,12 +58,14 @@ INSTALLED_APPS = DJANGO_AND_EXTERNAL_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'profiling.middleware.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'urls'
@@ -81,6 +89,9 @@ TEMPLATES = [
 WSGI_APPLICATION = 'wsgi.application'
 
 # DATABASE CONFIG
+# Connections are kept open and reused by each worker for CONN_MAX_AGE seconds.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 600))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql_psycopg2',
@@ -89,9 +100,29 @@ DATABASES = {
         'PASSWORD': 'postgres',
         'HOST': 'localhost',
         'PORT': '5432',
-        'ATOMIC_REQUESTS': False
+        'ATOMIC_REQUESTS': False,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
     },
 }
+
+# Read replicas, as a comma separated list of host[:port] entries, e.g. "replica1:5432,replica2:5432".
+DB_REPLICA_HOSTS = [host for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host]
+for index, replica_host in enumerate(DB_REPLICA_HOSTS, start=1):
+    host, _, port = replica_host.partition(':')
+    DATABASES[f'replica_{index}'] = dict(DATABASES['default'], HOST=host, PORT=port or '5432')
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['db_router.PrimaryReplicaRouter']
+
+# After a write, the client's reads stay on the primary for this long so it never sees replica lag.
+REPLICA_PIN_COOKIE = 'cc_read_primary'
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 15))
+
+# Admin changelists show the planner's row estimate instead of an exact COUNT(*) above this size.
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('ADMIN_EXACT_COUNT_LIMIT', 100000))
+
+# Number of hash partitions per table used by `manage.py partition_inventory`.
+INVENTORY_PARTITION_COUNT = int(os.getenv('INVENTORY_PARTITION_COUNT', 16))
+
 REDIS_HOST = os.getenv('REDIS_HOST', 'redis://')
 # END DATABASE CONFIG
 
@@ -124,6 +155,10 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES':
         ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # Internationalization
@@ -157,6 +192,106 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_ALWAYS_EAGER = os.getenv('CELERY_ALWAYS_EAGER', False)
+CELERYBEAT_SCHEDULE = {
+    'compact-inventory-changes': {
+        'task': 'inventory.tasks.compact_inventory_changes',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'build-similarity-index': {
+        'task': 'inventory.tasks.build_similarity_index',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'record-inventory-history': {
+        'task': 'inventory.tasks.record_history',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'prune-request-profiles': {
+        'task': 'profiling.tasks.prune_profiles',
+        'schedule': crontab(hour=4, minute=30),
+    },
+    'refresh-analytics': {
+        'task': 'inventory.tasks.refresh_analytics',
+        'schedule': crontab(hour=2, minute=30),
+    },
+}
+
+# Background jobs: the coordinating tasks run on the "jobs" queue and the chunks of work on
+# "jobs_chunks", so a big import cannot starve job submission. CPU-bound draft simulations use
+# "jobs_simulation", and the nightly analytics rollups "analytics". Run workers for all four queues.
+CELERY_ROUTES = {
+    'jobs.tasks.start_job': {'queue': 'jobs'},
+    'jobs.tasks.finish_job': {'queue': 'jobs'},
+    'jobs.tasks.run_job_chunk': {'queue': 'jobs_chunks'},
+    'inventory.tasks.rollup_analytics_partition': {'queue': 'analytics'},
+}
+JOB_PROGRESS_STORE = 'jobs.progress.RedisProgressStore'
+JOB_PROGRESS_TTL = int(os.getenv('JOB_PROGRESS_TTL', 7 * 24 * 3600))
+
+# Local image store. Card images are copied from the remote CDN by IMAGE_FETCHER and served,
+# with resized variants, from IMAGE_URL.
+IMAGE_STORE_ROOT = os.getenv('IMAGE_STORE_ROOT', os.path.join(BASE_DIR, 'image_store'))
+IMAGE_URL = os.getenv('IMAGE_URL', '/images/')
+IMAGE_FETCHER = 'images.fetchers.HttpFetcher'
+# Used by images.fetchers.LocalDirectoryFetcher, which serves image URLs from files in this directory.
+IMAGE_FETCHER_DIRECTORY = os.getenv('IMAGE_FETCHER_DIRECTORY')
+IMAGE_FETCH_TIMEOUT = int(os.getenv('IMAGE_FETCH_TIMEOUT', 10))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 8))
+# Seconds before a card whose image could not be fetched is tried again.
+IMAGE_RETRY_AFTER = int(os.getenv('IMAGE_RETRY_AFTER', 24 * 3600))
+# Most cards one card_images job may fetch.
+IMAGE_JOB_MAX_CARDS = int(os.getenv('IMAGE_JOB_MAX_CARDS', 1000))
+IMAGE_CACHE_SECONDS = 365 * 24 * 3600
+
+# Sub-collection comparisons are cached under both sides' versions, so this only bounds cache size.
+COMPARE_CACHE_SECONDS = int(os.getenv('COMPARE_CACHE_SECONDS', 24 * 3600))
+
+# Per-user inventory snapshots served by /api/inventory/<owner>/snapshot/. Refreshes are queued this
+# many seconds after a change so a burst of changes is applied at once.
+INVENTORY_SNAPSHOT_STORE = 'inventory.snapshots.RedisSnapshotStore'
+INVENTORY_SNAPSHOT_TTL = int(os.getenv('INVENTORY_SNAPSHOT_TTL', 7 * 24 * 3600))
+INVENTORY_SNAPSHOT_DEBOUNCE = int(os.getenv('INVENTORY_SNAPSHOT_DEBOUNCE', 5))
+
+# Card similarity index (see inventory.similarity). Rebuilt nightly when the catalog has changed; the
+# directory must be shared by every worker process on a host, and is memory-mapped by each. Requests
+# finding no index queue a build at most once per SIMILARITY_BUILD_DEBOUNCE seconds.
+SIMILARITY_INDEX_ROOT = os.getenv('SIMILARITY_INDEX_ROOT', os.path.join(BASE_DIR, 'similarity_index'))
+SIMILARITY_BUILD_DEBOUNCE = int(os.getenv('SIMILARITY_BUILD_DEBOUNCE', 600))
+
+# Background deletion of users, inventories and sub-collections (see inventory.deletion): rows removed
+# per short transaction.
+DELETION_BATCH_SIZE = int(os.getenv('DELETION_BATCH_SIZE', 1000))
+
+# Request profiling (see profiling.middleware): the fraction of requests profiled at random, the seconds
+# between stack samples, how long captured profiles are kept, and how long a profiling token is valid.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', 0.005))
+PROFILING_RETENTION = int(os.getenv('PROFILING_RETENTION', 7 * 24 * 3600))
+PROFILING_TOKEN_AGE = int(os.getenv('PROFILING_TOKEN_AGE', 3600))
+
+# Inventory and sub-collection history (see inventory.history): a full checkpoint is recorded after at
+# most this many diffs.
+HISTORY_MAX_DIFFS = int(os.getenv('HISTORY_MAX_DIFFS', 365))
+
+# GraphQL API (see api.gql): the deepest nesting a query may have, the most objects it may be able to
+# return, estimated before it runs, and how many fields with a query of their own it may use.
+GRAPHQL_MAX_DEPTH = int(os.getenv('GRAPHQL_MAX_DEPTH', 10))
+GRAPHQL_MAX_COST = int(os.getenv('GRAPHQL_MAX_COST', 50000))
+GRAPHQL_MAX_LOOKUPS = int(os.getenv('GRAPHQL_MAX_LOOKUPS', 20))
+
+# Live change events (see inventory.live and api.live): the broker carrying them, how many object ids an
+# event lists before just saying "many", how many events a subscriber may fall behind before it is told to
+# resync, and the seconds between keep-alive comments on idle streams.
+LIVE_BROKER = 'inventory.live.RedisBroker'
+LIVE_MAX_IDS = int(os.getenv('LIVE_MAX_IDS', 100))
+LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', 1000))
+LIVE_HEARTBEAT = int(os.getenv('LIVE_HEARTBEAT', 15))
+
+# Analytics rollups (see inventory.analytics): how many owner ranges they are split into, each rolled up
+# by its own task.
+ANALYTICS_PARTITIONS = int(os.getenv('ANALYTICS_PARTITIONS', 16))
+
+# Inventory change log: entries superseded by a later change are compacted after this many seconds.
+INVENTORY_CHANGE_COMPACT_AFTER = int(os.getenv('INVENTORY_CHANGE_COMPACT_AFTER', 7 * 24 * 3600))
 
 # TCGPlayer API Settings
 TCG_API_PUBLIC_KEY = os.getenv('TCG_API_PUBLIC_KEY', None)
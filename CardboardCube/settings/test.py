@@ -1,3 +1,5 @@
+import tempfile
+
 from .base import *
 
 
@@ -12,7 +14,33 @@ DATABASES = {
         'PORT': '5432',
         'ATOMIC_REQUESTS': False
     },
+    # A second local database standing in for a read replica, mirrored onto the default test database.
+    # The mirror is a separate connection that cannot see data inside a TestCase transaction, so it
+    # is only listed in DATABASE_REPLICAS by the routing tests (via override_settings).
+    'replica': {
+        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'NAME': os.getenv('DB_REPLICA_NAME', 'cube_test_replica'),
+        'USER': 'postgres',
+        'PASSWORD': 'postgres',
+        'HOST': 'localhost',
+        'PORT': '5432',
+        'ATOMIC_REQUESTS': False,
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
+DATABASE_REPLICAS = []
 
 # Celery
 CELERY_ALWAYS_EAGER = True
+JOB_PROGRESS_STORE = 'jobs.progress.LocalProgressStore'
+INVENTORY_SNAPSHOT_STORE = 'inventory.snapshots.LocalSnapshotStore'
+LIVE_BROKER = 'inventory.live.LocalBroker'
+
+# Images
+IMAGE_FETCHER = 'images.fetchers.LocalDirectoryFetcher'
+IMAGE_STORE_ROOT = tempfile.mkdtemp(prefix='cube_test_images_')
+
+# Card similarity
+SIMILARITY_INDEX_ROOT = tempfile.mkdtemp(prefix='cube_test_similarity_')